@@ -0,0 +1,118 @@
+# api/concurrency.py
+# 요청 동시성 제어
+# - Deadline: 요청별 마감 시각 (X-Request-Timeout 헤더 또는 기본값)
+# - ConcurrencyLimiter: 동시에 처리하는 요청 수 상한 + 대기 줄 길이 상한 (넘으면 Overloaded → 503)
+# - run_blocking: 블로킹 작업을 전용 executor 에서 실행, 시작 전에 deadline 이 지났으면 실행하지 않음
+
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+TIMEOUT_HEADER = "X-Request-Timeout"
+
+
+class Overloaded(Exception):
+    """대기 중인 요청이 너무 많음 (load shedding → API 503)"""
+
+
+class DeadlineExceeded(Exception):
+    """요청 deadline 이 지남 (→ API 504)"""
+
+
+class Deadline:
+    def __init__(self, timeout_s: float):
+        self.timeout = timeout_s
+        self.expires_at = time.monotonic() + timeout_s
+
+    @classmethod
+    def from_request(cls, request, default_s: float, max_s: float) -> "Deadline":
+        """X-Request-Timeout: 초 단위 (없거나 잘못된 값이면 기본값, 최대 max_s)"""
+        value = request.headers.get(TIMEOUT_HEADER)
+        try:
+            timeout = float(value) if value is not None else default_s
+        except ValueError:
+            timeout = default_s
+        if timeout <= 0:
+            timeout = default_s
+        return cls(min(timeout, max_s))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage: str = ""):
+        if self.expired():
+            raise DeadlineExceeded(f"요청 시간 초과 ({self.timeout:.1f}s){' - ' + stage if stage else ''}")
+
+
+class ConcurrencyLimiter:
+    """
+    max_in_flight 개까지 동시에 처리, 그 이상은 max_waiting 개까지만 줄 세움
+    줄도 가득 차면 바로 Overloaded (기다리다 타임아웃 나는 것보다 빨리 거절하는 게 낫다)
+    """
+
+    def __init__(self, max_in_flight: int, max_waiting: int):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+        self.expired = 0
+        self.completed = 0
+
+    @asynccontextmanager
+    async def slot(self, deadline: Deadline):
+        # in_flight + waiting 은 await 전에 바로 갱신되므로 동시에 들어온 요청도 정확히 센다
+        if self.in_flight + self.waiting >= self.max_in_flight + self.max_waiting:
+            self.shed += 1
+            raise Overloaded(f"요청이 너무 많습니다 (처리 중 {self.in_flight}, 대기 {self.waiting})")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            self.expired += 1
+            raise DeadlineExceeded(f"요청 시간 초과 ({deadline.timeout:.1f}s) - 대기열")
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_waiting": self.max_waiting,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "shed": self.shed,
+            "expired": self.expired,
+        }
+
+
+async def run_blocking(executor, deadline: Deadline, fn, *args):
+    """
+    executor 에서 fn(*args) 실행
+    - executor 대기 중에 deadline 이 지나면 시작하지 않는다
+    - 실행 중에 deadline 이 지나면 결과를 기다리지 않고 DeadlineExceeded
+    """
+    def guarded():
+        deadline.check(getattr(fn, "__name__", ""))
+        return fn(*args)
+
+    deadline.check()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor, guarded)
+    try:
+        return await asyncio.wait_for(future, timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"요청 시간 초과 ({deadline.timeout:.1f}s) - {getattr(fn, '__name__', '')}")
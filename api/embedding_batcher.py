@@ -0,0 +1,135 @@
+# api/embedding_batcher.py
+# 동시 요청의 쿼리 임베딩을 모아서 한 번에 계산하는 마이크로 배처
+# - 짧은 대기 시간(max_wait_ms) 동안 들어온 쿼리 또는 max_batch_size 개까지 묶어서 한 번에 forward
+# - 대기열이 가득 차면 EmbeddingQueueFull (→ API 503)
+# - 요청별 deadline 이 지나면 계산하지 않고 EmbeddingTimeout (→ API 504)
+
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+class EmbeddingQueueFull(Exception):
+    """임베딩 대기열이 가득 참 (backpressure)"""
+
+
+class EmbeddingTimeout(Exception):
+    """deadline 안에 임베딩을 받지 못함"""
+
+
+class _Item:
+    __slots__ = ("text", "deadline", "future")
+
+    def __init__(self, text: str, deadline: float):
+        self.text = text
+        self.deadline = deadline
+        self.future = Future()
+
+
+class EmbeddingBatcher:
+    """
+    embed_batch(texts) -> [벡터, ...] 를 백그라운드 스레드 하나에서 배치로 호출
+    """
+
+    def __init__(self, embed_batch, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 max_queue: int = 256, default_timeout: float = 10.0):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.default_timeout = default_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.expired = 0
+
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    # ---------- 호출하는 쪽 ----------
+    def submit(self, text: str, timeout: float = None) -> Future:
+        timeout = self.default_timeout if timeout is None else timeout
+        item = _Item(text, time.monotonic() + timeout)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.rejected += 1
+            raise EmbeddingQueueFull(f"임베딩 대기열이 가득 찼습니다 ({self._queue.maxsize})")
+        return item.future
+
+    def embed(self, text: str, timeout: float = None) -> list:
+        """쿼리 하나를 임베딩 (다른 요청들과 같은 배치로 묶일 수 있음)"""
+        timeout = self.default_timeout if timeout is None else timeout
+        future = self.submit(text, timeout)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise EmbeddingTimeout(f"임베딩 시간 초과 ({timeout:.1f}s)")
+
+    def close(self):
+        self._closed.set()
+
+    # ---------- 배치 스레드 ----------
+    def _collect(self):
+        """첫 요청을 기다린 뒤, max_wait 동안 (또는 max_batch_size 까지) 더 모은다"""
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        window_end = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = window_end - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._closed.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            # 이미 취소됐거나 deadline 이 지난 요청은 계산하지 않는다
+            now = time.monotonic()
+            live = []
+            for item in batch:
+                if not item.future.set_running_or_notify_cancel():
+                    self.expired += 1
+                elif item.deadline < now:
+                    self.expired += 1
+                    item.future.set_exception(EmbeddingTimeout("대기열에서 deadline 초과"))
+                else:
+                    live.append(item)
+            if not live:
+                continue
+
+            try:
+                vectors = self.embed_batch([item.text for item in live])
+            except Exception as e:
+                for item in live:
+                    item.future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(live)
+            for item, vec in zip(live, vectors):
+                item.future.set_result(vec)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queue_depth": self._queue.qsize(),
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
@@ -3,13 +3,99 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Optional
+from contextlib import AsyncExitStack
 
-from api.rag_service import retrieve_candidates, retrieve_solution
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
-app = FastAPI(title="DSM RAG API")
+from rag.config import (
+    API_MAX_IN_FLIGHT,
+    API_MAX_WAITING,
+    API_REQUEST_TIMEOUT_S,
+    API_MAX_REQUEST_TIMEOUT_S,
+    API_BATCH_MAX_ITEMS,
+    API_BATCH_STREAM_CHUNK,
+    API_GZIP_MIN_BYTES,
+)
+from api.rag_service import (
+    retrieve_candidates_async,
+    retrieve_candidates_batch_async,
+    retrieve_solution_async,
+    get_stats,
+    start_warmup,
+    is_ready,
+    readiness,
+    ServiceNotReady,
+)
+from api.embedding_batcher import EmbeddingQueueFull, EmbeddingTimeout
+from api.concurrency import ConcurrencyLimiter, Deadline, DeadlineExceeded, Overloaded
+from api.responses import (
+    FastJSONResponse,
+    ReleasingStreamingResponse,
+    dumps_line,
+    parse_include,
+    project_hypothesis,
+)
+
+app = FastAPI(title="DSM RAG API", default_response_class=FastJSONResponse)
+# Accept-Encoding: gzip 인 클라이언트에게만, 일정 크기 이상 응답을 압축
+app.add_middleware(GZipMiddleware, minimum_size=API_GZIP_MIN_BYTES)
+
+# RAG 요청 동시 처리 상한 (넘는 요청은 줄 세우고, 줄도 가득 차면 503)
+limiter = ConcurrencyLimiter(API_MAX_IN_FLIGHT, API_MAX_WAITING)
+
+
+def request_deadline(request: Request) -> Deadline:
+    return Deadline.from_request(request, API_REQUEST_TIMEOUT_S, API_MAX_REQUEST_TIMEOUT_S)
+
+
+# ---------- 시작: 포트는 바로 열고 모델/인덱스는 백그라운드에서 로드 ----------
+@app.on_event("startup")
+def warm_up_in_background():
+    start_warmup()
+
+
+# ---------- Probes ----------
+@app.get("/healthz")
+def healthz():
+    # liveness: 프로세스가 살아서 응답하면 OK
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    # readiness: 모델 + 인덱스 로드 + warm-up 추론까지 끝났을 때만 200
+    body = readiness()
+    return JSONResponse(status_code=200 if is_ready() else 503, content=body)
+
+
+# ---------- 과부하 / 시간 초과 ----------
+@app.exception_handler(EmbeddingQueueFull)
+def embedding_queue_full(request: Request, exc: EmbeddingQueueFull):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(ServiceNotReady)
+def service_not_ready(request: Request, exc: ServiceNotReady):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+
+@app.exception_handler(Overloaded)
+def overloaded(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(EmbeddingTimeout)
+def embedding_timeout(request: Request, exc: EmbeddingTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(DeadlineExceeded)
+def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
 
 
 # ---------- Stage 2: Hypothesis Generation ----------
@@ -17,15 +103,12 @@ class HypothesisReq(BaseModel):
     intake_report: str
     top_k: Optional[int] = 12
     diag_top_n: Optional[int] = 3
+    # flat: 전체 chunk 투표 (기존) / hierarchical: 병명 centroid 로 coarse_n 개 고른 뒤 그 안에서만 검색
+    mode: Literal["flat", "hierarchical"] = "flat"
+    coarse_n: Optional[int] = Field(None, ge=1)
 
 
-@app.post("/rag/hypothesis")
-def rag_hypothesis(req: HypothesisReq):
-    data = retrieve_candidates(
-        symptom_text=req.intake_report,
-        top_k=req.top_k or 12,
-        diag_top_n=req.diag_top_n or 3,
-    )
+def add_hypothesis_report(data: dict) -> dict:
     # 이름은 기존이랑 맞춰 둘게
     data["hypothesis_report"] = "Top DSM candidates: " + ", ".join(
         data["diagnosis_candidates"]
@@ -33,11 +116,98 @@ def rag_hypothesis(req: HypothesisReq):
     return data
 
 
+def hypothesis_shape(
+    include: Optional[str] = Query(None, description="raw_hits,criteria,input 중 필요한 것만 (없으면 전부)"),
+    preview: Optional[int] = Query(None, ge=0, description="raw_hits 본문을 이 글자 수로 자름"),
+    criteria_preview: Optional[int] = Query(None, ge=0, description="criteria 본문을 이 글자 수로 자름"),
+):
+    """응답 모양 (필드 선택 + 미리보기) → retrieve_candidates 결과를 바꾸는 함수"""
+    try:
+        fields = parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return lambda data: project_hypothesis(add_hypothesis_report(data), fields, preview, criteria_preview)
+
+
+@app.post("/rag/hypothesis")
+async def rag_hypothesis(req: HypothesisReq, request: Request, shape=Depends(hypothesis_shape)):
+    deadline = request_deadline(request)
+    async with limiter.slot(deadline):
+        data = await retrieve_candidates_async(
+            symptom_text=req.intake_report,
+            top_k=req.top_k or 12,
+            diag_top_n=req.diag_top_n or 3,
+            deadline=deadline,
+            mode=req.mode,
+            coarse_n=req.coarse_n,
+        )
+    # Response 를 직접 만들어서 jsonable_encoder 변환을 건너뛴다 (이미 JSON 기본 타입만 있음)
+    return FastJSONResponse(shape(data))
+
+
+# ---------- Stage 2 (배치): 보관된 intake 요약 일괄 재채점 ----------
+class HypothesisBatchReq(BaseModel):
+    items: List[HypothesisReq]
+    stream: Optional[bool] = False   # True 또는 Accept: application/x-ndjson 이면 NDJSON 스트리밍
+
+
+def _batch_items(items):
+    return [(it.intake_report, it.top_k or 12, it.diag_top_n or 3, it.mode, it.coarse_n) for it in items]
+
+
+@app.post("/rag/hypothesis:batch")
+async def rag_hypothesis_batch(req: HypothesisBatchReq, request: Request, shape=Depends(hypothesis_shape)):
+    if len(req.items) > API_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"items 는 최대 {API_BATCH_MAX_ITEMS}개입니다")
+    if not is_ready():
+        raise ServiceNotReady(f"RAG 서비스 준비 중입니다 ({readiness()['status']})")
+
+    deadline = request_deadline(request)
+    items = _batch_items(req.items)
+    stream = req.stream or "application/x-ndjson" in request.headers.get("accept", "")
+
+    if not stream:
+        async with limiter.slot(deadline):
+            results = await retrieve_candidates_batch_async(items, deadline)
+        return FastJSONResponse({"results": [shape(r) for r in results]})
+
+    # 스트리밍: 슬롯은 응답을 다 보낼 때까지 잡고 있고, API_BATCH_STREAM_CHUNK 개씩 처리해서 바로 내보낸다
+    # (슬롯은 헤더 전에 잡아서 503 / 504 를 그대로 돌려주고, 반납은 응답 객체가 책임 → 끊긴 연결에서도 반납)
+    stack = AsyncExitStack()
+    await stack.enter_async_context(limiter.slot(deadline))
+
+    async def lines():
+        async with stack:
+            for start in range(0, len(items), API_BATCH_STREAM_CHUNK):
+                try:
+                    results = await retrieve_candidates_batch_async(
+                        items[start:start + API_BATCH_STREAM_CHUNK], deadline,
+                    )
+                except (DeadlineExceeded, EmbeddingTimeout) as e:
+                    # 헤더는 이미 나갔으므로 오류는 마지막 줄로 알린다
+                    yield dumps_line({"index": start, "error": str(e)})
+                    return
+                for offset, data in enumerate(results):
+                    yield dumps_line({"index": start + offset, **shape(data)})
+
+    return ReleasingStreamingResponse(lines(), release=stack.aclose, media_type="application/x-ndjson")
+
+
 # ---------- Stage 4: Solution & Summary ----------
 class SolutionReq(BaseModel):
     diagnosis: str
 
 
 @app.post("/rag/solution")
-def rag_solution(req: SolutionReq):
-    return retrieve_solution(req.diagnosis)
+async def rag_solution(req: SolutionReq, request: Request):
+    deadline = request_deadline(request)
+    async with limiter.slot(deadline):
+        return FastJSONResponse(await retrieve_solution_async(req.diagnosis, deadline))
+
+
+# ---------- 운영용: 캐시 / 동시성 통계 ----------
+@app.get("/rag/stats")
+def rag_stats():
+    stats = get_stats()
+    stats["concurrency"] = limiter.stats()
+    return stats
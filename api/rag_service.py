@@ -2,29 +2,493 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+import time
+import asyncio
+import threading
 from collections import Counter
-from langchain_community.vectorstores import Chroma
-from rag.embeddings import get_embeddings
-from rag.config import CHROMA_DIR, DSM_COLLECTION_NAME
-
-# 서버 시작 시 한 번만 로드
-_embeddings = get_embeddings()
-_db = Chroma(
-    embedding_function=_embeddings,
-    persist_directory=CHROMA_DIR,
-    collection_name=DSM_COLLECTION_NAME,
+from concurrent.futures import ThreadPoolExecutor
+from rag.config import (
+    API_SEARCH_THREADS,
+    EMBEDDING_CACHE_MEMORY_ITEMS,
+    EMBED_BATCH_MAX_SIZE,
+    EMBED_BATCH_MAX_WAIT_MS,
+    EMBED_QUEUE_MAX,
+    EMBED_TIMEOUT_S,
+    HIERARCHICAL_DISORDERS,
+    RESULT_CACHE_MAX_ITEMS,
+    RESULT_CACHE_SEMANTIC_ITEMS,
+    RESULT_CACHE_SIM_THRESHOLD,
+    RESULT_CACHE_TTL_S,
+    RESULT_CACHE_VERSION_CHECK_S,
+    VECTOR_SNAPSHOT_DIR,
 )
+from rag.index_tables import (
+    SOLUTION_QUERY_TEMPLATE,
+    SOLUTION_TOP_K,
+    build_solution_table,
+    load_criteria_table,
+    load_solution_table,
+    save_solution_table,
+)
+from api.embedding_batcher import EmbeddingBatcher, EmbeddingTimeout
+from api.concurrency import Deadline, run_blocking
+from api.result_cache import ResultCache
+
+# torch / transformers / chromadb 같은 무거운 모듈은 여기서 import 하지 않는다
+# → 서버는 바로 포트를 열고, 모델과 인덱스는 백그라운드에서 올린다 (start_warmup)
+
+
+# retrieve_candidates 검색 방식: flat (전체 chunk top-k) | hierarchical (병명 centroid → 병명 안에서 top-k)
+RETRIEVAL_MODES = ("flat", "hierarchical")
+
+# criteria 테이블에 없는 병명의 criteria 검색 쿼리 (고정 문장 → 서버 시작 때 한 번만 임베딩)
+CRITERIA_QUERY = "diagnostic criteria"
+
+
+class ServiceNotReady(Exception):
+    """모델 / 인덱스 로딩이 아직 끝나지 않음 (→ API 503)"""
+
+
+class _RagState:
+    """지연 로딩되는 서빙 상태 (모델, 인덱스, 배처, 사이드카 테이블)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.embeddings = None
+        self.index = None    # rag.vector_backend.VectorBackend
+        self.batcher = None
+        self.search_executor = None
+        self.bulk_executor = None
+        self.result_cache = None
+        self.version_checked_at = 0.0
+        self.index_version = None   # 지금 로드한 인덱스의 version() (바뀌면 _reload_index)
+        self.reloading = False
+        self.criteria_table = {}
+        self.solution_table = {}
+        self.name_index = None   # rag.disorder_names.DisorderNameIndex
+        self.centroids = None    # rag.disorder_centroids.DisorderCentroids (없으면 계층 검색 → flat)
+        self.criteria_query_vec = None   # CRITERIA_QUERY 임베딩 (요청 경로에서 임베딩하지 않도록)
+        self.ready = False
+        self.loading = False
+        self.error = None
+        self.phases = {}   # 단계별 소요 시간 (초)
+
+
+_state = _RagState()
+
+
+def _phase(name: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    _state.phases[name] = round(elapsed, 3)
+    print(f"[Startup] {name}: {elapsed:.2f}s")
+    return result
+
+
+def _load_index_state(embeddings, phase=_phase) -> dict:
+    """
+    인덱스와 인덱스에서 나온 상태 (테이블, 병명 인덱스, centroid, criteria 쿼리 벡터)
+    서버 시작 때, 그리고 인덱스가 다시 빌드됐을 때 (_reload_index) 통째로 다시 만든다
+    """
+    from rag import embeddings as rag_embeddings
+    from rag import vector_backend
+
+    def open_index():
+        # VECTOR_BACKEND 에 따라 Chroma 또는 memmap 스냅샷
+        index = vector_backend.get_vector_backend(embeddings)
+        # 인덱스 차원과 쿼리 차원(EMBEDDING_DIM)이 다르면 서버를 띄우지 않는다
+        rag_embeddings.check_index_dimension(index.metadata)
+        print(f"[RAG] 벡터 백엔드: {index.name}")
+        return index
+
+    index = phase("index_open", open_index)
+    # 로딩 전에 읽어 둔다 (로딩 중에 또 바뀌면 다음 확인에서 다시 로드)
+    index_version = index.version()
+
+    # disorder → 대표 criteria 문단 (build_dsm_db.py 가 인덱스 옆에 저장)
+    criteria_table = phase("tables", load_criteria_table)
+    if not criteria_table:
+        print("[RAG] criteria 테이블이 없습니다 → criteria 는 매번 벡터 검색으로 찾습니다")
+
+    # 병명 / 별칭 / F코드 → 정식 병명 (없으면 지금 병명 목록 + 별칭 파일로 만든다, F코드는 빌드 때만)
+    def open_name_index():
+        from rag.disorder_names import DisorderNameIndex, build_name_index
+
+        name_index = DisorderNameIndex.load()
+        if name_index is None:
+            name_index = build_name_index(list(criteria_table) or index.disorders())
+            print(f"[RAG] 병명 인덱스 파일이 없습니다 → 병명 {len(name_index)}개로 생성")
+        return name_index
+
+    name_index = phase("name_index", open_name_index)
+
+    # 계층 검색용 병명별 centroid (없으면 스냅샷이 있을 때만 지금 만든다)
+    def open_centroids():
+        from rag.disorder_centroids import DisorderCentroids
+
+        centroids = DisorderCentroids.load()
+        if centroids is None and os.path.exists(os.path.join(VECTOR_SNAPSHOT_DIR, "meta.json")):
+            centroids = DisorderCentroids.from_snapshot()
+            centroids.save()
+            print(f"[RAG] 병명 centroid 생성: 병명 {len(centroids)}개, centroid {len(centroids.vectors)}개")
+        if centroids is None:
+            print("[RAG] 병명 centroid 가 없습니다 → mode=hierarchical 요청도 flat 검색으로 처리합니다")
+        return centroids
+
+    centroids = phase("centroids", open_centroids)
+
+    criteria_query_vec = phase(
+        "criteria_query", lambda: _check_query_dim(embeddings.embed_query(CRITERIA_QUERY))
+    )
+
+    # disorder → /rag/solution evidence (없으면 지금 한 번 만들어서 인덱스 옆에 저장)
+    solution_table = load_solution_table()
+    if solution_table is None:
+        def build_table():
+            disorders = list(criteria_table) or index.disorders()
+            table = build_solution_table(disorders, embeddings.embed_queries, index.search)
+            save_solution_table(table)
+            return table
+
+        solution_table = phase("solution_table", build_table)
+        print(f"[RAG] solution 테이블 생성: 병명 {len(solution_table)}개")
+
+    return {
+        "index": index,
+        "index_version": index_version,
+        "criteria_table": criteria_table,
+        "solution_table": solution_table,
+        "name_index": name_index,
+        "centroids": centroids,
+        "criteria_query_vec": criteria_query_vec,
+    }
+
+
+def _set_index_state(index_state: dict):
+    # 요청 쪽은 _state 필드를 바로 읽으므로 이어서 한꺼번에 바꾼다
+    for name, value in index_state.items():
+        setattr(_state, name, value)
+
+
+def _load():
+    def import_modules():
+        from rag import embeddings as rag_embeddings
+        from rag import vector_backend  # noqa: F401 (chromadb 등 import 시간도 이 단계에서)
+        return rag_embeddings
+
+    started = time.perf_counter()
+    rag_embeddings = _phase("import", import_modules)
+
+    # 반복 쿼리는 임베딩 캐시(메모리 LRU → 디스크)에서 바로 가져온다
+    embeddings = _phase(
+        "model_load",
+        lambda: rag_embeddings.get_embeddings(memory_items=EMBEDDING_CACHE_MEMORY_ITEMS),
+    )
+
+    # 첫 요청이 모델 초기화 비용을 떠안지 않도록 실제 추론 한 번 (캐시/자르기 래퍼 우회)
+    model = embeddings
+    while hasattr(model, "base"):
+        model = model.base
+    _phase("warmup_inference", lambda: model.embed_documents(["warm up"]))
+
+    index_state = _load_index_state(embeddings)
+
+    # 동시 요청의 쿼리 임베딩은 배처가 모아서 한 번에 계산
+    batcher = EmbeddingBatcher(
+        embeddings.embed_queries,
+        max_batch_size=EMBED_BATCH_MAX_SIZE,
+        max_wait_ms=EMBED_BATCH_MAX_WAIT_MS,
+        max_queue=EMBED_QUEUE_MAX,
+        default_timeout=EMBED_TIMEOUT_S,
+    )
+
+    _state.embeddings = embeddings
+    _set_index_state(index_state)
+    _state.batcher = batcher
+    # async 엔드포인트의 벡터 검색은 이 스레드들에서 (이벤트 루프를 막지 않도록)
+    _state.search_executor = ThreadPoolExecutor(API_SEARCH_THREADS, thread_name_prefix="rag-search")
+    # 배치 엔드포인트의 대량 임베딩 (한 번의 forward) 전용 스레드
+    _state.bulk_executor = ThreadPoolExecutor(1, thread_name_prefix="rag-bulk-embed")
+    # 거의 같은 intake 요약이 반복되므로 결과 자체를 캐시 (인덱스가 바뀌면 비움)
+    _state.result_cache = ResultCache(
+        max_items=RESULT_CACHE_MAX_ITEMS,
+        ttl_s=RESULT_CACHE_TTL_S,
+        semantic_threshold=RESULT_CACHE_SIM_THRESHOLD,
+        semantic_items=RESULT_CACHE_SEMANTIC_ITEMS,
+    )
+    _state.result_cache.check_version(_state.index_version)
+    _state.phases["total"] = round(time.perf_counter() - started, 3)
+    print(f"[Startup] 준비 완료: {_state.phases}")
+
+
+def _reload_index():
+    """
+    인덱스가 다시 빌드됐을 때 (백그라운드 스레드): 인덱스와 거기서 나온 상태를 새로 로드한 뒤 바꿔 끼운다
+    로드하는 동안은 이전 인덱스 / 결과 캐시로 계속 응답, 바꾼 뒤에 결과 캐시를 비운다
+    """
+    started = time.perf_counter()
+    try:
+        index_state = _load_index_state(_state.embeddings, phase=lambda name, fn: fn())
+    except Exception as e:
+        print(f"[RAG] 인덱스 다시 로드 실패 → 이전 인덱스로 계속: {type(e).__name__}: {e}")
+        return
+    finally:
+        _state.reloading = False
+    _set_index_state(index_state)
+    _state.result_cache.check_version(index_state["index_version"])
+    print(f"[RAG] 인덱스 다시 로드 완료 ({time.perf_counter() - started:.2f}s)")
+
+
+def init_service():
+    """모델 / 인덱스 로딩 (여러 번 불러도 한 번만 실행)"""
+    with _state.lock:
+        if _state.ready or _state.loading:
+            return
+        _state.loading = True
+        _state.error = None
+    try:
+        _load()
+        _state.ready = True
+    except Exception as e:
+        _state.error = f"{type(e).__name__}: {e}"
+        print(f"[Startup] 로딩 실패: {_state.error}")
+        raise
+    finally:
+        _state.loading = False
+
+
+def start_warmup():
+    """백그라운드 스레드에서 init_service 실행 (서버는 바로 요청을 받을 수 있음)"""
+    def run():
+        try:
+            init_service()
+        except Exception:
+            pass   # 오류는 readiness() 로 보고한다
+
+    threading.Thread(target=run, name="rag-warmup", daemon=True).start()
+
+
+def is_ready() -> bool:
+    return _state.ready
+
+
+def readiness() -> dict:
+    if _state.ready:
+        status = "ready"
+    elif _state.error:
+        status = "failed"
+    else:
+        status = "loading"
+    return {"status": status, "phases": dict(_state.phases), "error": _state.error}
+
+
+def _require_ready():
+    if not _state.ready:
+        raise ServiceNotReady(f"RAG 서비스 준비 중입니다 ({readiness()['status']})")
+
+
+def _search_criteria(diag: str):
+    """
+    criteria 테이블에 없는 병명용: 검색해서 가장 긴 criteria 문단 1개
+    쿼리 벡터는 시작 때 계산해 둔 것 (배처의 기본 timeout 으로 요청 deadline 을 넘기지 않도록)
+    """
+    raw = _state.index.search(
+        _state.criteria_query_vec,
+        k=200,
+        where={"disorder": diag},
+    )
+
+    # section == "criteria" 만 뽑기
+    criteria_docs = [
+        r for r in raw
+        if r.metadata.get("section") == "criteria"
+    ]
+
+    # 🔥 여기서 가장 긴 기준 문단 하나만 남긴다
+    if criteria_docs:
+        longest = max(
+            criteria_docs,
+            key=lambda d: len(d.page_content or "")
+        )
+        return [
+            {
+                "text": longest.page_content,
+                "metadata": longest.metadata,
+            }
+        ]
+    return []
 
 
-def retrieve_candidates(symptom_text: str, top_k: int = 12, diag_top_n: int = 3):
+def resolve_disorder(name: str) -> str:
+    """LLM 이 넘긴 병명 (한국어 이름, 약어, F코드, 오타 등) → 인덱스의 정식 병명 (모르면 그대로)"""
+    if _state.name_index is None:
+        return name
+    return _state.name_index.resolve(name) or name
+
+
+def get_criteria(diag: str):
+    """disorder 의 대표 criteria 문단 (테이블 dict 조회, 없을 때만 벡터 검색)"""
+    diag = resolve_disorder(diag)
+    if diag not in _state.criteria_table:
+        return _search_criteria(diag)
+    entry = _state.criteria_table[diag]
+    if entry is None:
+        return []
+    return [{"text": entry["text"], "metadata": entry["metadata"]}]
+
+
+def _check_query_dim(vec):
+    from rag.embeddings import index_dim, EmbeddingDimensionMismatch
+
+    if len(vec) != index_dim():
+        raise EmbeddingDimensionMismatch(
+            f"쿼리 벡터 차원({len(vec)})이 인덱스 차원({index_dim()})과 다릅니다"
+        )
+    return vec
+
+
+def embed_query(text: str):
+    """쿼리 임베딩 (마이크로 배처 경유)"""
+    _require_ready()
+    return _check_query_dim(_state.batcher.embed(text))
+
+
+async def embed_query_async(text: str, deadline: Deadline):
+    """
+    쿼리 임베딩 (async): 배처 스레드의 Future 를 이벤트 루프에서 기다린다
+    deadline 이 지나면 Future 를 취소 → 배처가 아직 안 꺼냈으면 계산하지 않음
+    """
+    _require_ready()
+    deadline.check("embedding")
+    future = _state.batcher.submit(text, timeout=deadline.remaining())
+    try:
+        vec = await asyncio.wait_for(asyncio.wrap_future(future), timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise EmbeddingTimeout(f"임베딩 시간 초과 ({deadline.timeout:.1f}s)")
+    return _check_query_dim(vec)
+
+
+def retrieve_candidates(symptom_text: str, top_k: int = 12, diag_top_n: int = 3,
+                        mode: str = "flat", coarse_n: int = None):
     """
     1) 증상으로 문단 k개 검색
+       mode="hierarchical": 병명 centroid 로 병명 coarse_n 개를 먼저 고르고 그 안에서만 검색
     2) 그 문단들에서 가장 많이 등장한 'disorder' 상위 n개 뽑기
     3) 각 disorder마다 section == 'criteria' 인 문단들을 가져오되, 가장 긴 것 1개만 반환
+       (빌드 때 만든 criteria 테이블에서 바로 꺼낸다 → 요청당 벡터 검색은 1번)
     """
+    _require_ready()
+    params = _search_params(top_k, diag_top_n, mode, coarse_n)
+    key, cached = _cached_exact(symptom_text, params)
+    if cached is not None:
+        return cached
+
+    query_vec = embed_query(symptom_text)
+    cached = _cached_semantic(symptom_text, query_vec, params)
+    if cached is not None:
+        return cached
+
+    result = _candidates_from_vector(symptom_text, query_vec, *params)
+    return _cache_result(key, query_vec, params, result)
+
+
+async def retrieve_candidates_async(symptom_text: str, top_k: int, diag_top_n: int, deadline: Deadline,
+                                    mode: str = "flat", coarse_n: int = None):
+    """retrieve_candidates 의 async 버전 (임베딩은 배처, 검색은 검색 전용 executor)"""
+    _require_ready()
+    params = _search_params(top_k, diag_top_n, mode, coarse_n)
+    key, cached = _cached_exact(symptom_text, params)
+    if cached is not None:
+        return cached
+
+    query_vec = await embed_query_async(symptom_text, deadline)
+    cached = _cached_semantic(symptom_text, query_vec, params)
+    if cached is not None:
+        return cached
+
+    result = await run_blocking(
+        _state.search_executor, deadline,
+        _candidates_from_vector, symptom_text, query_vec, *params,
+    )
+    return _cache_result(key, query_vec, params, result)
+
+
+# ---------- 결과 캐시 ----------
+def _refresh_index_version():
+    """
+    RESULT_CACHE_VERSION_CHECK_S 마다 인덱스 버전 확인
+    재빌드됐으면 인덱스 / 테이블 / 병명 인덱스 / centroid 를 백그라운드에서 다시 로드 (끝나면 결과 캐시 비움)
+    """
+    now = time.monotonic()
+    if now - _state.version_checked_at < RESULT_CACHE_VERSION_CHECK_S:
+        return
+    _state.version_checked_at = now
+    version = _state.index.version()
+    if version == _state.index_version:
+        return
+    with _state.lock:
+        if _state.reloading:
+            return
+        _state.reloading = True
+    # 다시 로드에 실패해도 같은 버전으로 계속 재시도하지 않도록 (다음 재빌드 때 다시 시도)
+    _state.index_version = version
+    print("[RAG] 인덱스가 다시 빌드됐습니다 → 다시 로드")
+    threading.Thread(target=_reload_index, name="rag-index-reload", daemon=True).start()
+
+
+def _with_input(result: dict, symptom_text: str) -> dict:
+    # 캐시된 dict 는 공유하므로 얕은 복사 (호출하는 쪽이 hypothesis_report 등을 덧붙임)
+    return {**result, "input_symptom": symptom_text}
+
+
+def _cached_exact(symptom_text: str, params: tuple):
+    _refresh_index_version()
+    key = _state.result_cache.key(symptom_text, params)
+    cached = _state.result_cache.get_exact(key)
+    return key, (None if cached is None else _with_input(cached, symptom_text))
+
+
+def _cached_semantic(symptom_text: str, query_vec, params: tuple):
+    cached = _state.result_cache.get_semantic(query_vec, params)
+    if cached is None:
+        _state.result_cache.count_miss()
+        return None
+    return _with_input(cached, symptom_text)
+
+
+def _cache_result(key, query_vec, params: tuple, result: dict) -> dict:
+    _state.result_cache.put(key, query_vec, params, result)
+    return dict(result)
+
+
+def _search_params(top_k: int, diag_top_n: int, mode: str, coarse_n: int = None) -> tuple:
+    """검색 파라미터 (결과 캐시 키에도 들어간다) / centroid 가 없으면 hierarchical → flat"""
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"알 수 없는 검색 mode: {mode} (가능: {', '.join(RETRIEVAL_MODES)})")
+    if mode == "hierarchical" and _state.centroids is not None:
+        return (top_k, diag_top_n, mode, coarse_n or HIERARCHICAL_DISORDERS)
+    return (top_k, diag_top_n, "flat", None)
+
+
+def _search_hits(query_vec, top_k: int, mode: str, coarse_n: int):
+    if mode == "hierarchical":
+        from rag.disorder_centroids import coarse_to_fine_search
+
+        hits, _ = coarse_to_fine_search(_state.index, _state.centroids, query_vec, top_k, coarse_n)
+        return hits
+    return _state.index.search(query_vec, k=top_k)
+
+
+def _candidates_from_vector(symptom_text: str, query_vec, top_k: int, diag_top_n: int,
+                            mode: str = "flat", coarse_n: int = None):
     # 1) 증상 기반 문단 검색
-    hits = _db.similarity_search(symptom_text, k=top_k)
+    hits = _search_hits(query_vec, top_k, mode, coarse_n)
+    return _candidates_from_hits(symptom_text, hits, diag_top_n, get_criteria)
 
+
+def _candidates_from_hits(symptom_text: str, hits, diag_top_n: int, criteria_lookup):
     # 2) disorder 투표
     diags = [
         h.metadata.get("disorder")
@@ -44,46 +508,112 @@ def retrieve_candidates(symptom_text: str, top_k: int = 12, diag_top_n: int = 3)
         ],
     }
 
-    # 3) 각 disorder에 대해 기준문단 가져오기
+    # 3) 각 disorder에 대해 기준문단 가져오기 (빌드 때 만든 테이블 → 없으면 검색)
     for diag in top_diags:
-        raw = _db.similarity_search(
-            "diagnostic criteria",
-            k=200,
-            filter={"disorder": diag},
-        )
+        result["by_diagnosis"][diag] = criteria_lookup(diag)
 
-        # section == "criteria" 만 뽑기
-        criteria_docs = [
-            r for r in raw
-            if r.metadata.get("section") == "criteria"
-        ]
+    return result
 
-        # 🔥 여기서 가장 긴 기준 문단 하나만 남긴다
-        if criteria_docs:
-            longest = max(
-                criteria_docs,
-                key=lambda d: len(d.page_content or "")
-            )
-            result["by_diagnosis"][diag] = [
-                {
-                    "text": longest.page_content,
-                    "metadata": longest.metadata,
-                }
-            ]
-        else:
-            result["by_diagnosis"][diag] = []
 
-    return result
+def embed_queries_batch(texts):
+    """쿼리 여러 개를 한 번의 forward 로 임베딩 (같은 텍스트는 한 번만)"""
+    _require_ready()
+    unique = list(dict.fromkeys(texts))
+    vectors = dict(zip(unique, _state.embeddings.embed_queries(unique)))
+    return [_check_query_dim(vectors[t]) for t in texts]
+
+
+def _batch_candidates(items, query_vecs):
+    """
+    items: [(symptom_text, top_k, diag_top_n, mode, coarse_n), ...]
+    flat 검색은 한 번에 (search_many), 계층 검색은 항목별 (병명 필터가 다름)
+    criteria 는 병명별로 한 번만 조회
+    """
+    params = [_search_params(*item[1:]) for item in items]
+    flat = [i for i, p in enumerate(params) if p[2] == "flat"]
+    hits_list = [None] * len(items)
+    if flat:
+        flat_hits = _state.index.search_many([query_vecs[i] for i in flat], [params[i][0] for i in flat])
+        for i, hits in zip(flat, flat_hits):
+            hits_list[i] = hits
+    for i, (top_k, _, mode, coarse_n) in enumerate(params):
+        if mode != "flat":
+            hits_list[i] = _search_hits(query_vecs[i], top_k, mode, coarse_n)
+    criteria = {}
+
+    def lookup(diag):
+        if diag not in criteria:
+            criteria[diag] = get_criteria(diag)
+        return criteria[diag]
+
+    return [
+        _candidates_from_hits(item[0], hits, item[2], lookup)
+        for item, hits in zip(items, hits_list)
+    ]
+
+
+def retrieve_candidates_batch(items):
+    """retrieve_candidates 여러 개 (결과는 입력 순서대로)"""
+    return _batch_candidates(items, embed_queries_batch([item[0] for item in items]))
+
+
+async def retrieve_candidates_batch_async(items, deadline: Deadline):
+    _require_ready()
+    query_vecs = await run_blocking(
+        _state.bulk_executor, deadline, embed_queries_batch, [item[0] for item in items],
+    )
+    return await run_blocking(_state.search_executor, deadline, _batch_candidates, items, query_vecs)
 
 
 def retrieve_solution(diagnosis: str):
     """
-    확정 질환명의 설명/관련 문단을 다시 검색
+    확정 질환명의 설명/관련 문단 (미리 계산한 테이블 → 없는 병명만 다시 검색)
+    """
+    _require_ready()
+    canonical = resolve_disorder(diagnosis)
+    result = _solution_from_table(canonical)
+    if result is None:
+        result = _solution_from_vector(canonical, embed_query(SOLUTION_QUERY_TEMPLATE.format(canonical)))
+    return _with_requested(result, diagnosis)
+
+
+async def retrieve_solution_async(diagnosis: str, deadline: Deadline):
+    _require_ready()
+    canonical = resolve_disorder(diagnosis)
+    result = _solution_from_table(canonical)
+    if result is None:
+        query_vec = await embed_query_async(SOLUTION_QUERY_TEMPLATE.format(canonical), deadline)
+        result = await run_blocking(
+            _state.search_executor, deadline, _solution_from_vector, canonical, query_vec,
+        )
+    return _with_requested(result, diagnosis)
+
+
+def _with_requested(result: dict, requested: str) -> dict:
+    """
+    정식 병명으로 바꿔서 찾았으면 요청한 이름도 같이 돌려준다
+    상위 분류 이름 ("불안장애" 등) / specifier 만 다른 병명 등 정식 병명 하나로 정할 수 없으면 ambiguous 표시
+    (다른 병명으로 바꾸지 않으므로 evidence 없음)
     """
-    hits = _db.similarity_search(
-        f"information about {diagnosis}",
-        k=5,
-        filter={"disorder": diagnosis},
+    if result["diagnosis"] != requested:
+        result["requested_diagnosis"] = requested
+    if _state.name_index is not None and _state.name_index.is_ambiguous(requested):
+        result["ambiguous"] = True
+    return result
+
+
+def _solution_from_table(diagnosis: str):
+    evidence = _state.solution_table.get(diagnosis)
+    if evidence is None:
+        return None
+    return {"diagnosis": diagnosis, "evidence": evidence}
+
+
+def _solution_from_vector(diagnosis: str, query_vec):
+    hits = _state.index.search(
+        query_vec,
+        k=SOLUTION_TOP_K,
+        where={"disorder": diagnosis},
     )
     return {
         "diagnosis": diagnosis,
@@ -91,3 +621,14 @@ def retrieve_solution(diagnosis: str):
             {"text": h.page_content, "metadata": h.metadata} for h in hits
         ],
     }
+
+
+def get_stats():
+    """캐시 히트/미스 카운터"""
+    _require_ready()
+    return {
+        "embedding_cache": _state.embeddings.stats(),
+        "embedding_batcher": _state.batcher.stats(),
+        "result_cache": _state.result_cache.stats(),
+        "disorder_names": _state.name_index.stats(),
+    }
@@ -0,0 +1,94 @@
+# api/responses.py
+# 응답 크기 / 직렬화 비용 줄이기
+# - 필드 선택: include=raw_hits,criteria,input (없으면 전부 = 기존 응답과 같음)
+# - 미리보기: preview / criteria_preview 글자 수로 본문 자르기
+# - 빠른 JSON: orjson 이 있으면 orjson 으로 직렬화, dict 를 그대로 넘겨 jsonable_encoder 를 건너뜀
+#   (gzip 압축은 main.py 의 GZipMiddleware 가 Accept-Encoding 을 보고 처리)
+
+import json
+from typing import Optional
+
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:   # orjson 이 없으면 기본 JSON 인코더
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """dict 를 그대로 받아 orjson 으로 직렬화 (orjson 이 없으면 JSONResponse 와 같음)"""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    스트리밍이 끝나면 release() 를 반드시 호출 (limiter 슬롯 등)
+    클라이언트가 끊기거나 전송이 실패해서 본문 generator 가 시작조차 안 된 경우도 포함
+    (generator 의 finally 만으로는 시작 안 된 generator 가 정리되지 않음), release 는 여러 번 불려도 되어야 함
+    """
+
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._release()
+
+
+# /rag/hypothesis 에서 고를 수 있는 부분 (후보 병명 / hypothesis_report 는 항상 포함)
+HYPOTHESIS_FIELDS = ("raw_hits", "criteria", "input")
+
+
+def parse_include(value: Optional[str]) -> frozenset:
+    """include 쿼리 파라미터 → 필드 집합 (None 이면 전부, 빈 문자열이면 병명만)"""
+    if value is None:
+        return frozenset(HYPOTHESIS_FIELDS)
+    fields = frozenset(f.strip() for f in value.split(",") if f.strip())
+    unknown = fields - set(HYPOTHESIS_FIELDS)
+    if unknown:
+        raise ValueError(f"알 수 없는 include 필드: {', '.join(sorted(unknown))} "
+                         f"(가능: {', '.join(HYPOTHESIS_FIELDS)})")
+    return fields
+
+
+def _passage(item: dict, chars: Optional[int]) -> dict:
+    text = item["text"] or ""
+    if chars is None or len(text) <= chars:
+        return item
+    return {"text": text[:chars], "metadata": item["metadata"], "truncated": True, "length": len(text)}
+
+
+def project_hypothesis(data: dict, include: frozenset, preview: Optional[int] = None,
+                       criteria_preview: Optional[int] = None) -> dict:
+    """
+    retrieve_candidates 결과 → 요청한 필드만 남긴 새 dict
+    (criteria 항목은 테이블과 공유하는 객체이므로 고치지 않고 새로 만든다)
+    """
+    out = {"diagnosis_candidates": data["diagnosis_candidates"]}
+    if "input" in include:
+        out["input_symptom"] = data["input_symptom"]
+    if "criteria" in include:
+        out["by_diagnosis"] = {
+            diag: [_passage(item, criteria_preview) for item in items]
+            for diag, items in data["by_diagnosis"].items()
+        }
+    if "raw_hits" in include:
+        out["raw_hits"] = [_passage(item, preview) for item in data["raw_hits"]]
+    if "hypothesis_report" in data:
+        out["hypothesis_report"] = data["hypothesis_report"]
+    return out
+
+
+def dumps_line(obj) -> bytes:
+    """NDJSON 한 줄"""
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
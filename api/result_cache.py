@@ -0,0 +1,156 @@
+# api/result_cache.py
+# retrieve_candidates 결과 캐시 (2단계)
+# 1) exact: 정규화한 텍스트 + 파라미터가 같으면 임베딩 전에 바로 반환 (LRU)
+# 2) semantic: 쿼리 임베딩의 cosine 유사도가 threshold 이상인 이전 결과 재사용 (파라미터가 같을 때만)
+# - 두 단계 모두 TTL + 개수 상한
+# - 인덱스 버전(스냅샷 / 매니페스트)이 바뀌면 전부 비운다
+
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """NFKC + 소문자 + 공백 정리 (재시도 / 세션 재시작 때 생기는 사소한 차이 무시)"""
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", text or "").casefold()).strip()
+
+
+class ResultCache:
+    def __init__(self, max_items: int = 1024, ttl_s: float = 600.0,
+                 semantic_threshold: float = None, semantic_items: int = 1024):
+        self.max_items = max_items
+        self.ttl = ttl_s
+        self.threshold = semantic_threshold
+        self.semantic_items = semantic_items if semantic_threshold else 0
+        self._lock = threading.Lock()
+        self.version = None
+
+        # exact: key -> (만료 시각, 결과)
+        self._exact = OrderedDict()
+        # semantic: 고정 크기 배열 (정규화된 벡터 행렬 + 슬롯별 파라미터 / 만료 / 마지막 사용 시각 / 결과)
+        self._vectors = None
+        self._params = [None] * self.semantic_items
+        self._values = [None] * self.semantic_items
+        self._expires = np.zeros(self.semantic_items)
+        self._used = np.zeros(self.semantic_items)
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 0
+
+    def key(self, text: str, params: tuple):
+        return (normalize_text(text),) + tuple(params)
+
+    # ---------- 인덱스 버전 ----------
+    def check_version(self, version):
+        """인덱스가 다시 빌드됐으면 (버전이 바뀌었으면) 캐시를 비운다"""
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is not None:
+                self.invalidations += 1
+                print(f"[ResultCache] 인덱스가 바뀌었습니다 → 결과 캐시 비움 ({self.version} → {version})")
+            self.version = version
+            self._exact.clear()
+            self._params = [None] * self.semantic_items
+            self._values = [None] * self.semantic_items
+            self._expires[:] = 0
+
+    # ---------- 조회 ----------
+    def get_exact(self, key):
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < now:
+                del self._exact[key]
+                return None
+            self._exact.move_to_end(key)
+            self.exact_hits += 1
+            return value
+
+    def get_semantic(self, vec, params: tuple):
+        """cosine >= threshold 인 가장 가까운 결과 (같은 파라미터, 만료 안 된 것만)"""
+        if not self.semantic_items or self._vectors is None:
+            return None
+        q = np.asarray(vec, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        now = time.monotonic()
+        with self._lock:
+            live = np.flatnonzero(self._expires >= now)
+            live = [i for i in live if self._params[i] == tuple(params)]
+            if live:
+                sims = self._vectors[live] @ q
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    slot = live[best]
+                    self._used[slot] = now
+                    self.semantic_hits += 1
+                    return self._values[slot]
+            return None
+
+    def count_miss(self):
+        """exact / semantic 둘 다 없어서 새로 계산한 경우"""
+        with self._lock:
+            self.misses += 1
+
+    # ---------- 저장 ----------
+    def put(self, key, vec, params: tuple, value):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._exact[key] = (now + self.ttl, value)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_items:
+                self._exact.popitem(last=False)
+                self.evictions += 1
+
+            if not self.semantic_items or vec is None:
+                return
+            q = np.asarray(vec, dtype=np.float32)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.semantic_items, len(q)), dtype=np.float32)
+            # 빈 슬롯(만료 포함) → 없으면 가장 오래 안 쓴 슬롯
+            free = np.flatnonzero(self._expires < now)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._used))
+                self.evictions += 1
+            self._vectors[slot] = q / max(float(np.linalg.norm(q)), 1e-12)
+            self._params[slot] = tuple(params)
+            self._values[slot] = value
+            self._expires[slot] = now + self.ttl
+            self._used[slot] = now
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "exact_items": len(self._exact),
+                "semantic_items": int((self._expires >= time.monotonic()).sum()),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "index_version": self.version,
+            }
@@ -0,0 +1,77 @@
+# api/serve.py
+# 멀티 워커 실행기
+#
+#   python api/serve.py --workers 4            # 워커마다 모델 / 인덱스를 따로 올림 (기존 방식)
+#   python api/serve.py --workers 4 --shared   # 공유 서빙 모드
+#
+# 공유 서빙 모드 (--shared)
+# - 임베딩 모델은 추론 프로세스 하나(rag/embedding_server.py)에만 올리고, 워커들은 Unix 소켓으로 요청
+# - 벡터는 memmap 스냅샷(VECTOR_BACKEND = "memmap") → 모든 워커가 OS page cache 의 같은 페이지를 읽음
+# → 워커 수가 늘어도 메모리는 워커당 파이썬 + FastAPI 정도만 늘어난다
+
+import os, sys
+import time
+import argparse
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from rag.config import EMBEDDING_SERVER_SOCKET, EMBEDDING_SERVER_CONNECT_TIMEOUT_S
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_embedding_server(socket_path: str) -> subprocess.Popen:
+    """추론 프로세스를 띄우고 소켓이 응답할 때까지 기다린다"""
+    from rag.embedding_server import RemoteEmbeddings
+
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "rag", "embedding_server.py"), "--socket", socket_path],
+        cwd=ROOT,
+    )
+    deadline = time.monotonic() + EMBEDDING_SERVER_CONNECT_TIMEOUT_S
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError(f"임베딩 서버가 종료되었습니다 (exit {proc.returncode})")
+        try:
+            RemoteEmbeddings(socket_path, connect_timeout=0)
+            return proc
+        except ConnectionError:
+            if time.monotonic() > deadline:
+                proc.terminate()
+                raise
+            time.sleep(0.5)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DSM RAG API 실행")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--shared", action="store_true",
+                        help="공유 추론 프로세스 + memmap 벡터 스냅샷")
+    parser.add_argument("--socket", default=EMBEDDING_SERVER_SOCKET)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    server_proc = None
+    if args.shared:
+        # 워커 프로세스는 이 환경변수로 rag/config.py 의 백엔드 설정을 받는다
+        os.environ["RAG_EMBEDDING_BACKEND"] = "remote"
+        os.environ["RAG_VECTOR_BACKEND"] = "memmap"
+        os.environ["RAG_EMBEDDING_SERVER_SOCKET"] = args.socket
+        print(f"[Serve] 임베딩 서버 시작 중... ({args.socket})")
+        server_proc = start_embedding_server(args.socket)
+
+    try:
+        os.chdir(ROOT)
+        uvicorn.run("api.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        if server_proc is not None:
+            server_proc.terminate()
+            server_proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
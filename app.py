@@ -2,7 +2,7 @@
 AI 상담 프로토타입 메인 애플리케이션
 """
 import streamlit as st
-from frontend.config import check_api_key
+from frontend.config import check_api_key, STREAM_RESPONSES
 from frontend.ui_components import (
     setup_page_config,
     render_sidebar,
@@ -41,6 +41,15 @@ if user_input:
     # AI 응답 생성 및 표시
     # process_user_input 내부에서 이미 시스템 태그가 제거된 응답을 반환함
     with st.chat_message("assistant"):
-        with st.spinner("답변을 생성하는 중..."):
-            response = process_user_input(user_input)
-            st.markdown(response)
+        if STREAM_RESPONSES:
+            # 첫 토큰이 오면 바로 말풍선에 이어서 표시 (내부 데이터는 파서가 걸러냄)
+            placeholder = st.empty()
+            placeholder.markdown("답변을 생성하는 중...")
+            response = process_user_input(
+                user_input, on_text=lambda text: placeholder.markdown(text + "▌")
+            )
+            placeholder.markdown(response)
+        else:
+            with st.spinner("답변을 생성하는 중..."):
+                response = process_user_input(user_input)
+                st.markdown(response)
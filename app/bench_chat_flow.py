@@ -0,0 +1,143 @@
+# app/bench_chat_flow.py
+# 4단계 상담 흐름 전체 벤치마크 (process_user_input → ask_gemini_with_stage → LLM 백엔드)
+# - 기본은 LLM_BACKEND=replay: 네트워크 / API 키 없이 녹화 응답 또는 합성 응답 + 지연 시간 분포
+# - 세션마다 준비된 사용자 발화를 차례로 넣어서 Stage 4 응답이 나올 때까지 진행
+# - 단계별 턴 지연 시간 (p50 / p99), 스트리밍이면 첫 화면 표시까지 시간, 세션당 턴 수 / 전체 시간
+# - 단계 앞부분 캐시 (prompt_cache): 보낸 토큰 / 절약한 토큰, 캐시 사용 / 미사용 호출의 평균 지연
+#   replay 의 지연 시간은 보낸 토큰 수와 무관하므로 캐시 효과(지연)는 실제 API 로만 측정:
+#   LLM_BACKEND=gemini PROMPT_CACHE=gemini / off 로 각각 실행해서 비교
+#
+# 사용법:
+#   python app/bench_chat_flow.py --sessions 20 --latency lognormal:1.0:0.5
+#   python app/bench_chat_flow.py --sessions 50 --latency none          # 앱 쪽 오버헤드만
+#   python app/bench_chat_flow.py --stream                              # 스트리밍 경로
+#   python app/bench_chat_flow.py --prefix-cache off                    # 앞부분 캐시 없이 (비교용)
+#   LLM_BACKEND=gemini python app/bench_chat_flow.py --sessions 1       # 실제 API (할당량 사용)
+#   LLM_BACKEND=gemini python app/bench_chat_flow.py --sessions 3 --prefix-cache gemini   # 실제 캐시 효과
+
+import os, sys
+import time
+import argparse
+import warnings
+from collections import defaultdict
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+os.environ.setdefault("LLM_BACKEND", "replay")
+warnings.filterwarnings("ignore")
+
+import numpy as np
+
+USER_TURNS = [
+    "요즘 뭔가 일이 손에 안 잡혀요. 회사에서도 집에서도 그냥 다 귀찮고 재미가 없어요.",
+    "한 달? 두 달 정도 된 것 같아요. 주말에도 누워만 있고 친구들 연락도 귀찮아요.",
+    "잠은 많이 자는데 자고 일어나도 피곤하고, 밥맛도 별로 없어요.",
+    "네, 분석해 주세요.",
+    "일뿐만 아니라 취미나 친구 만나는 것도 다 재미가 없어요.",
+    "어떻게 하면 좋을까요?",
+    "고맙습니다.",
+]
+MAX_TURNS = 12
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def run_session(process_user_input, stream: bool):
+    """한 세션: Stage 4 응답이 나올 때까지 (또는 MAX_TURNS) → [(stage, 턴 시간, 첫 표시 시간), ...]"""
+    import streamlit as st
+    from frontend.chat_handler import init_chat_history
+
+    st.session_state.clear()
+    init_chat_history()
+    handler = st.session_state.stage_handler
+
+    turns = []
+    for i in range(MAX_TURNS):
+        stage = handler.get_current_stage()
+        text = USER_TURNS[min(i, len(USER_TURNS) - 1)]
+        first_shown = []
+        started = time.perf_counter()
+        if stream:
+            process_user_input(
+                text, on_text=lambda _: first_shown or first_shown.append(time.perf_counter() - started)
+            )
+        else:
+            process_user_input(text)
+        elapsed = time.perf_counter() - started
+        turns.append((stage, elapsed, first_shown[0] if first_shown else elapsed))
+        if stage == 4:
+            break
+    return turns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--latency", default=None, help="replay 지연 분포 (기본: config.LLM_REPLAY_LATENCY)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream", action="store_true", help="스트리밍 경로 (on_text) 로 측정")
+    parser.add_argument("--quiet", action="store_true", help="앱 로그 숨김")
+    parser.add_argument("--prefix-cache", default=None, help="gemini | local | off (기본: config.PROMPT_CACHE)")
+    args = parser.parse_args()
+
+    from frontend import llm_backend, prompt_cache
+    from frontend.chat_handler import process_user_input
+
+    backend = llm_backend.get_backend()
+    if args.latency is not None and isinstance(backend, llm_backend.ReplayBackend):
+        backend = llm_backend.ReplayBackend(latency=args.latency, seed=args.seed)
+        llm_backend.set_backend(backend)
+    if args.prefix_cache is not None:
+        prompt_cache.set_prefix_cache(prompt_cache.create_prefix_cache(args.prefix_cache))
+    cache = prompt_cache.get_prefix_cache()
+
+    by_stage = defaultdict(list)
+    first_by_stage = defaultdict(list)
+    session_s, session_turns, completed = [], [], 0
+    for _ in range(args.sessions):
+        stdout = sys.stdout
+        if args.quiet:
+            sys.stdout = open(os.devnull, "w")
+        try:
+            started = time.perf_counter()
+            turns = run_session(process_user_input, args.stream)
+            session_s.append(time.perf_counter() - started)
+        finally:
+            if args.quiet:
+                sys.stdout.close()
+                sys.stdout = stdout
+        session_turns.append(len(turns))
+        completed += any(stage == 4 for stage, _, _ in turns)
+        for stage, elapsed, first in turns:
+            by_stage[stage].append(elapsed * 1000)
+            first_by_stage[stage].append(first * 1000)
+
+    print(f"\n백엔드: {backend.name}, 세션 {args.sessions}개 (Stage 4 도달 {completed}개), "
+          f"스트리밍: {'예' if args.stream else '아니오'}")
+    if isinstance(backend, llm_backend.ReplayBackend):
+        print(f"지연 분포: {backend.latency.spec}, 녹화 재생 {backend.replayed}번 / 합성 {backend.synthesized}번")
+    print(f"{'stage':>5} | {'turns':>5} | {'p50 ms':>8} | {'p99 ms':>8} | {'첫 표시 p50':>10} | {'첫 표시 p99':>10}")
+    for stage in sorted(by_stage):
+        lat, first = by_stage[stage], first_by_stage[stage]
+        print(f"{stage:>5} | {len(lat):>5} | {percentile(lat, 50):>8.1f} | {percentile(lat, 99):>8.1f} | "
+              f"{percentile(first, 50):>10.1f} | {percentile(first, 99):>10.1f}")
+    print(f"세션당 턴 수 평균 {np.mean(session_turns):.1f}, 세션 시간 p50 {percentile(session_s, 50):.2f}초 "
+          f"/ p99 {percentile(session_s, 99):.2f}초")
+
+    stats = cache.stats()
+    print(f"앞부분 캐시: {stats['provider']}, 사용 {stats['hits']}번 / 미사용 {stats['misses']}번, "
+          f"등록 {stats['registered']}번")
+    print(f"입력 토큰(추정): 전체 {stats['tokens_total']}, 전송 {stats['tokens_sent']}, "
+          f"절약 {stats['tokens_saved']} ({stats['saved_ratio'] * 100:.1f}%)")
+    if isinstance(backend, llm_backend.ReplayBackend):
+        print("  (replay 지연 시간은 보낸 토큰 수와 무관 → 캐시의 지연 효과는 LLM_BACKEND=gemini 로 측정)")
+    for label, key in (("캐시 사용", "latency_cached_s"), ("캐시 미사용", "latency_uncached_s")):
+        if stats[key] is not None:
+            print(f"  {label} 호출 평균 {'TTFT' if args.stream else '응답 시간'}: {stats[key] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# app/bench_embedding_batcher.py
+# 쿼리 임베딩 처리량 비교: 요청마다 embed_query (기존) vs EmbeddingBatcher (마이크로 배칭)
+#
+# 사용법:
+#   python app/bench_embedding_batcher.py --requests 256
+
+import os, sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from rag.embeddings import get_embeddings
+from rag.config import EMBED_BATCH_MAX_SIZE, EMBED_BATCH_MAX_WAIT_MS
+from api.embedding_batcher import EmbeddingBatcher
+
+SAMPLE_SYMPTOMS = [
+    "depressed mood most of the day, loss of interest, insomnia, fatigue",
+    "obsessive thoughts, compulsive checking behaviors, anxiety",
+    "panic attacks with palpitations, sweating, fear of dying",
+    "excessive worry about work and health for more than six months",
+    "hearing voices, disorganized speech, social withdrawal",
+    "flashbacks and nightmares after a car accident, avoidance",
+    "restricting food intake, intense fear of gaining weight",
+    "inattention, hyperactivity and impulsivity since childhood",
+]
+
+
+def make_queries(n: int):
+    # 캐시 영향 없이 매번 다른 텍스트가 되도록 번호를 붙인다
+    return [f"{SAMPLE_SYMPTOMS[i % len(SAMPLE_SYMPTOMS)]} (case {i})" for i in range(n)]
+
+
+def run(embed_one, queries, concurrency: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(embed_one, queries))
+    return len(queries) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    # 캐시 없이 순수 모델 처리량만 비교
+    embeddings = get_embeddings(cache=False)
+    embeddings.embed_query("warm up")
+
+    batcher = EmbeddingBatcher(
+        embeddings.embed_documents,
+        max_batch_size=EMBED_BATCH_MAX_SIZE,
+        max_wait_ms=EMBED_BATCH_MAX_WAIT_MS,
+        max_queue=args.requests,
+        default_timeout=600,
+    )
+
+    print(f"{'clients':>8} | {'기존 req/s':>12} | {'배칭 req/s':>12} | {'배속':>6} | 평균 배치")
+    for concurrency in args.concurrency:
+        queries = make_queries(args.requests)
+        direct = run(embeddings.embed_query, queries, concurrency)
+
+        before = batcher.stats()
+        batched = run(batcher.embed, make_queries(args.requests), concurrency)
+        after = batcher.stats()
+        n_batches = after["batches"] - before["batches"]
+        avg_batch = (after["items"] - before["items"]) / n_batches if n_batches else 0.0
+
+        print(f"{concurrency:>8} | {direct:>12.1f} | {batched:>12.1f} | {batched / direct:>5.2f}x | {avg_batch:.1f}")
+
+    batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# app/bench_hierarchical_retrieval.py
+# 계층 검색 (병명 centroid → 병명 안에서 chunk top-k) vs flat 투표 비교
+# - 검색 + 투표 지연 시간 (p50 / p99), coarse_n 별
+# - flat 결과와의 일치: top-1 병명 일치율, top-n 병명 집합 겹침 비율
+#
+# 쿼리: 증상 문장 (임베딩 모델 사용) + 스냅샷 벡터에 노이즈를 더한 합성 쿼리
+#
+# 사용법 (먼저 build_dsm_db.py 또는 python rag/vector_backend.py export + python rag/disorder_centroids.py):
+#   python app/bench_hierarchical_retrieval.py --coarse 4 8 16 --k 12 --n 3 --synthetic 200
+
+import os, sys
+import time
+import argparse
+from collections import Counter
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+from rag.disorder_centroids import DisorderCentroids, coarse_to_fine_search
+from rag.vector_backend import MemmapBackend, get_vector_backend
+
+QUERIES = [
+    "depressed mood most of the day, loss of interest, insomnia, fatigue",
+    "obsessive thoughts, compulsive checking behaviors, anxiety, occupational impairment",
+    "panic attacks with palpitations, sweating, fear of dying",
+    "excessive worry about work and health for more than six months",
+    "hearing voices, disorganized speech, social withdrawal",
+    "flashbacks and nightmares after a car accident, avoidance",
+    "restricting food intake, intense fear of gaining weight",
+    "inattention, hyperactivity and impulsivity since childhood",
+    "mood swings between elevated energy and deep sadness",
+    "trouble sleeping, irritability, racing thoughts, decreased need for sleep",
+    "fear of social situations and being judged by others",
+    "repeated binge eating followed by vomiting",
+]
+
+
+def synthetic_queries(n: int, seed: int = 0) -> np.ndarray:
+    """스냅샷 벡터 + 가우시안 노이즈 (재정규화)"""
+    snapshot = MemmapBackend()
+    rng = np.random.default_rng(seed)
+    base = np.asarray(snapshot.matrix[rng.integers(0, len(snapshot), size=n)], dtype=np.float32)
+    noisy = base + rng.normal(scale=0.05, size=base.shape).astype(np.float32)
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+
+def vote(hits, n: int) -> list:
+    # api/rag_service._candidates_from_hits 와 같은 투표
+    counts = Counter(h.metadata.get("disorder") for h in hits if h.metadata.get("disorder"))
+    return [d for d, _ in counts.most_common(n)]
+
+
+def run(search, queries, n: int):
+    latencies, votes = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        hits = search(q)
+        votes.append(vote(hits, n))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies, votes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--coarse", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--n", type=int, default=3)
+    parser.add_argument("--synthetic", type=int, default=200, help="합성 쿼리 수 (0 이면 문장 쿼리만)")
+    parser.add_argument("--backend", default=None, help="chroma | memmap (기본: VECTOR_BACKEND)")
+    parser.add_argument("--no-model", action="store_true", help="문장 쿼리 생략 (임베딩 모델을 올리지 않음)")
+    args = parser.parse_args()
+
+    centroids = DisorderCentroids.load()
+    if centroids is None:
+        print("[안내] centroid 파일이 없어 스냅샷으로 만듭니다")
+        centroids = DisorderCentroids.from_snapshot()
+
+    queries = []
+    if not args.no_model:
+        from rag.embeddings import get_embeddings
+        queries += list(np.asarray(get_embeddings().embed_queries(QUERIES), dtype=np.float32))
+    if args.synthetic:
+        queries += list(synthetic_queries(args.synthetic))
+    queries = [q.tolist() for q in queries]
+
+    index = get_vector_backend(backend=args.backend)
+    index.search(queries[0], k=args.k)   # warm up
+
+    flat_lat, flat_votes = run(lambda q: index.search(q, k=args.k), queries, args.n)
+    rows = [("flat", flat_lat, 1.0, 1.0)]
+    for coarse_n in args.coarse:
+        lat, votes = run(
+            lambda q: coarse_to_fine_search(index, centroids, q, args.k, coarse_n)[0], queries, args.n,
+        )
+        top1 = np.mean([bool(a) and bool(b) and a[0] == b[0] for a, b in zip(votes, flat_votes)])
+        overlap = np.mean([
+            len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(votes, flat_votes)
+        ])
+        rows.append((f"coarse={coarse_n}", lat, top1, overlap))
+
+    print(f"\n{index.name} 백엔드, 쿼리 {len(queries)}개, k={args.k}, n={args.n}, "
+          f"병명 {len(centroids)}개 / centroid {len(centroids.vectors)}개")
+    print(f"{'mode':>11} | {'p50 ms':>7} | {'p99 ms':>7} | {'top-1 일치':>9} | top-n 겹침")
+    for name, lat, top1, overlap in rows:
+        print(f"{name:>11} | {np.percentile(lat, 50):>7.2f} | {np.percentile(lat, 99):>7.2f} | "
+              f"{top1:>9.3f} | {overlap:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# app/bench_line_grouping.py
+# group_words_to_lines (파이썬 루프) vs group_word_arrays (NumPy) 동등성 확인 + 페이지당 속도 비교
+#
+# 사용법:
+#   python app/bench_line_grouping.py                 # 레이아웃 캐시 (없으면 합성 페이지)
+#   python app/bench_line_grouping.py --synthetic 300 # 합성 페이지 300장
+
+import os, sys
+import time
+import random
+import argparse
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+from rag.config import LAYOUT_CACHE_DIR
+from rag.build_dsm_db import classify_line, group_words_to_lines, looks_like_disorder_title
+from rag.layout_cache import LayoutCache
+from rag.line_arrays import group_word_arrays
+
+
+def synthetic_pages(n_pages: int, seed: int = 0):
+    """DSM 페이지 비슷한 합성 페이지 (줄 안에서 top 이 조금씩 흔들리는 경우 포함)"""
+    rng = random.Random(seed)
+    vocab = ["Major", "Depressive", "Disorder", "A.", "B.", "1.", "2.", "symptoms", "of",
+             "the", "for", "Diagnostic", "Criteria", "F32.1", "most", "days", "or"]
+    for page_idx in range(1, n_pages + 1):
+        words, top = [], 50.0
+        for _ in range(rng.randint(30, 60)):
+            x = rng.choice([50.0, 60.0, 72.0, 380.0])
+            for j in range(rng.randint(1, 12)):
+                words.append({
+                    "text": rng.choice(vocab),
+                    "x0": x + j * 30,
+                    "x1": x + j * 30 + 25,
+                    "top": top + rng.uniform(-2.0, 2.0),
+                })
+            top += rng.choice([11.0, 12.0, 14.0])
+        yield page_idx, 612.0, words
+
+
+def as_arrays(words):
+    return (
+        [w["text"] for w in words],
+        np.fromiter((w["x0"] for w in words), dtype=np.float64, count=len(words)),
+        np.fromiter((w["x1"] for w in words), dtype=np.float64, count=len(words)),
+        np.fromiter((w["top"] for w in words), dtype=np.float64, count=len(words)),
+    )
+
+
+def check_page(width, words, fast_lines) -> bool:
+    slow_lines = group_words_to_lines(words)
+    if len(slow_lines) != len(fast_lines):
+        return False
+    for slow, fast in zip(slow_lines, fast_lines):
+        if (slow["text"], slow["x0"], slow["x1"], slow["top"]) != (
+            fast["text"], fast["x0"], fast["x1"], fast["top"]
+        ):
+            return False
+        expected_flags = classify_line(slow["text"].strip(), slow["x0"], slow["x1"], width)
+        if tuple(expected_flags) != fast["flags"]:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="합성 페이지 수 (0이면 레이아웃 캐시 사용)")
+    args = parser.parse_args()
+
+    if args.synthetic or not os.path.exists(os.path.join(LAYOUT_CACHE_DIR, "meta.json")):
+        pages = list(synthetic_pages(args.synthetic or 300))
+        source = f"합성 페이지 {len(pages)}장"
+    else:
+        pages = list(LayoutCache.open(LAYOUT_CACHE_DIR).iter_pages())
+        source = f"레이아웃 캐시 {len(pages)}장"
+    page_arrays = [(width, as_arrays(words)) for _, width, words in pages]
+
+    # 1) 동등성
+    mismatches = [
+        page_idx
+        for (page_idx, width, words), (_, arrays) in zip(pages, page_arrays)
+        if not check_page(width, words, group_word_arrays(*arrays, width, looks_like_disorder_title))
+    ]
+    print(f"=== {source} ===")
+    if mismatches:
+        print(f"[불일치] {len(mismatches)}페이지: {mismatches[:20]}")
+        sys.exit(1)
+    print("[동등성] 모든 페이지에서 줄 text/x0/x1/top/종류 일치")
+
+    # 2) 속도 (줄 묶기 + 줄 종류 판정까지)
+    started = time.perf_counter()
+    for _, width, words in pages:
+        for line in group_words_to_lines(words):
+            text = line["text"].strip()
+            classify_line(text, line["x0"], line["x1"], width)
+    slow = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for width, arrays in page_arrays:
+        group_word_arrays(*arrays, width, looks_like_disorder_title)
+    fast = time.perf_counter() - started
+
+    n = len(pages)
+    print(f"[속도] 파이썬 루프: {slow / n * 1e3:.3f} ms/page")
+    print(f"[속도] NumPy     : {fast / n * 1e3:.3f} ms/page")
+    print(f"[속도] {slow / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# app/bench_matryoshka_recall.py
+# Matryoshka 차원 축소 recall 측정
+# - 전체 차원 인덱스의 벡터를 앞쪽 N차원으로 잘라(재정규화) 같은 쿼리로 검색
+# - chunk recall@k (전체 차원 top-k 와 겹치는 비율)
+# - disorder 투표 결과 (retrieve_candidates 의 top-n 병명) 가 전체 차원과 얼마나 같은지
+#
+# 사용법 (EMBEDDING_DIM = None 으로 빌드한 전체 차원 인덱스가 있어야 함):
+#   python app/bench_matryoshka_recall.py --dims 128 256 512 --k 12 --n 3
+
+import os, sys
+import argparse
+from collections import Counter
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+
+from rag.config import CHROMA_DIR, DSM_COLLECTION_NAME, EMBEDDING_FULL_DIM
+from rag.embeddings import get_embeddings, truncate_vectors
+
+QUERIES = [
+    "depressed mood most of the day, loss of interest, insomnia, fatigue",
+    "obsessive thoughts, compulsive checking behaviors, anxiety, occupational impairment",
+    "panic attacks with palpitations, sweating, fear of dying",
+    "excessive worry about work and health for more than six months",
+    "hearing voices, disorganized speech, social withdrawal",
+    "flashbacks and nightmares after a car accident, avoidance",
+    "restricting food intake, intense fear of gaining weight",
+    "inattention, hyperactivity and impulsivity since childhood",
+    "mood swings between elevated energy and deep sadness",
+    "trouble sleeping, irritability, racing thoughts, decreased need for sleep",
+    "fear of social situations and being judged by others",
+    "repeated binge eating followed by vomiting",
+]
+
+
+def top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    # 정규화된 벡터이므로 L2 거리 순서 == 내적 내림차순
+    scores = matrix @ query
+    idx = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def vote(disorders, idx, n: int):
+    counts = Counter(disorders[i] for i in idx if disorders[i])
+    return [d for d, _ in counts.most_common(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 256, 512])
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--n", type=int, default=3)
+    args = parser.parse_args()
+
+    db = Chroma(persist_directory=CHROMA_DIR, collection_name=DSM_COLLECTION_NAME)
+    data = db._collection.get(include=["embeddings", "metadatas"])
+    full = np.asarray(data["embeddings"], dtype=np.float32)
+    if full.shape[1] != EMBEDDING_FULL_DIM:
+        print(f"전체 차원 인덱스가 아닙니다 (차원 {full.shape[1]}) → EMBEDDING_DIM = None 으로 다시 빌드하세요")
+        return
+    disorders = [m.get("disorder") for m in data["metadatas"]]
+
+    # 쿼리는 자르지 않은 전체 차원으로 한 번만 계산
+    embeddings = get_embeddings(dim=0)
+    queries = np.asarray([embeddings.embed_query(q) for q in QUERIES], dtype=np.float32)
+
+    full_n = truncate_vectors(full, EMBEDDING_FULL_DIM)
+    queries_n = truncate_vectors(queries, EMBEDDING_FULL_DIM)
+    reference = [top_k(full_n, q, args.k) for q in queries_n]
+    reference_votes = [vote(disorders, idx, args.n) for idx in reference]
+
+    print(f"chunk {len(full)}개, 쿼리 {len(QUERIES)}개, k={args.k}, n={args.n}")
+    print(f"{'dim':>5} | {'chunk recall@k':>14} | {'병명 recall@n':>12} | {'1순위 일치':>9} | {'순서까지 일치':>10}")
+    for dim in list(args.dims) + [EMBEDDING_FULL_DIM]:
+        matrix = truncate_vectors(full, dim)
+        qs = truncate_vectors(queries, dim)
+        chunk_recall, diag_recall, top1, exact = [], [], [], []
+        for q, ref_idx, ref_vote in zip(qs, reference, reference_votes):
+            idx = top_k(matrix, q, args.k)
+            votes = vote(disorders, idx, args.n)
+            chunk_recall.append(len(set(idx) & set(ref_idx)) / args.k)
+            diag_recall.append(len(set(votes) & set(ref_vote)) / max(len(ref_vote), 1))
+            top1.append(bool(votes) and bool(ref_vote) and votes[0] == ref_vote[0])
+            exact.append(votes == ref_vote)
+        print(f"{dim:>5} | {np.mean(chunk_recall):>14.3f} | {np.mean(diag_recall):>12.3f} | "
+              f"{np.mean(top1):>9.3f} | {np.mean(exact):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# app/bench_onnx_embeddings.py
+# 임베딩 백엔드 비교: HuggingFace fp32 (기준) vs ONNX fp32 vs ONNX int8
+# - 쿼리 지연 시간 (p50 / p95), 프로세스 최대 RSS
+# - DSM 컬렉션에서 top-k 검색 결과가 기준과 얼마나 겹치는지
+# - 세 백엔드 모두 get_embeddings 와 같이 EMBEDDING_DIM 으로 자른 벡터 (인덱스 차원과 같아야 검색 가능)
+#
+# 사용법 (먼저 python rag/onnx_embeddings.py export):
+#   python app/bench_onnx_embeddings.py --k 12
+
+import os, sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+BACKENDS = ["hf", "onnx-fp32", "onnx-int8"]
+
+QUERIES = [
+    "depressed mood most of the day, loss of interest, insomnia, fatigue",
+    "obsessive thoughts, compulsive checking behaviors, anxiety, occupational impairment",
+    "panic attacks with palpitations, sweating, fear of dying",
+    "excessive worry about work and health for more than six months",
+    "hearing voices, disorganized speech, social withdrawal",
+    "flashbacks and nightmares after a car accident, avoidance",
+    "restricting food intake, intense fear of gaining weight",
+    "inattention, hyperactivity and impulsivity since childhood",
+    "diagnostic criteria",
+    "information about Major Depressive Disorder",
+]
+
+
+def load_backend(name: str):
+    """캐시 없이 백엔드 하나 (차원 자르기는 get_embeddings 와 같은 조건)"""
+    from rag.config import EMBEDDING_DIM, EMBEDDING_FULL_DIM
+    from rag.embeddings import TruncatedEmbeddings
+
+    if name == "hf":
+        from rag.embeddings import _load_base
+        embeddings = _load_base("hf")
+    else:
+        from rag.onnx_embeddings import OnnxEmbeddings
+        embeddings = OnnxEmbeddings(quantized=(name == "onnx-int8"))
+    if EMBEDDING_DIM and EMBEDDING_DIM < EMBEDDING_FULL_DIM:
+        embeddings = TruncatedEmbeddings(embeddings, EMBEDDING_DIM)
+    return embeddings
+
+
+def worker(name: str, out_path: str, repeats: int):
+    """백엔드 하나만 올린 별도 프로세스에서 측정 (RSS 가 섞이지 않도록)"""
+    started = time.perf_counter()
+    embeddings = load_backend(name)
+    load_s = time.perf_counter() - started
+    embeddings.embed_query("warm up")
+
+    latencies = []
+    for _ in range(repeats):
+        for q in QUERIES:
+            t0 = time.perf_counter()
+            embeddings.embed_query(q)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    vectors = np.asarray([embeddings.embed_query(q) for q in QUERIES], dtype=np.float32)
+    np.save(out_path + ".npy", vectors)
+    with open(out_path + ".json", "w", encoding="utf-8") as f:
+        json.dump({
+            "load_s": load_s,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }, f)
+
+
+def search_keys(db, vectors, k: int):
+    return [
+        [
+            (d.metadata.get("disorder"), d.metadata.get("page"), d.page_content[:80])
+            for d in db.similarity_search_by_vector(vec.tolist(), k=k)
+        ]
+        for vec in vectors
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.out, args.repeats)
+        return
+
+    from langchain_community.vectorstores import Chroma
+    from rag.config import CHROMA_DIR, DSM_COLLECTION_NAME
+    from rag.embeddings import check_index_dimension
+
+    # 인덱스 차원과 쿼리 차원(EMBEDDING_DIM)이 다르면 측정하지 않는다 (rag_service 와 같은 검사)
+    db = Chroma(persist_directory=CHROMA_DIR, collection_name=DSM_COLLECTION_NAME)
+    check_index_dimension(db._collection.metadata)
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_onnx_")
+    results = {}
+    for name in args.backends:
+        out = os.path.join(tmp_dir, name)
+        print(f"[측정] {name} ...")
+        subprocess.run(
+            [sys.executable, __file__, "--worker", name, "--out", out, "--repeats", str(args.repeats)],
+            check=True,
+        )
+        with open(out + ".json", "r", encoding="utf-8") as f:
+            results[name] = json.load(f)
+        results[name]["vectors"] = np.load(out + ".npy")
+
+    baseline_name = args.backends[0]
+    baseline = search_keys(db, results[baseline_name]["vectors"], args.k)
+
+    print(f"\n기준: {baseline_name}, top-{args.k} overlap (쿼리 {len(QUERIES)}개 평균)")
+    print(f"{'backend':>10} | {'load s':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'RSS MB':>7} | {'cos':>6} | overlap")
+    for name in args.backends:
+        r = results[name]
+        hits = search_keys(db, r["vectors"], args.k)
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(hits, baseline)])
+        base_vecs = results[baseline_name]["vectors"]
+        cos = np.mean(
+            np.sum(r["vectors"] * base_vecs, axis=1)
+            / (np.linalg.norm(r["vectors"], axis=1) * np.linalg.norm(base_vecs, axis=1))
+        )
+        print(f"{name:>10} | {r['load_s']:>7.1f} | {r['p50_ms']:>7.1f} | {r['p95_ms']:>7.1f} | "
+              f"{r['max_rss_mb']:>7.0f} | {cos:>6.4f} | {overlap:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# app/bench_response_size.py
+# /rag/hypothesis 응답 크기와 직렬화 시간 비교
+# - before: 전체 응답 dict → FastAPI 기본 경로 (jsonable_encoder + JSONResponse)
+# - after : 필드 선택 / 미리보기 + FastJSONResponse (orjson 이 있으면 orjson)
+# - 바이트는 원본과 gzip 둘 다
+#
+# 응답은 memmap 스냅샷(있으면)의 실제 chunk 로 만들고, 없으면 비슷한 길이의 가짜 텍스트로 만든다
+#
+# 사용법:
+#   python app/bench_response_size.py --repeats 2000
+
+import os, sys
+import gzip
+import time
+import random
+import argparse
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api.responses import FastJSONResponse, orjson, parse_include, project_hypothesis
+
+MODES = [
+    # (이름, include, preview, criteria_preview)
+    ("full (기존)", None, None, None),
+    ("include=criteria", "criteria", None, None),
+    ("include=criteria, criteria_preview=600", "criteria", None, 600),
+    ("include=raw_hits,criteria, preview=200", "raw_hits,criteria", 200, None),
+    ("include= (병명만)", "", None, None),
+]
+
+
+def sample_passages(n: int):
+    """(text, metadata) n개: 스냅샷에서 뽑거나 가짜로 만든다"""
+    try:
+        from rag.vector_backend import MemmapBackend
+        snapshot = MemmapBackend()
+        rows = random.Random(0).sample(range(len(snapshot)), min(n, len(snapshot)))
+        return [snapshot._row_strings(r) for r in rows]
+    except (FileNotFoundError, ValueError):
+        words = "persistent depressed mood anhedonia sleep disturbance fatigue criterion".split()
+        rng = random.Random(0)
+        return [
+            (" ".join(rng.choice(words) for _ in range(rng.randint(150, 300))),
+             {"page": rng.randint(1, 900), "disorder": f"Disorder {i % 5}", "section": "description",
+              "is_criteria": False})
+            for i in range(n)
+        ]
+
+
+def make_response(top_k: int = 12, diag_top_n: int = 3) -> dict:
+    passages = sample_passages(top_k + diag_top_n)
+    hits = [{"text": t, "metadata": m} for t, m in passages[:top_k]]
+    crit = passages[top_k:]
+    diags = [f"Disorder {i}" for i in range(diag_top_n)]
+    return {
+        "input_symptom": "지난 두 달 동안 거의 매일 우울하고 잠을 잘 못 자며 ... " * 8,
+        "diagnosis_candidates": diags,
+        "by_diagnosis": {d: [{"text": t * 2, "metadata": m}] for d, (t, m) in zip(diags, crit)},
+        "raw_hits": hits,
+        "hypothesis_report": "Top DSM candidates: " + ", ".join(diags),
+    }
+
+
+def timed(fn, repeats: int):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        body = fn()
+    return (time.perf_counter() - started) / repeats * 1e6, body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    data = make_response()
+    print(f"직렬화: {'orjson' if orjson else 'json'}, 반복 {args.repeats}회")
+    print(f"{'mode':<42} | {'bytes':>7} | {'gzip':>6} | {'us/req':>7}")
+
+    us, body = timed(lambda: JSONResponse(jsonable_encoder(data)).body, args.repeats)
+    print(f"{'before: ' + MODES[0][0]:<42} | {len(body):>7} | {len(gzip.compress(body)):>6} | {us:>7.1f}")
+
+    for name, include, preview, criteria_preview in MODES:
+        fields = parse_include(include)
+        us, body = timed(
+            lambda: FastJSONResponse(project_hypothesis(data, fields, preview, criteria_preview)).body,
+            args.repeats,
+        )
+        print(f"{'after: ' + name:<42} | {len(body):>7} | {len(gzip.compress(body)):>6} | {us:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# app/bench_vector_backend.py
+# 벡터 검색 백엔드 비교: Chroma vs memmap 스냅샷
+# - 검색 지연 시간 (p50 / p99): 필터 없는 top-k, disorder 필터 top-k
+# - 프로세스 최대 RSS (백엔드마다 별도 프로세스)
+# - top-k 결과가 Chroma 와 얼마나 겹치는지
+#
+# 쿼리 벡터는 인덱스에 있는 벡터에 노이즈를 더해서 만든다 (임베딩 모델을 올리지 않음)
+#
+# 사용법 (먼저 build_dsm_db.py 또는 python rag/vector_backend.py export):
+#   python app/bench_vector_backend.py --k 12 --queries 200
+
+import os, sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+BACKENDS = ["chroma", "memmap"]
+
+
+def make_queries(n: int, seed: int = 0):
+    """스냅샷 벡터 + 가우시안 노이즈 (재정규화) / 필터용 disorder 목록"""
+    from rag.vector_backend import MemmapBackend
+
+    snapshot = MemmapBackend()
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(snapshot), size=n)
+    base = np.asarray(snapshot.matrix[rows], dtype=np.float32)
+    noisy = base + rng.normal(scale=0.05, size=base.shape).astype(np.float32)
+    noisy /= np.linalg.norm(noisy, axis=1, keepdims=True)
+    disorders = [snapshot.disorder_names[i] if i >= 0 else None for i in snapshot.disorder_id[rows]]
+    return noisy, disorders
+
+
+def percentiles(latencies):
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def worker(name: str, query_path: str, out_path: str, k: int):
+    """백엔드 하나만 올린 별도 프로세스에서 측정 (RSS 가 섞이지 않도록)"""
+    from rag.vector_backend import get_vector_backend
+
+    with open(query_path + ".json", "r", encoding="utf-8") as f:
+        disorders = json.load(f)
+    queries = np.load(query_path + ".npy").tolist()
+
+    started = time.perf_counter()
+    index = get_vector_backend(backend=name)
+    load_s = time.perf_counter() - started
+    index.search(queries[0], k=k)   # warm up
+
+    plain, filtered, hits = [], [], []
+    for q, diag in zip(queries, disorders):
+        t0 = time.perf_counter()
+        docs = index.search(q, k=k)
+        plain.append((time.perf_counter() - t0) * 1000)
+        hits.append([(d.metadata.get("disorder"), d.metadata.get("page"), d.page_content[:80]) for d in docs])
+
+        if diag:
+            t0 = time.perf_counter()
+            index.search(q, k=k, where={"disorder": diag})
+            filtered.append((time.perf_counter() - t0) * 1000)
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "load_s": load_s,
+            "plain": percentiles(plain),
+            "filtered": percentiles(filtered) if filtered else None,
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "hits": hits,
+        }, f, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--query-path", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.query_path, args.out, args.k)
+        return
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_vector_")
+    query_path = os.path.join(tmp_dir, "queries")
+    queries, disorders = make_queries(args.queries)
+    np.save(query_path + ".npy", queries)
+    with open(query_path + ".json", "w", encoding="utf-8") as f:
+        json.dump(disorders, f, ensure_ascii=False)
+
+    results = {}
+    for name in args.backends:
+        out = os.path.join(tmp_dir, name + ".json")
+        print(f"[측정] {name} ...")
+        subprocess.run(
+            [sys.executable, __file__, "--worker", name, "--query-path", query_path,
+             "--out", out, "--k", str(args.k)],
+            check=True,
+        )
+        with open(out, "r", encoding="utf-8") as f:
+            results[name] = json.load(f)
+
+    baseline_name = args.backends[0]
+    baseline = results[baseline_name]["hits"]
+
+    print(f"\n쿼리 {len(queries)}개, k={args.k}, 기준: {baseline_name}")
+    print(f"{'backend':>8} | {'load s':>6} | {'p50 ms':>7} | {'p99 ms':>7} | "
+          f"{'filt p50':>8} | {'filt p99':>8} | {'RSS MB':>7} | overlap")
+    for name in args.backends:
+        r = results[name]
+        overlap = np.mean([
+            len(set(map(tuple, a)) & set(map(tuple, b))) / args.k
+            for a, b in zip(r["hits"], baseline)
+        ])
+        filt = r["filtered"] or {"p50_ms": float("nan"), "p99_ms": float("nan")}
+        print(f"{name:>8} | {r['load_s']:>6.2f} | {r['plain']['p50_ms']:>7.2f} | {r['plain']['p99_ms']:>7.2f} | "
+              f"{filt['p50_ms']:>8.2f} | {filt['p99_ms']:>8.2f} | {r['max_rss_mb']:>7.0f} | {overlap:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# app/bench_worker_memory.py
+# uvicorn 워커 수에 따른 전체 메모리 비교: 기존 방식 vs 공유 서빙 모드 (api/serve.py --shared)
+# - api/serve.py 를 띄우고 /readyz 가 계속 200 을 줄 때까지 기다린 뒤
+#   프로세스 트리 전체의 RSS 합계와 PSS 합계(공유 페이지를 나눠서 센 값)를 잰다
+#
+# 사용법 (Linux 전용, /proc 사용):
+#   python app/bench_worker_memory.py --workers 1 2 4
+
+import os, sys
+import time
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def children_of(pid: int) -> list:
+    """pid 와 모든 자손 프로세스"""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            parents.setdefault(int(fields[1]), []).append(int(entry))
+        except (OSError, IndexError):
+            continue
+    tree, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        tree.append(p)
+        stack.extend(parents.get(p, []))
+    return tree
+
+
+def memory_kb(pid: int) -> tuple:
+    """(RSS kB, PSS kB)"""
+    rss = pss = 0
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    rss = int(line.split()[1])
+                elif line.startswith("Pss:"):
+                    pss = int(line.split()[1])
+    except OSError:
+        pass
+    return rss, pss
+
+
+def wait_ready(port: int, timeout: float, streak: int = 30) -> bool:
+    """/readyz 가 연속 streak 번 200 → 모든 워커가 준비됐다고 본다"""
+    deadline = time.monotonic() + timeout
+    ok = 0
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=2) as r:
+                ok = ok + 1 if r.status == 200 else 0
+        except (urllib.error.URLError, OSError):
+            ok = 0
+        if ok >= streak:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def measure(workers: int, shared: bool, port: int, timeout: float):
+    cmd = [sys.executable, os.path.join(ROOT, "api", "serve.py"),
+           "--workers", str(workers), "--port", str(port), "--host", "127.0.0.1"]
+    if shared:
+        cmd.append("--shared")
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(port, timeout):
+            return None
+        # 쿼리 몇 개를 흘려서 검색 경로의 페이지까지 올라오게 한 뒤 측정
+        for _ in range(workers * 4):
+            req = urllib.request.Request(
+                f"http://127.0.0.1:{port}/rag/hypothesis",
+                data=b'{"intake_report": "depressed mood, insomnia, fatigue"}',
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                urllib.request.urlopen(req, timeout=30).read()
+            except (urllib.error.URLError, OSError):
+                pass
+        pids = children_of(proc.pid)
+        usage = [memory_kb(p) for p in pids]
+        return len(pids), sum(u[0] for u in usage) / 1024, sum(u[1] for u in usage) / 1024
+    finally:
+        for p in reversed(children_of(proc.pid)):
+            try:
+                os.kill(p, 15)
+            except OSError:
+                pass
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} | {'workers':>7} | {'procs':>5} | {'RSS 합 MB':>9} | {'PSS 합 MB':>9}")
+    for shared in (False, True):
+        for n in args.workers:
+            result = measure(n, shared, args.port, args.timeout)
+            mode = "shared" if shared else "default"
+            if result is None:
+                print(f"{mode:>8} | {n:>7} | 준비 시간 초과")
+                continue
+            procs, rss, pss = result
+            print(f"{mode:>8} | {n:>7} | {procs:>5} | {rss:>9.0f} | {pss:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
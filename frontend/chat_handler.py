@@ -1,9 +1,19 @@
 # 채팅 히스토리 관리 및 메시지 처리 모듈
 import streamlit as st
 import re
-from .gemini_api import ask_gemini, ask_gemini_with_stage
+from .gemini_api import ask_gemini, ask_gemini_with_stage, stream_gemini_with_stage
+from .gemini_client import (
+    GeminiBlocked,
+    GeminiError,
+    GeminiRateLimited,
+    GeminiTimeout,
+    GeminiUnavailable,
+)
+from .prompt_assembler import RollingSummary
 from .stage_handler import StageHandler
 
+INTERNAL_DATA_SEPARATOR = "---INTERNAL_DATA---"
+
 
 def parse_ai_response(response: str) -> tuple:
     """
@@ -22,8 +32,8 @@ def parse_ai_response(response: str) -> tuple:
         - internal_data: 다음 단계로 전달할 내부 데이터 (Summary String 등)
     """
     # ---INTERNAL_DATA--- 구분자로 분리
-    if "---INTERNAL_DATA---" in response:
-        parts = response.split("---INTERNAL_DATA---")
+    if INTERNAL_DATA_SEPARATOR in response:
+        parts = response.split(INTERNAL_DATA_SEPARATOR)
         user_message = parts[0].strip()
         internal_data = parts[1].strip() if len(parts) > 1 else ""
         
@@ -37,6 +47,86 @@ def parse_ai_response(response: str) -> tuple:
     return response.strip(), ""
 
 
+class StreamingResponseParser:
+    """
+    스트리밍 응답을 조각 단위로 받으면서 ---INTERNAL_DATA--- 앞(사용자 표시)과 뒤(내부 데이터)를 나눈다
+    - 구분자가 두 조각에 걸쳐 와도 인식: 구분자의 앞부분일 수 있는 꼬리는 다음 조각까지 보류
+    - 구분자 이후는 화면에 보내지 않고 내부 데이터로만 모은다
+    - result() 는 전체 응답에 parse_ai_response 를 적용한 것과 같은 결과
+    """
+
+    def __init__(self, separator: str = INTERNAL_DATA_SEPARATOR):
+        self.separator = separator
+        self.chunks = []        # 받은 조각 전체 (원본 응답)
+        self.visible_text = ""  # 지금까지 사용자에게 보여도 되는 텍스트
+        self.in_internal = False
+        self._pending = ""      # 구분자 시작일 수도 있어서 보류 중인 꼬리
+        self._internal = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def _held_back(self, buf: str) -> int:
+        # buf 의 끝이 구분자의 앞부분과 겹치는 최대 길이
+        for size in range(min(len(buf), len(self.separator) - 1), 0, -1):
+            if self.separator.startswith(buf[-size:]):
+                return size
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        """조각 추가 → 이번에 새로 보여도 되는 텍스트 (없으면 빈 문자열)"""
+        self.chunks.append(chunk)
+        if self.in_internal:
+            self._internal.append(chunk)
+            return ""
+
+        buf = self._pending + chunk
+        idx = buf.find(self.separator)
+        if idx >= 0:
+            shown = buf[:idx]
+            self._internal.append(buf[idx + len(self.separator):])
+            self._pending = ""
+            self.in_internal = True
+            print(f"[스트리밍 파싱] 내부 데이터 구분자 감지 (사용자 표시 {len(self.visible_text) + len(shown)} 문자)")
+        else:
+            keep = self._held_back(buf)
+            shown = buf[:len(buf) - keep]
+            self._pending = buf[len(buf) - keep:]
+        self.visible_text += shown
+        return shown
+
+    def finish(self) -> str:
+        """스트림 종료: 보류했던 꼬리는 구분자가 아니었으므로 내보낸다"""
+        shown, self._pending = self._pending, ""
+        self.visible_text += shown
+        return shown
+
+    def result(self) -> tuple:
+        """(user_message, internal_data)"""
+        if not self.in_internal:
+            return self.visible_text.strip(), ""
+        # parse_ai_response 와 같이 두 번째 구분자 이후는 버린다
+        internal_data = "".join(self._internal).split(self.separator)[0].strip()
+        user_message = self.visible_text.strip()
+        print(f"[응답 파싱] 사용자 메시지: {len(user_message)} 문자")
+        print(f"[응답 파싱] 내부 데이터: {len(internal_data)} 문자")
+        return user_message, internal_data
+
+
+def gemini_error_message(error: GeminiError) -> str:
+    """Gemini 호출 실패 → 사용자에게 보여줄 안내 (대화 히스토리 / 단계 전환에는 쓰지 않음)"""
+    if isinstance(error, GeminiRateLimited):
+        return "지금 요청이 많아 답변을 만들지 못했습니다. 잠시 후 다시 말씀해주세요."
+    if isinstance(error, GeminiTimeout):
+        return "답변이 늦어지고 있습니다. 같은 내용을 한 번 더 보내주세요."
+    if isinstance(error, GeminiUnavailable):
+        return "AI 서버에 일시적으로 연결할 수 없습니다. 잠시 후 다시 시도해주세요."
+    if isinstance(error, GeminiBlocked):
+        return "이 내용에는 답변을 생성하지 못했습니다. 표현을 조금 바꿔서 다시 말씀해주세요."
+    return "죄송합니다. 응답 생성에 문제가 발생했습니다. 다시 시도해주세요."
+
+
 def remove_system_tags(response: str) -> str:
     """
     시스템 내부 처리용 태그를 제거하여 사용자에게 표시할 내용만 반환
@@ -96,6 +186,10 @@ def init_chat_history():
     if "stage_handler" not in st.session_state:
         st.session_state.stage_handler = StageHandler()
     
+    # 히스토리에서 밀려난 오래된 대화의 요약 (프롬프트 토큰 예산용, 턴마다 새로 밀려난 메시지만 더함)
+    if "history_summary" not in st.session_state:
+        st.session_state.history_summary = RollingSummary()
+    
     # 초기 가이드라인 메시지 및 인사 메시지 추가 (첫 실행 시에만)
     if "guideline_added" not in st.session_state:
         current_stage = st.session_state.stage_handler.get_current_stage()
@@ -137,10 +231,12 @@ def get_conversation_history(exclude_last=False):
     return st.session_state.messages.copy()
 
 
-def process_user_input(user_input):
+def process_user_input(user_input, on_text=None):
     """
     사용자 입력을 처리하고 AI 응답 생성
     현재 단계에 맞는 프롬프트와 컨텍스트를 사용
+    on_text 를 넘기면 스트리밍: 사용자에게 보일 텍스트가 늘어날 때마다 on_text(지금까지의 텍스트) 호출
+    (---INTERNAL_DATA--- 이후는 화면에 보내지 않음)
     """
     add_user_message(user_input)
     
@@ -187,19 +283,37 @@ def process_user_input(user_input):
     
     print(f"{'*'*80}\n")
     
-    # Stage 1인 경우 턴 수 증가 (사용자 응답이 들어왔으므로)
-    if current_stage == 1:
-        stage_handler.increment_stage1_turn()
-        print(f"[Stage 1] 현재 대화 턴 수: {stage_handler.get_stage1_turn_count()}")
-    
     # 단계별 Gemini API 호출
-    response = ask_gemini_with_stage(
+    call_args = dict(
         user_input=user_input,
         prompt_template=prompt_template,
         context_data=context_data,
         conversation_history=history,
-        previous_stage_data=previous_stage_data
+        previous_stage_data=previous_stage_data,
+        stage=current_stage,
+        history_summary=st.session_state.get("history_summary")
     )
+    parser = None
+    try:
+        if on_text is not None:
+            parser = StreamingResponseParser()
+            for chunk in stream_gemini_with_stage(**call_args):
+                if parser.feed(chunk):
+                    on_text(parser.visible_text)
+            if parser.finish():
+                on_text(parser.visible_text)
+            response = parser.text
+        else:
+            response = ask_gemini_with_stage(**call_args)
+    except GeminiError as e:
+        # 안내 문구는 히스토리에 넣지 않고, 단계 전환 판단도 하지 않는다
+        print(f"[Chat Handler] Gemini 호출 실패 ({type(e).__name__}) - 단계 유지")
+        return gemini_error_message(e)
+    
+    # Stage 1인 경우 턴 수 증가 (사용자 응답이 들어왔으므로)
+    if current_stage == 1:
+        stage_handler.increment_stage1_turn()
+        print(f"[Stage 1] 현재 대화 턴 수: {stage_handler.get_stage1_turn_count()}")
     
     # 응답 검증
     if not response or response.strip() == "":
@@ -208,8 +322,11 @@ def process_user_input(user_input):
     
     print(f"[Chat Handler] 원본 응답 길이: {len(response)} 문자")
     
-    # 응답을 사용자 메시지와 내부 데이터로 분리
-    user_message, internal_data = parse_ai_response(response)
+    # 응답을 사용자 메시지와 내부 데이터로 분리 (스트리밍이면 파서가 이미 나눠 둠)
+    if parser is not None and response == parser.text:
+        user_message, internal_data = parser.result()
+    else:
+        user_message, internal_data = parse_ai_response(response)
     
     # 사용자에게 표시할 메시지가 있으면 추가
     if user_message:
@@ -8,10 +8,49 @@ import streamlit as st
 # 환경 변수 로드
 load_dotenv()
 
-# Gemini API 키가 설정되어 있는지 확인하고, 없으면 에러 메시지 표시
+# Gemini 응답을 토큰이 오는 대로 채팅 말풍선에 표시 (GEMINI_STREAM=0 이면 기존처럼 전체 응답 후 표시)
+STREAM_RESPONSES = os.getenv("GEMINI_STREAM", "1") != "0"
+
+# LLM 백엔드 (frontend/llm_backend.py): "gemini" | "record" (gemini + 응답 녹화) | "replay" (오프라인 대역)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_RECORDINGS_DIR = os.getenv("LLM_RECORDINGS_DIR", "./recordings/llm")
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "lognormal:1.0:0.5")  # none | fixed:s | uniform:a:b | lognormal:중앙값:sigma
+LLM_REPLAY_TTFT_RATIO = 0.3          # 스트리밍 재생 시 전체 지연 중 첫 조각까지의 비율
+LLM_REPLAY_SEED = int(os.getenv("LLM_REPLAY_SEED", "0"))
+
+# Gemini 클라이언트 (frontend/gemini_client.py)
+GEMINI_MODEL_NAME = "gemini-2.0-flash"
+GEMINI_TIMEOUT_S = float(os.getenv("GEMINI_TIMEOUT_S", "60"))  # 재시도 포함 호출 하나의 전체 deadline
+GEMINI_MAX_RETRIES = 2              # 429 / 5xx / 타임아웃일 때 재시도 횟수
+GEMINI_RETRY_BASE_S = 0.5           # 지수 백오프 시작 값 (full jitter)
+GEMINI_RETRY_MAX_S = 8.0
+GEMINI_HEDGE = os.getenv("GEMINI_HEDGE", "0") == "1"   # 느린 요청에 같은 요청을 하나 더 보냄 (할당량 더 씀)
+GEMINI_HEDGE_PERCENTILE = 95        # 최근 지연 시간 이 백분위가 지나면 hedge
+GEMINI_HEDGE_MIN_DELAY_S = 2.0
+GEMINI_HEDGE_MIN_SAMPLES = 20       # 샘플이 이보다 적으면 timeout 의 절반을 기준으로
+GEMINI_BREAKER_FAILURES = 5         # 연속 실패 이만큼이면 circuit breaker 열림
+GEMINI_BREAKER_RESET_S = 30.0       # 열린 뒤 이 시간이 지나면 요청 하나로 확인
+
+# 프롬프트 조립 (frontend/prompt_assembler.py), 토큰 수는 어림값
+# 단계별 프롬프트 전체 예산 (PROMPT_TOKEN_BUDGET 을 주면 모든 단계에 같은 값)
+PROMPT_TOKEN_BUDGETS = {1: 6000, 2: 5000, 3: 6000, 4: 6000}
+if os.getenv("PROMPT_TOKEN_BUDGET"):
+    PROMPT_TOKEN_BUDGETS = {stage: int(os.getenv("PROMPT_TOKEN_BUDGET")) for stage in PROMPT_TOKEN_BUDGETS}
+PROMPT_HISTORY_MIN_MESSAGES = 4     # 예산을 넘어도 원문으로 남기는 최근 메시지 수
+PROMPT_SUMMARY_TOKENS = 800         # 이전 대화 요약 상한 (넘으면 오래된 줄부터 버림)
+PROMPT_SUMMARY_LINE_CHARS = 160     # 요약 한 줄 길이 (사용자 발화 기준, 상담사 발화는 절반)
+
+# 단계별 고정 앞부분 (단계 프롬프트 + context JSON) 캐시 (frontend/prompt_cache.py)
+# "gemini" (google.generativeai.caching.CachedContent) | "local" (프로세스 안의 대역, replay / 테스트용) | "off"
+PROMPT_CACHE = os.getenv("PROMPT_CACHE", "local" if LLM_BACKEND == "replay" else "gemini")
+PROMPT_CACHE_TTL_S = 3600           # 캐시 항목 유효 시간 (지나면 다시 등록)
+PROMPT_CACHE_MODEL_NAME = "gemini-2.0-flash-001"   # explicit caching 은 버전이 고정된 모델 이름 필요
+PROMPT_CACHE_MIN_TOKENS = 4096      # gemini 캐시 최소 크기 (이보다 작은 앞부분은 등록하지 않고 전체 전송)
+
+# Gemini API 키가 설정되어 있는지 확인하고, 없으면 에러 메시지 표시 (replay 백엔드는 키 불필요)
 def check_api_key():
     api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
+    if not api_key and LLM_BACKEND != "replay":
         st.error("⚠️ GEMINI_API_KEY가 설정되지 않았습니다. .env 파일을 확인해주세요.")
         st.stop()
         return False
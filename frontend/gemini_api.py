@@ -1,20 +1,25 @@
 import os  # 운영체제 다루는 기본 모듈 , .env파일 불러올때 사용함
-import json
+import time
 import google.generativeai as genai  # 제미나이 모델을 python에서 쓸 수 있게 해주는 공식 SDK
 from dotenv import (
     load_dotenv,
 )  # 파일 안에 적힌 환경 변수들을 프로그램 실행 시 자동으로 불러오는 역할
 from .context_handler import get_context
+from .config import LLM_BACKEND
+from .gemini_client import GeminiError, GeminiRequestError
+from .llm_backend import get_backend
+from .prompt_assembler import AssembledPrompt, RollingSummary, assemble_prompt
+from .prompt_cache import get_prefix_cache
 
 # 환경 변수 로드
 load_dotenv()
 # Gemini API 키 설정
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# GEMINI_API_KEY가 환경 변수에 설정되어 있는지 확인
+# GEMINI_API_KEY가 환경 변수에 설정되어 있는지 확인 (LLM_BACKEND=replay 는 네트워크를 안 쓰므로 키 불필요)
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
-else:
+elif LLM_BACKEND != "replay":
     raise ValueError(
         "GEMINI_API_KEY가 환경 변수에 설정되지 않았습니다. .env 파일을 확인해주세요."
     )
@@ -31,15 +36,14 @@ else:
 
 # Returns:
 #     Gemini의 응답 텍스트
+# Raises:
+#     GeminiError: 타임아웃 / 할당량 / 서버 오류 등 (재시도 후에도 실패한 경우)
 #========================================================================================================
 
 def ask_gemini(
     user_input: str, context: str = None, conversation_history: list = None, context_file: str = None
 ) -> str:
     try:
-        # 모델 초기화
-        model = genai.GenerativeModel("gemini-2.0-flash")
-
         # 프롬프트 구성
         prompt = user_input
 
@@ -74,18 +78,18 @@ def ask_gemini(
             현재 사용자 질문: {user_input}
             """
 
-        # API 호출
-        response = model.generate_content(prompt)
-
-        return response.text
+        # API 호출 (LLM 백엔드: 기본은 공용 Gemini 클라이언트)
+        return get_backend().generate(prompt)
 
-    except Exception as e:
-        return f"오류가 발생했습니다: {str(e)}"
+    except GeminiError as e:
+        print(f"[Gemini API] 오류 발생: {type(e).__name__}: {str(e)}")
+        raise
 
 
 #========================================================================================================
 # ask_gemini_with_stage()함수 정의 / 단계별 프롬프트와 컨텍스트를 사용하여 Gemini API 호출
 # 단계별 상담 프로세스에서 사용하는 함수
+# stream_gemini_with_stage()는 같은 프롬프트로 응답을 조각조각 받아오는 스트리밍 버전
 
 # Args:
 #     user_input: 사용자 입력 메시지
@@ -94,100 +98,158 @@ def ask_gemini(
 #     conversation_history: 대화 히스토리 리스트
 #     previous_stage_data: 이전 단계의 출력 데이터 (선택적)
 
+#     stage: 현재 단계 번호 (토큰 예산 / 로그)
+#     history_summary: 세션의 이전 대화 요약 (RollingSummary, 턴마다 밀려난 메시지만 더함)
+
 # Returns:
-#     Gemini의 응답 텍스트
+#     Gemini의 응답 텍스트 (스트리밍 버전은 텍스트 조각 generator)
+# Raises:
+#     GeminiError: 실패를 응답 문자열로 돌려주지 않는다 (단계 전환 판단에 섞이지 않도록)
 #========================================================================================================
 
-def ask_gemini_with_stage(
+def assemble_stage_prompt(
     user_input: str,
     prompt_template: str,
     context_data: dict,
     conversation_history: list = None,
-    previous_stage_data: dict = None
-) -> str:
+    previous_stage_data: dict = None,
+    stage: int = None,
+    history_summary: RollingSummary = None
+) -> AssembledPrompt:
     """
-    단계별 프롬프트와 컨텍스트를 사용하여 Gemini API 호출
+    단계별 프롬프트 조립 (ask_gemini_with_stage / stream_gemini_with_stage 공통)
+    단계별 토큰 예산 / JSON 축소 / 오래된 히스토리 요약은 prompt_assembler.assemble_prompt 참고
+    결과의 prefix (단계 프롬프트 + context) 는 단계별로 고정, suffix 만 매 턴 달라짐
     
     Args:
         user_input: 사용자 입력
         prompt_template: 단계별 프롬프트 템플릿 (마크다운)
         context_data: 단계별 context JSON 데이터 (여러 파일이 통합된 dict)
-        conversation_history: 대화 히스토리
+        conversation_history: 대화 히스토리 (가이드라인 메시지는 제외됨)
         previous_stage_data: 이전 단계의 출력 데이터 (다음 단계 입력으로 활용)
+        stage: 현재 단계 번호 (토큰 예산 선택)
+        history_summary: 세션의 RollingSummary (없으면 예산을 넘는 오래된 메시지는 버림)
     """
-    try:
-        # 모델 초기화
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        
-        # Context를 문자열로 변환 (여러 파일이 통합된 경우)
-        context_str = ""
-        if context_data:
-            context_str = json.dumps(context_data, ensure_ascii=False, indent=2)
-        
-        # 대화 히스토리 포함
-        history_text = ""
-        if conversation_history:
-            history_text = "\n".join([
-                f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}"
-                for msg in conversation_history[-10:]  # 최근 10개 포함
-            ])
-        
-        # 이전 단계 데이터 포함 (이전 단계의 출력 문자열 추출)
-        input_section = ""
-        if previous_stage_data:
-            # Stage 4는 Stage 1과 Stage 3의 데이터를 모두 받음
-            if isinstance(previous_stage_data, dict) and "stage1_summary" in previous_stage_data:
-                # Stage 4: Stage 1의 Summary String과 Stage 3의 Validated String 모두 포함
-                stage1_summary = previous_stage_data.get("stage1_summary", "")
-                stage3_validation = previous_stage_data.get("stage3_validation", "")
-                input_section = f"{stage3_validation}\n\n## Stage 1 Summary (참고용)\n{stage1_summary}" if stage1_summary else stage3_validation
-            elif isinstance(previous_stage_data, dict):
-                # summary_report, hypothesis_report, validation_result 등에서 실제 문자열 추출
-                for key in ["summary_report", "hypothesis_report", "validation_result"]:
-                    if key in previous_stage_data:
-                        input_section = previous_stage_data[key]
-                        break
-                # 만약 위 키가 없으면 전체를 JSON으로 표시
-                if not input_section:
-                    input_section = json.dumps(previous_stage_data, ensure_ascii=False, indent=2)
-            else:
-                input_section = str(previous_stage_data)
-        
-        full_prompt = f"""{prompt_template}
+    assembled = assemble_prompt(
+        user_input, prompt_template, context_data, conversation_history, previous_stage_data,
+        stage=stage, summary=history_summary
+    )
+    assembled.log()
+    return assembled
 
-## Required Context Data
-{context_str if context_str else "(없음)"}
 
-{input_section if input_section else ""}
+def build_stage_prompt(*args, **kwargs) -> str:
+    """assemble_stage_prompt 의 전체 프롬프트 문자열 (인자 동일)"""
+    return assemble_stage_prompt(*args, **kwargs).text
 
-## Conversation History
-{history_text if history_text else "(대화 시작)"}
 
-## Current User Input
-User: {user_input}
+def _cached_prefix(assembled: AssembledPrompt):
+    """단계 앞부분의 캐시 항목 (백엔드가 그 저장소를 못 쓰거나 캐시가 꺼져 있으면 None)"""
+    cache = get_prefix_cache()
+    if cache.provider not in get_backend().cache_providers:
+        return None
+    return cache.acquire(assembled.prefix)
 
-Assistant:"""
+
+def ask_gemini_with_stage(
+    user_input: str,
+    prompt_template: str,
+    context_data: dict,
+    conversation_history: list = None,
+    previous_stage_data: dict = None,
+    stage: int = None,
+    history_summary: RollingSummary = None
+) -> str:
+    """
+    단계별 프롬프트와 컨텍스트를 사용하여 Gemini API 호출 (응답 전체를 한 번에 반환)
+    인자는 assemble_stage_prompt 와 같음
+    단계 앞부분이 캐시되어 있으면 뒷부분만 보낸다 (prompt_cache)
+    """
+    try:
+        assembled = assemble_stage_prompt(
+            user_input, prompt_template, context_data, conversation_history, previous_stage_data,
+            stage=stage, history_summary=history_summary
+        )
+        cached = _cached_prefix(assembled)
         
         # 프롬프트 길이 로그
-        print(f"[Gemini API] 프롬프트 길이: {len(full_prompt)} 문자")
+        print(f"[Gemini API] 프롬프트 길이: {len(assembled.text)} 문자"
+              + (f" (앞부분 {cached.chars} 문자는 캐시: {cached.name})" if cached else ""))
         print(f"[Gemini API] API 호출 시작...")
         
-        # API 호출
-        response = model.generate_content(full_prompt)
+        # API 호출 (LLM 백엔드: gemini / record / replay, config.LLM_BACKEND)
+        started = time.perf_counter()
+        try:
+            text = get_backend().generate(assembled.text, stage=stage, cached=cached)
+        except GeminiRequestError:
+            if cached is None:
+                raise
+            # 캐시 항목이 제공자 쪽에서 사라졌을 수 있음 → 항목을 버리고 전체 프롬프트로 한 번 더
+            get_prefix_cache().invalidate(cached)
+            cached = None
+            text = get_backend().generate(assembled.text, stage=stage)
+        elapsed = time.perf_counter() - started
+        get_prefix_cache().record(assembled, cached, elapsed)
         
-        print(f"[Gemini API] 응답 수신 완료, 길이: {len(response.text)} 문자")
-        print(f"[Gemini API] 응답 미리보기: {response.text[:200]}...")
+        print(f"[Gemini API] 응답 수신 완료, 길이: {len(text)} 문자")
+        print(f"[Gemini API] Stage {stage} 응답 시간: {elapsed:.2f}초")
+        print(f"[Gemini API] 응답 미리보기: {text[:200]}...")
         
-        return response.text
+        return text
 
-    except Exception as e:
+    except GeminiError as e:
         print(f"[Gemini API] 오류 발생: {type(e).__name__}: {str(e)}")
-        import traceback
-        print(f"[Gemini API] 상세 에러:\n{traceback.format_exc()}")
-        return f"오류가 발생했습니다: {str(e)}"
-
-
-
-
+        raise
 
 
+def stream_gemini_with_stage(
+    user_input: str,
+    prompt_template: str,
+    context_data: dict,
+    conversation_history: list = None,
+    previous_stage_data: dict = None,
+    stage: int = None,
+    history_summary: RollingSummary = None
+):
+    """
+    ask_gemini_with_stage 의 스트리밍 버전: 응답 텍스트 조각을 도착하는 대로 yield
+    첫 토큰까지 걸린 시간(TTFT)과 전체 시간을 단계별로 로그에 남긴다 (캐시 통계에는 TTFT 기록)
+    """
+    started = time.perf_counter()
+    first_token_s = None
+    received = 0
+    try:
+        assembled = assemble_stage_prompt(
+            user_input, prompt_template, context_data, conversation_history, previous_stage_data,
+            stage=stage, history_summary=history_summary
+        )
+        cached = _cached_prefix(assembled)
+        print(f"[Gemini API] 프롬프트 길이: {len(assembled.text)} 문자"
+              + (f" (앞부분 {cached.chars} 문자는 캐시: {cached.name})" if cached else ""))
+        print(f"[Gemini API] 스트리밍 호출 시작...")
+
+        while True:
+            try:
+                for text in get_backend().stream(assembled.text, stage=stage, cached=cached):
+                    if first_token_s is None:
+                        first_token_s = time.perf_counter() - started
+                        print(f"[Gemini API] Stage {stage} 첫 토큰(TTFT): {first_token_s:.2f}초")
+                        get_prefix_cache().record(assembled, cached, first_token_s)
+                    received += len(text)
+                    yield text
+                break
+            except GeminiRequestError:
+                # 첫 조각 전이면 캐시 항목을 버리고 전체 프롬프트로 한 번 더 (ask_gemini_with_stage 와 같음)
+                if cached is None or received:
+                    raise
+                get_prefix_cache().invalidate(cached)
+                cached = None
+
+    except GeminiError as e:
+        print(f"[Gemini API] 오류 발생: {type(e).__name__}: {str(e)} (받은 응답 {received} 문자)")
+        raise
+
+    finally:
+        total_s = time.perf_counter() - started
+        ttft = f"{first_token_s:.2f}초" if first_token_s is not None else "-"
+        print(f"[Gemini API] Stage {stage} 스트리밍 완료: {received} 문자, TTFT {ttft}, 전체 {total_s:.2f}초")
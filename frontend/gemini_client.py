@@ -0,0 +1,404 @@
+# Gemini 호출 공통 클라이언트
+# - 모델 객체는 설정(모델 이름 + generation_config)마다 하나만 만들어서 재사용
+# - 호출마다 deadline (SDK request_options timeout + 재시도 전체 시간 제한)
+# - 재시도 가능한 오류(429 / 5xx / 타임아웃)는 지수 백오프 + jitter 로 재시도
+# - 선택: hedging (최근 지연 시간 p95 가 지나도 응답이 없으면 같은 요청을 하나 더 보내고 먼저 온 것 사용)
+# - circuit breaker: 연속 실패가 쌓이면 일정 시간 바로 실패 (API 장애 때 요청이 줄줄이 타임아웃 나지 않도록)
+# - 실패는 문자열이 아니라 GeminiError 계열 예외로 올린다
+
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import google.generativeai as genai
+
+try:
+    from google.api_core import exceptions as api_exceptions
+except ImportError:   # google-generativeai 가 항상 같이 설치하지만, 없으면 이름으로만 판단
+    api_exceptions = None
+
+from .config import (
+    GEMINI_MODEL_NAME,
+    GEMINI_TIMEOUT_S,
+    GEMINI_MAX_RETRIES,
+    GEMINI_RETRY_BASE_S,
+    GEMINI_RETRY_MAX_S,
+    GEMINI_HEDGE,
+    GEMINI_HEDGE_PERCENTILE,
+    GEMINI_HEDGE_MIN_DELAY_S,
+    GEMINI_HEDGE_MIN_SAMPLES,
+    GEMINI_BREAKER_FAILURES,
+    GEMINI_BREAKER_RESET_S,
+)
+
+
+# ---------- 오류 ----------
+class GeminiError(Exception):
+    """Gemini 호출 실패 (retryable: 같은 요청을 다시 보내면 성공할 수 있는지)"""
+    retryable = False
+
+
+class GeminiTimeout(GeminiError):
+    """deadline 초과"""
+    retryable = True
+
+
+class GeminiRateLimited(GeminiError):
+    """429 / 할당량 초과"""
+    retryable = True
+
+
+class GeminiUnavailable(GeminiError):
+    """5xx / 네트워크 오류 / circuit breaker 열림"""
+    retryable = True
+
+
+class GeminiBlocked(GeminiError):
+    """안전 필터 등으로 응답 텍스트가 없음"""
+
+
+class GeminiRequestError(GeminiError):
+    """잘못된 요청 / 권한 오류 (재시도해도 같음)"""
+
+
+def classify_error(exc: Exception) -> GeminiError:
+    """SDK / 네트워크 예외 → GeminiError 하위 타입"""
+    if isinstance(exc, GeminiError):
+        return exc
+    message = f"{type(exc).__name__}: {exc}"
+    if api_exceptions is not None:
+        if isinstance(exc, (api_exceptions.DeadlineExceeded,)):
+            return GeminiTimeout(message)
+        if isinstance(exc, (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)):
+            return GeminiRateLimited(message)
+        if isinstance(exc, (api_exceptions.ServerError, api_exceptions.ServiceUnavailable)):
+            return GeminiUnavailable(message)
+        if isinstance(exc, api_exceptions.ClientError):
+            return GeminiRequestError(message)
+    if isinstance(exc, TimeoutError):
+        return GeminiTimeout(message)
+    if isinstance(exc, (ConnectionError, OSError)):
+        return GeminiUnavailable(message)
+    if isinstance(exc, ValueError):
+        # response.text 접근 시 후보가 없으면 ValueError (안전 필터 차단 등)
+        return GeminiBlocked(message)
+    return GeminiRequestError(message)
+
+
+# ---------- circuit breaker ----------
+class CircuitBreaker:
+    """
+    closed → (연속 실패 failure_threshold 번) → open: reset_timeout 동안 바로 GeminiUnavailable
+    → half_open: 요청 하나만 시험 삼아 통과, 성공하면 closed / 실패하면 다시 open
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """호출해도 되는지 (안 되면 GeminiUnavailable), 이 호출이 half_open 확인 요청이면 True"""
+        with self._lock:
+            state = self._state()
+            if state == "open":
+                remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+                raise GeminiUnavailable(f"circuit breaker 열림 (약 {remaining:.0f}초 후 재시도)")
+            if state == "half_open":
+                if self._probe_in_flight:
+                    raise GeminiUnavailable("circuit breaker 확인 요청 진행 중")
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        """
+        결과를 기록하지 못하고 끝난 확인 요청 (스트림을 끝까지 안 읽음 / Streamlit rerun 등 BaseException)
+        성공 / 실패 어느 쪽도 아니므로 상태는 그대로 두고 다음 호출이 다시 확인하게 한다
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if was_probe or self._failures >= self.failure_threshold:
+                if self._opened_at is None or was_probe:
+                    self.opened_count += 1
+                    print(f"[Gemini Client] circuit breaker 열림 (연속 실패 {self._failures}번)")
+                self._opened_at = time.monotonic()
+
+
+# ---------- 클라이언트 ----------
+class GeminiClient:
+    def __init__(self, model_name: str = GEMINI_MODEL_NAME, timeout: float = GEMINI_TIMEOUT_S,
+                 max_retries: int = GEMINI_MAX_RETRIES, hedge: bool = GEMINI_HEDGE):
+        self.model_name = model_name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.breaker = CircuitBreaker(GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_RESET_S)
+
+        self._models = {}
+        self._models_lock = threading.Lock()
+        # hedging 용 (먼저 온 응답만 쓰고, 늦은 쪽은 끝날 때까지 두고 결과만 버린다)
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gemini")
+        self._latencies = deque(maxlen=200)   # generate() 전체 응답 시간 (hedge 기준)
+        self._ttft = deque(maxlen=200)        # stream() 첫 조각까지 시간 (hedge 에는 쓰지 않음)
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failures = 0
+
+    # ---------- 모델 ----------
+    def get_model(self, model_name: str = None, generation_config: dict = None, **kwargs):
+        """설정마다 GenerativeModel 하나 (매 호출마다 새로 만들지 않음)"""
+        model_name = model_name or self.model_name
+        key = (model_name, json.dumps(generation_config or {}, sort_keys=True),
+               json.dumps(kwargs, sort_keys=True, default=str))
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(model_name, generation_config=generation_config, **kwargs)
+                self._models[key] = model
+            return model
+
+    def get_cached_model(self, cached_content):
+        """CachedContent (prompt_cache 에서 등록한 단계 앞부분) 를 참조하는 모델, 항목마다 하나"""
+        key = ("cached", cached_content.name)
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = genai.GenerativeModel.from_cached_content(cached_content)
+                self._models[key] = model
+            return model
+
+    def release_cached_model(self, name: str):
+        with self._models_lock:
+            self._models.pop(("cached", name), None)
+
+    # ---------- 지연 시간 / hedging ----------
+    def hedge_delay(self) -> float:
+        """최근 generate() 성공 응답 시간의 p95 (스트리밍 TTFT 는 제외, 샘플이 적으면 timeout 의 절반)"""
+        with self._stats_lock:
+            samples = sorted(self._latencies)
+        if len(samples) < GEMINI_HEDGE_MIN_SAMPLES:
+            return max(GEMINI_HEDGE_MIN_DELAY_S, self.timeout / 2)
+        idx = min(len(samples) - 1, int(len(samples) * GEMINI_HEDGE_PERCENTILE / 100))
+        return max(GEMINI_HEDGE_MIN_DELAY_S, samples[idx])
+
+    def _record_latency(self, seconds: float):
+        with self._stats_lock:
+            self._latencies.append(seconds)
+
+    def _record_ttft(self, seconds: float):
+        with self._stats_lock:
+            self._ttft.append(seconds)
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    # ---------- 호출 ----------
+    def _call_once(self, model, prompt, timeout: float) -> str:
+        response = model.generate_content(prompt, request_options={"timeout": timeout})
+        return response.text
+
+    def _attempt(self, model, prompt, timeout: float, hedge: bool) -> str:
+        """한 번의 시도 (hedge 면 p95 가 지나도 응답이 없을 때 같은 요청 하나 더)"""
+        if not hedge:
+            return self._call_once(model, prompt, timeout)
+
+        started = time.monotonic()
+        first = self._executor.submit(self._call_once, model, prompt, timeout)
+        done, _ = wait([first], timeout=min(self.hedge_delay(), timeout))
+        if done:
+            return first.result()
+
+        remaining = max(0.1, timeout - (time.monotonic() - started))
+        second = self._executor.submit(self._call_once, model, prompt, remaining)
+        self._count("hedged")
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, timeout - (time.monotonic() - started)),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise GeminiTimeout(f"응답 시간 초과 ({timeout:.1f}s, hedged)")
+            for future in done:
+                try:
+                    text = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is second:
+                    self._count("hedge_wins")
+                return text
+        raise error
+
+    def generate(self, prompt, timeout: float = None, stage=None, hedge: bool = None, model=None) -> str:
+        """
+        프롬프트 → 응답 텍스트
+        timeout 은 재시도를 포함한 전체 deadline, 실패하면 GeminiError 하위 예외
+        """
+        timeout = timeout or self.timeout
+        hedge = self.hedge if hedge is None else hedge
+        model = model or self.get_model()
+        deadline = time.monotonic() + timeout
+        self._count("calls")
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count("failures")
+                raise GeminiTimeout(f"Stage {stage} 응답 시간 초과 ({timeout:.1f}s)")
+            probe = self.breaker.before_call()
+
+            started = time.monotonic()
+            try:
+                text = self._attempt(model, prompt, remaining, hedge)
+            except Exception as e:
+                error = classify_error(e)
+                if error.retryable:
+                    self.breaker.record_failure()
+                else:
+                    # 요청 자체 문제 (API 는 살아 있음)
+                    self.breaker.record_success()
+                backoff = min(GEMINI_RETRY_MAX_S, GEMINI_RETRY_BASE_S * (2 ** attempt)) * random.random()
+                if (not error.retryable or attempt >= self.max_retries
+                        or time.monotonic() + backoff >= deadline):
+                    self._count("failures")
+                    print(f"[Gemini Client] Stage {stage} 실패 ({attempt + 1}번 시도): {type(error).__name__}: {error}")
+                    raise error from e
+                attempt += 1
+                self._count("retries")
+                print(f"[Gemini Client] Stage {stage} {type(error).__name__} → {backoff:.2f}초 후 재시도 ({attempt}/{self.max_retries})")
+                time.sleep(backoff)
+                continue
+            except BaseException:
+                # Streamlit rerun / stop (BaseException) 등: 확인 요청을 잡은 채로 두지 않음
+                if probe:
+                    self.breaker.release_probe()
+                raise
+
+            self.breaker.record_success()
+            self._record_latency(time.monotonic() - started)
+            return text
+
+    def stream(self, prompt, timeout: float = None, stage=None, model=None):
+        """
+        스트리밍 버전: 텍스트 조각 yield
+        첫 조각을 받기 전의 실패만 재시도 (이미 화면에 나간 뒤에는 이어 붙일 수 없음), hedging 없음
+        """
+        timeout = timeout or self.timeout
+        model = model or self.get_model()
+        deadline = time.monotonic() + timeout
+        self._count("calls")
+
+        attempt = 0
+        received = False
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count("failures")
+                raise GeminiTimeout(f"Stage {stage} 응답 시간 초과 ({timeout:.1f}s)")
+            probe = self.breaker.before_call()
+            started = time.monotonic()
+            try:
+                response = model.generate_content(prompt, stream=True, request_options={"timeout": remaining})
+                for chunk in response:
+                    text = chunk.text if chunk.parts else ""
+                    if not text:
+                        continue
+                    if not received:
+                        received = True
+                        self._record_ttft(time.monotonic() - started)
+                    yield text
+                    if time.monotonic() > deadline:
+                        raise GeminiTimeout(f"Stage {stage} 스트리밍 시간 초과 ({timeout:.1f}s)")
+            except Exception as e:
+                error = classify_error(e)
+                if error.retryable:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                backoff = min(GEMINI_RETRY_MAX_S, GEMINI_RETRY_BASE_S * (2 ** attempt)) * random.random()
+                if (received or not error.retryable or attempt >= self.max_retries
+                        or time.monotonic() + backoff >= deadline):
+                    self._count("failures")
+                    print(f"[Gemini Client] Stage {stage} 스트리밍 실패: {type(error).__name__}: {error}")
+                    raise error from e
+                attempt += 1
+                self._count("retries")
+                print(f"[Gemini Client] Stage {stage} {type(error).__name__} → {backoff:.2f}초 후 재시도 ({attempt}/{self.max_retries})")
+                time.sleep(backoff)
+                continue
+            except BaseException:
+                # GeneratorExit (스트림을 끝까지 안 읽음), Streamlit rerun / stop 등: 확인 요청을 잡은 채로 두지 않음
+                if probe:
+                    self.breaker.release_probe()
+                raise
+
+            self.breaker.record_success()
+            return
+
+    def stats(self) -> dict:
+        hedge_delay = self.hedge_delay() if self.hedge else None
+        with self._stats_lock:
+            samples = sorted(self._latencies)
+            ttft = sorted(self._ttft)
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "p50_s": samples[len(samples) // 2] if samples else None,
+                "ttft_p50_s": ttft[len(ttft) // 2] if ttft else None,
+                "hedge_delay_s": hedge_delay,
+                "breaker": self.breaker.state,
+                "models": len(self._models),
+            }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> GeminiClient:
+    """프로세스 전체에서 공유하는 클라이언트 (Streamlit 재실행마다 새로 만들지 않음)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient()
+        return _client
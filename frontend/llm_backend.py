@@ -0,0 +1,298 @@
+# LLM 백엔드 선택 (config.LLM_BACKEND)
+# - gemini : 실제 Gemini API (gemini_client 의 공용 클라이언트)
+# - record : gemini 와 같고, 응답을 프롬프트 해시별로 LLM_RECORDINGS_DIR 에 저장
+# - replay : 네트워크 없이 동작하는 대역
+#            저장된 응답이 있으면 그대로, 없으면 단계 형식에 맞는 합성 응답
+#            (Summary String: / Hypothesis String: / Validated String: / Final Response String:)
+#            + 설정한 지연 시간 분포만큼 대기 (부하 테스트 / 벤치마크용)
+#
+# 지연 시간 설정 (LLM_REPLAY_LATENCY):
+#   "none" | "fixed:0.8" | "uniform:0.5:2.0" | "lognormal:1.0:0.5" (중앙값 초, sigma)
+#
+# cached: prompt_cache 에 등록된 단계 앞부분 (CachedPrefix)
+#   백엔드는 cache_providers 에 있는 저장소의 항목만 쓰고, 쓸 때는 prompt[cached.chars:] 만 보낸다
+
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+from .config import (
+    LLM_BACKEND,
+    LLM_RECORDINGS_DIR,
+    LLM_REPLAY_LATENCY,
+    LLM_REPLAY_TTFT_RATIO,
+    LLM_REPLAY_SEED,
+)
+
+_STREAM_CHUNK_CHARS = 24   # replay 스트리밍 조각 크기
+
+
+def prompt_hash(prompt: str) -> str:
+    """녹화 / 재생 키 (프롬프트 전체의 sha256)"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class LatencyModel:
+    """지연 시간 분포 (초)"""
+
+    def __init__(self, spec: str = "none", seed: int = None):
+        self.spec = spec or "none"
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        kind, *args = self.spec.split(":")
+        self.kind = kind
+        self.args = [float(a) for a in args]
+        if kind not in ("none", "fixed", "uniform", "lognormal"):
+            raise ValueError(f"알 수 없는 지연 시간 분포: {spec}")
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                return self.args[0]
+            if self.kind == "uniform":
+                return self._rng.uniform(self.args[0], self.args[1])
+            if self.kind == "lognormal":
+                median, sigma = self.args
+                return self._rng.lognormvariate(math.log(median), sigma)
+            return 0.0
+
+
+class LLMBackend:
+    """LLM 백엔드 공통 인터페이스 (stage 는 로그 / 합성 응답용)"""
+
+    name = "base"
+    cache_providers = ()   # 쓸 수 있는 prompt_cache 저장소 이름
+
+    def generate(self, prompt: str, stage: int = None, cached=None) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, stage: int = None, cached=None):
+        """텍스트 조각 generator (기본: generate 결과를 한 번에)"""
+        yield self.generate(prompt, stage=stage, cached=cached)
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+    cache_providers = ("gemini",)
+
+    def __init__(self):
+        from .gemini_client import get_client
+
+        self.client = get_client()
+
+    def _request(self, prompt: str, cached):
+        # 캐시 항목이 있으면 앞부분은 CachedContent 로 참조하고 뒷부분만 보낸다
+        if cached is None or cached.provider != "gemini":
+            return prompt, None
+        return prompt[cached.chars:], self.client.get_cached_model(cached.handle)
+
+    def generate(self, prompt: str, stage: int = None, cached=None) -> str:
+        prompt, model = self._request(prompt, cached)
+        return self.client.generate(prompt, stage=stage, model=model)
+
+    def stream(self, prompt: str, stage: int = None, cached=None):
+        prompt, model = self._request(prompt, cached)
+        return self.client.stream(prompt, stage=stage, model=model)
+
+
+class RecordingBackend(LLMBackend):
+    """실제 백엔드 응답을 프롬프트 해시별 JSON 파일로 저장 (replay 에서 그대로 재생)"""
+
+    name = "record"
+
+    def __init__(self, inner: LLMBackend, recordings_dir: str = LLM_RECORDINGS_DIR):
+        self.inner = inner
+        self.recordings_dir = recordings_dir
+        self.cache_providers = inner.cache_providers
+        os.makedirs(recordings_dir, exist_ok=True)
+
+    def _save(self, prompt: str, stage, response: str, elapsed_s: float):
+        key = prompt_hash(prompt)
+        path = os.path.join(self.recordings_dir, f"{key}.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "prompt_hash": key,
+                "stage": stage,
+                "prompt_chars": len(prompt),
+                "response": response,
+                "latency_s": round(elapsed_s, 3),
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+        print(f"[LLM Backend] 녹화: Stage {stage} {key[:12]} ({len(response)} 문자)")
+
+    def generate(self, prompt: str, stage: int = None, cached=None) -> str:
+        started = time.perf_counter()
+        text = self.inner.generate(prompt, stage=stage, cached=cached)
+        self._save(prompt, stage, text, time.perf_counter() - started)
+        return text
+
+    def stream(self, prompt: str, stage: int = None, cached=None):
+        started = time.perf_counter()
+        chunks = []
+        for text in self.inner.stream(prompt, stage=stage, cached=cached):
+            chunks.append(text)
+            yield text
+        self._save(prompt, stage, "".join(chunks), time.perf_counter() - started)
+
+
+class ReplayBackend(LLMBackend):
+    """녹화된 응답 재생 → 없으면 단계 형식에 맞는 합성 응답 (네트워크 없음)"""
+
+    name = "replay"
+    cache_providers = ("local",)
+
+    def __init__(self, recordings_dir: str = LLM_RECORDINGS_DIR, latency: str = LLM_REPLAY_LATENCY,
+                 ttft_ratio: float = LLM_REPLAY_TTFT_RATIO, seed: int = LLM_REPLAY_SEED):
+        self.recordings_dir = recordings_dir
+        self.latency = LatencyModel(latency, seed)
+        self.ttft_ratio = ttft_ratio
+        self.replayed = 0
+        self.synthesized = 0
+
+    def lookup(self, prompt: str):
+        path = os.path.join(self.recordings_dir, f"{prompt_hash(prompt)}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["response"]
+
+    def respond(self, prompt: str, stage: int = None) -> str:
+        recorded = self.lookup(prompt)
+        if recorded is not None:
+            self.replayed += 1
+            return recorded
+        self.synthesized += 1
+        return synthetic_response(prompt, stage)
+
+    def generate(self, prompt: str, stage: int = None, cached=None) -> str:
+        text = self.respond(prompt, stage)
+        time.sleep(self.latency.sample())
+        return text
+
+    def stream(self, prompt: str, stage: int = None, cached=None):
+        # 전체 지연 중 ttft_ratio 만큼 기다린 뒤 첫 조각, 나머지는 조각마다 나눠서
+        text = self.respond(prompt, stage)
+        total = self.latency.sample()
+        chunks = [text[i:i + _STREAM_CHUNK_CHARS] for i in range(0, len(text), _STREAM_CHUNK_CHARS)] or [""]
+        time.sleep(total * self.ttft_ratio)
+        per_chunk = total * (1 - self.ttft_ratio) / len(chunks)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(per_chunk)
+            yield chunk
+
+
+# ---------- 합성 응답 ----------
+_STAGE1_QUESTIONS = [
+    "그런 상태가 언제부터 시작되셨나요?",
+    "요즘 잠은 어떻게 주무시고, 식사는 잘 하고 계신가요?",
+    "그 때문에 일상생활이나 일에서 달라진 점이 있으신가요?",
+]
+_STAGE3_QUESTION = (
+    "한 가지만 더 여쭤볼게요. 요즘 흥미가 떨어진 건 일과 관련된 부분에만 해당하나요, "
+    "아니면 취미나 사람들과의 만남 등 삶 전반에서 그런가요?"
+)
+
+
+def _history_section(prompt: str) -> str:
+    match = re.search(r"## Conversation History\n(.*?)\n## Current User Input", prompt, re.S)
+    return match.group(1) if match else ""
+
+
+def detect_stage(prompt: str):
+    """stage 를 모를 때 프롬프트의 Output Prefix 로 추정"""
+    for stage, marker in ((4, "Final Response String:"), (3, "Validated String:"),
+                          (2, "Hypothesis String:"), (1, "Summary String:")):
+        if f"## Output Prefix\n{marker}" in prompt:
+            return stage
+    return None
+
+
+def synthetic_response(prompt: str, stage: int = None) -> str:
+    """
+    단계 형식에 맞는 가짜 응답 (StageHandler.should_transition 이 실제와 같은 흐름으로 전환되도록)
+    - Stage 1: 사용자 발화가 3번이 되면 Summary String, 그 전에는 질문
+    - Stage 2: Hypothesis String
+    - Stage 3: 감별 질문 → 답을 받으면 Validated String
+    - Stage 4: Final Response String
+    """
+    stage = stage or detect_stage(prompt) or 1
+    history = _history_section(prompt)
+    user_turns = len(re.findall(r"^User: ", history, re.M)) + 1
+
+    if stage == 1:
+        if user_turns < 3:
+            return _STAGE1_QUESTIONS[(user_turns - 1) % len(_STAGE1_QUESTIONS)]
+        return (
+            "말씀해주신 내용 감사합니다. 충분한 정보를 수집했으니 이제 분석을 시작하겠습니다.\n\n"
+            "---INTERNAL_DATA---\n"
+            "Summary String:\n"
+            "환자 상태 요약: 주 호소는 '일이 손에 안 잡히고 재미가 없음'이며, '무기력함'의 감정 상태를 보임. "
+            "약 1-2달간 지속됨. '집중력 저하', '수면 후 피로감'의 관련 증상 관찰됨."
+        )
+    if stage == 2:
+        return (
+            "Hypothesis String:\n"
+            "가설 리포트:\n"
+            "1. 주요 우울 장애 (확률: 높음): 핵심 기준은 '거의 매일 지속되는 우울한 기분 또는 흥미/즐거움의 현저한 저하'입니다.\n"
+            "2. 번아웃 (직무 소진) (확률: 중간): 핵심 기준은 '주로 직무 및 업무 환경과 관련된 정서적 고갈'입니다.\n"
+            "3. 범불안 장애 (확률: 낮음): 핵심 기준은 '통제하기 어려운 과도한 불안과 걱정'입니다.\n"
+            "*다음 단계에서 '주요 우울 장애'와 '번아웃'의 '전반적인 흥미 저하' vs '직무 관련 흥미 저하'를 감별할 것."
+        )
+    if stage == 3:
+        if _STAGE3_QUESTION not in history:
+            return _STAGE3_QUESTION
+        return (
+            "답변해주셔서 감사합니다. 말씀을 종합해 정리해 드릴게요.\n\n"
+            "---INTERNAL_DATA---\n"
+            "Validated String:\n"
+            "주요 우울 장애"
+        )
+    return (
+        "Final Response String:\n"
+        "대화 내용을 종합해볼 때, 약 1-2달간 지속된 무기력감과 집중력 저하를 고려하면 "
+        "현재 '주요 우울 장애'에서 흔히 보이는 증상들을 겪고 계신 것으로 보입니다.\n\n"
+        "1. 매일 오전에 10분 정도 가볍게 산책하며 햇볕을 쬐어보세요.\n"
+        "2. 잠들기 전 오늘 해낸 아주 사소한 일이라도 한 가지씩 적어보세요."
+    )
+
+
+# ---------- 선택 ----------
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str = None) -> LLMBackend:
+    name = name or LLM_BACKEND
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "record":
+        return RecordingBackend(GeminiBackend())
+    if name == "replay":
+        return ReplayBackend()
+    raise ValueError(f"알 수 없는 LLM_BACKEND: {name} (gemini | record | replay)")
+
+
+def get_backend() -> LLMBackend:
+    """프로세스 전체에서 공유하는 백엔드 (config.LLM_BACKEND)"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+            print(f"[LLM Backend] {_backend.name}")
+        return _backend
+
+
+def set_backend(backend: LLMBackend):
+    """벤치마크 등에서 백엔드를 직접 바꿔 끼울 때"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
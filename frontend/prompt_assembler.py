@@ -0,0 +1,253 @@
+# 단계별 프롬프트 조립 (토큰 예산)
+# - 섹션: 단계 프롬프트 / context JSON / 이전 단계 출력 / 대화 히스토리 / 현재 사용자 입력
+# - context / 이전 단계 dict 는 공백 없는 JSON 으로 (indent=2 대비 토큰 절약)
+# - 가이드라인 / 화면 전용 메시지 (is_guideline, ui_only) 는 히스토리에 넣지 않음
+# - 히스토리는 최근 메시지부터 단계별 예산 (PROMPT_TOKEN_BUDGETS) 안에 들어가는 만큼 원문으로
+#   밀려난 오래된 메시지는 RollingSummary 에 한 번만 접어 넣는다 (요약을 매 턴 다시 만들지 않음)
+# - 섹션별 토큰 수 로그
+# - 앞부분 (단계 프롬프트 + context JSON) 은 턴 / 사용자와 무관하게 같으므로 StagePrefix 로 단계별 한 번만 조립
+#   (내용이 바뀌면 다시 조립, key 는 내용의 sha256 → prompt_cache 의 제공자 캐시 키)
+#
+# 토큰 수는 어림값 (estimate_tokens): 영문 / 기호 약 4자당 1, 한글 등 약 1.5자당 1
+# (실제 토크나이저 호출은 네트워크 왕복이라 매 턴 쓰지 않음)
+
+import hashlib
+import json
+import math
+import re
+import threading
+
+from .config import (
+    PROMPT_HISTORY_MIN_MESSAGES,
+    PROMPT_SUMMARY_LINE_CHARS,
+    PROMPT_SUMMARY_TOKENS,
+    PROMPT_TOKEN_BUDGETS,
+)
+
+_NON_ASCII = re.compile(r"[^\x00-\x7f]")
+_SPACES = re.compile(r"\s+")
+
+_ASCII_CHARS_PER_TOKEN = 4.0
+_OTHER_CHARS_PER_TOKEN = 1.5
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 어림값"""
+    if not text:
+        return 0
+    other = len(_NON_ASCII.findall(text))
+    return math.ceil((len(text) - other) / _ASCII_CHARS_PER_TOKEN + other / _OTHER_CHARS_PER_TOKEN)
+
+
+def minify_json(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def is_prompt_message(msg: dict) -> bool:
+    """프롬프트에 넣을 메시지인지 (가이드라인 / 화면 전용 안내는 제외)"""
+    return not msg.get("is_guideline") and not msg.get("ui_only") and bool(msg.get("content"))
+
+
+def format_message(msg: dict) -> str:
+    return f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}"
+
+
+def _compact(text: str, limit: int) -> str:
+    text = _SPACES.sub(" ", text).strip()
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class RollingSummary:
+    """
+    히스토리에서 밀려난 메시지의 요약 (세션마다 하나, st.session_state.history_summary)
+    - folded: 지금까지 접어 넣은 메시지 수 (프롬프트용 메시지 목록 기준, 앞에서부터)
+    - 새로 밀려난 메시지만 한 줄씩 더한다: 사용자 발화는 길게, 상담사 발화는 짧게
+    - max_tokens 를 넘으면 가장 오래된 줄부터 버린다
+    """
+
+    def __init__(self, max_tokens: int = PROMPT_SUMMARY_TOKENS, line_chars: int = PROMPT_SUMMARY_LINE_CHARS):
+        self.max_tokens = max_tokens
+        self.line_chars = line_chars
+        self.lines = []
+        self.folded = 0
+        self.dropped = 0
+        self._tokens = 0
+
+    def reset(self):
+        self.lines, self.folded, self.dropped, self._tokens = [], 0, 0, 0
+
+    def fold(self, messages: list, upto: int) -> int:
+        """messages[folded:upto] 를 요약에 더함 → 새로 접은 메시지 수"""
+        if self.folded > len(messages):
+            # 대화가 초기화됨
+            self.reset()
+        new = messages[self.folded:upto]
+        for msg in new:
+            if msg["role"] == "user":
+                line = f"- 사용자: {_compact(msg['content'], self.line_chars)}"
+            else:
+                line = f"- 상담사: {_compact(msg['content'], self.line_chars // 2)}"
+            self.lines.append(line)
+            self._tokens += estimate_tokens(line) + 1
+        self.folded = max(self.folded, upto)
+        while self.lines and self._tokens > self.max_tokens:
+            self._tokens -= estimate_tokens(self.lines.pop(0)) + 1
+            self.dropped += 1
+        return len(new)
+
+    def text(self) -> str:
+        if not self.lines:
+            return ""
+        head = "(이전 대화 요약" + (f", 앞선 {self.dropped}개 생략)" if self.dropped else ")")
+        return head + "\n" + "\n".join(self.lines)
+
+
+def previous_stage_text(previous_stage_data) -> str:
+    """이전 단계 출력 → 입력 섹션 문자열"""
+    if not previous_stage_data:
+        return ""
+    if isinstance(previous_stage_data, dict) and "stage1_summary" in previous_stage_data:
+        # Stage 4: Stage 3 의 Validated String + Stage 1 의 Summary String (참고용)
+        stage1_summary = previous_stage_data.get("stage1_summary", "")
+        stage3_validation = previous_stage_data.get("stage3_validation", "")
+        return f"{stage3_validation}\n\n## Stage 1 Summary (참고용)\n{stage1_summary}" if stage1_summary else stage3_validation
+    if isinstance(previous_stage_data, dict):
+        # summary_report, hypothesis_report, validation_result 등에서 실제 문자열 추출
+        for key in ["summary_report", "hypothesis_report", "validation_result"]:
+            if key in previous_stage_data:
+                return previous_stage_data[key]
+        return minify_json(previous_stage_data)
+    return str(previous_stage_data)
+
+
+class StagePrefix:
+    """단계별 고정 앞부분 (단계 프롬프트 + context JSON), 같은 내용이면 같은 key"""
+
+    def __init__(self, stage, prompt_template: str, context_data: dict):
+        context_str = minify_json(context_data) if context_data else ""
+        self.stage = stage
+        self.text = f"""{prompt_template}
+
+## Required Context Data
+{context_str if context_str else "(없음)"}
+
+"""
+        self.key = hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+        self.template_tokens = estimate_tokens(prompt_template)
+        self.context_tokens = estimate_tokens(context_str)
+        self.tokens = estimate_tokens(self.text)
+
+
+_prefixes = {}   # stage → (prompt_template, context_data, StagePrefix)
+_prefixes_lock = threading.Lock()
+
+
+def stage_prefix(stage, prompt_template: str, context_data: dict) -> StagePrefix:
+    """
+    단계별 StagePrefix (프롬프트 / context 가 지난번과 같으면 그대로 재사용)
+    StageHandler.get_stage_materials 가 파일이 안 바뀌면 같은 객체를 돌려주므로 보통은 is 비교로 끝난다
+    """
+    with _prefixes_lock:
+        cached = _prefixes.get(stage)
+    if cached is not None:
+        template, context, prefix = cached
+        if (template is prompt_template or template == prompt_template) and \
+                (context is context_data or context == context_data):
+            return prefix
+    prefix = StagePrefix(stage, prompt_template, context_data)
+    with _prefixes_lock:
+        _prefixes[stage] = (prompt_template, context_data, prefix)
+    print(f"[Prompt] Stage {stage} 고정 앞부분 조립: {prefix.tokens} 토큰 (key {prefix.key[:12]})")
+    return prefix
+
+
+class AssembledPrompt:
+    def __init__(self, prefix: StagePrefix, suffix: str, stage, budget: int, sections: dict,
+                 history_messages: int, summarized_messages: int, newly_folded: int):
+        self.prefix = prefix                  # 단계별 고정 앞부분 (제공자 캐시 대상)
+        self.suffix = suffix                  # 이전 단계 출력 + 히스토리 + 현재 입력 (매 턴 다름)
+        self.text = prefix.text + suffix
+        self.stage = stage
+        self.budget = budget
+        self.sections = sections              # 섹션 이름 → 토큰 수 (어림값)
+        self.history_messages = history_messages
+        self.summarized_messages = summarized_messages
+        self.newly_folded = newly_folded
+
+    @property
+    def tokens(self) -> int:
+        return sum(self.sections.values())
+
+    def log(self):
+        parts = ", ".join(f"{name} {tokens}" for name, tokens in self.sections.items())
+        print(f"[Prompt] Stage {self.stage} 토큰(추정) {self.tokens} / 예산 {self.budget}: {parts}")
+        print(f"[Prompt] 히스토리 원문 {self.history_messages}개, 요약 {self.summarized_messages}개"
+              + (f" (이번 턴 +{self.newly_folded})" if self.newly_folded else ""))
+        if self.tokens > self.budget:
+            print(f"[Prompt] 경고: 최근 메시지 {PROMPT_HISTORY_MIN_MESSAGES}개만 남겨도 예산 초과")
+
+
+def assemble_prompt(
+    user_input: str,
+    prompt_template: str,
+    context_data: dict,
+    conversation_history: list = None,
+    previous_stage_data: dict = None,
+    stage: int = None,
+    summary: RollingSummary = None,
+) -> AssembledPrompt:
+    """
+    단계별 프롬프트 조립 (인자는 gemini_api.build_stage_prompt 와 같음)
+    summary 가 없으면 예산을 넘는 오래된 메시지는 그냥 버린다
+    """
+    budget = PROMPT_TOKEN_BUDGETS.get(stage, max(PROMPT_TOKEN_BUDGETS.values()))
+    prefix = stage_prefix(stage, prompt_template, context_data)
+    input_section = previous_stage_text(previous_stage_data)
+    messages = [m for m in (conversation_history or []) if is_prompt_message(m)]
+    lines = [format_message(m) for m in messages]
+    line_tokens = [estimate_tokens(line) + 1 for line in lines]
+
+    sections = {
+        "template": prefix.template_tokens,
+        "context": prefix.context_tokens,
+        "previous": estimate_tokens(input_section),
+        "user": estimate_tokens(user_input),
+    }
+    fixed = sum(sections.values()) + 40   # 섹션 제목 등
+
+    # 최근 메시지부터 예산 안에 들어가는 만큼 (최소 PROMPT_HISTORY_MIN_MESSAGES 개)
+    already = summary.folded if summary is not None and summary.folded <= len(messages) else 0
+    pending = line_tokens[already:]
+    room = budget - fixed - (estimate_tokens(summary.text()) if summary is not None and already else 0)
+    if sum(pending) > room and summary is not None:
+        room = budget - fixed - summary.max_tokens
+    start, used = len(messages), 0
+    while start > already and (
+        used + line_tokens[start - 1] <= room or len(messages) - start < PROMPT_HISTORY_MIN_MESSAGES
+    ):
+        start -= 1
+        used += line_tokens[start]
+
+    newly_folded = summary.fold(messages, start) if summary is not None and start > already else 0
+    summary_text = summary.text() if summary is not None else ""
+    history_text = "\n".join(lines[start:])
+    if summary_text:
+        history_text = f"{summary_text}\n\n{history_text}" if history_text else summary_text
+    sections["summary"] = estimate_tokens(summary_text)
+    sections["history"] = used
+
+    suffix = f"""{input_section if input_section else ""}
+
+## Conversation History
+{history_text if history_text else "(대화 시작)"}
+
+## Current User Input
+User: {user_input}
+
+Assistant:"""
+    return AssembledPrompt(
+        prefix, suffix, stage, budget, sections,
+        history_messages=len(messages) - start,
+        summarized_messages=summary.folded if summary is not None else 0,
+        newly_folded=newly_folded,
+    )
@@ -0,0 +1,226 @@
+# 단계별 고정 앞부분 (prefix) 캐시
+# - prefix = 단계 프롬프트(md) + context JSON (prompt_assembler.StagePrefix, 턴 / 사용자와 무관하게 같음)
+# - 단계마다 항목 하나, key 는 prefix 내용의 sha256
+#   프롬프트 / context 파일이 바뀌면 key 가 달라지므로 그 단계의 이전 항목은 지우고 새로 등록
+#   TTL 이 지나도 다시 등록
+# - 저장소 (config.PROMPT_CACHE):
+#     gemini : google.generativeai.caching.CachedContent 로 등록 → 이후 호출은 뒷부분(히스토리 + 입력)만 전송
+#     local  : 같은 흐름을 흉내내는 프로세스 안의 대역 (replay 백엔드 / 테스트용, 최소 크기 조건도 gemini 와 같음)
+#     off    : 캐시 없음 (항상 전체 프롬프트)
+# - 절약 통계: 보내지 않은 앞부분 토큰 수 (어림값), 캐시 사용 / 미사용 호출의 지연 시간
+#   지연 시간 차이는 실제 제공자 (LLM_BACKEND=gemini, PROMPT_CACHE=gemini / off) 로만 의미가 있다
+#   (replay 의 지연 시간은 보낸 토큰 수와 무관)
+# - 현재 단계 앞부분은 1-2천 토큰 정도라 PROMPT_CACHE_MIN_TOKENS 에 못 미쳐 등록되지 않는다
+#   (프롬프트 / context 가 커지면 그때부터 캐시됨, 그 전까지는 항상 전체 전송)
+
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from .config import (
+    PROMPT_CACHE,
+    PROMPT_CACHE_MIN_TOKENS,
+    PROMPT_CACHE_MODEL_NAME,
+    PROMPT_CACHE_TTL_S,
+)
+from .prompt_assembler import estimate_tokens
+
+_EXPIRY_MARGIN_S = 60   # 만료 직전 항목은 쓰지 않고 다시 등록
+
+
+class CachedPrefix:
+    """등록된 앞부분 하나 (백엔드는 prompt[chars:] 만 보내고 handle 로 앞부분을 참조)"""
+
+    def __init__(self, provider: str, prefix, name: str, ttl_s: float, handle=None):
+        self.provider = provider
+        self.key = prefix.key
+        self.stage = prefix.stage
+        self.name = name
+        self.chars = len(prefix.text)
+        self.tokens = prefix.tokens
+        self.handle = handle
+        self.expire_at = time.monotonic() + ttl_s
+
+    def expired(self) -> bool:
+        return time.monotonic() > self.expire_at - _EXPIRY_MARGIN_S
+
+
+class LocalContextStore:
+    """CachedContent 대역 (프로세스 안의 dict, 네트워크 없음)"""
+
+    name = "local"
+
+    def __init__(self, min_tokens: int = PROMPT_CACHE_MIN_TOKENS):
+        self.min_tokens = min_tokens
+        self.entries = {}
+
+    def create(self, prefix, ttl_s: float):
+        name = f"local/{prefix.key[:16]}"
+        self.entries[name] = prefix.text
+        return name, None
+
+    def delete(self, entry: CachedPrefix):
+        self.entries.pop(entry.name, None)
+
+
+class GeminiContextStore:
+    """google.generativeai.caching.CachedContent (명시적 context caching)"""
+
+    name = "gemini"
+
+    def __init__(self, model_name: str = PROMPT_CACHE_MODEL_NAME, min_tokens: int = PROMPT_CACHE_MIN_TOKENS):
+        from google.generativeai import caching
+
+        self._caching = caching
+        self.model_name = model_name
+        self.min_tokens = min_tokens
+
+    def create(self, prefix, ttl_s: float):
+        cached = self._caching.CachedContent.create(
+            model=self.model_name,
+            display_name=f"stage{prefix.stage}-{prefix.key[:12]}",
+            contents=[prefix.text],
+            ttl=timedelta(seconds=ttl_s),
+        )
+        return cached.name, cached
+
+    def delete(self, entry: CachedPrefix):
+        from .gemini_client import get_client
+
+        get_client().release_cached_model(entry.name)
+        try:
+            entry.handle.delete()
+        except Exception as e:   # 이미 만료되어 없어진 경우 등
+            print(f"[Prompt Cache] {entry.name} 삭제 실패 (무시): {type(e).__name__}")
+
+
+class PrefixCache:
+    def __init__(self, store=None, ttl_s: float = PROMPT_CACHE_TTL_S):
+        self.store = store
+        self.ttl_s = ttl_s
+        self._entries = {}      # stage → CachedPrefix
+        self._skipped = set()   # 등록하지 않기로 한 key (최소 크기 미만 / 등록 실패)
+        self._lock = threading.Lock()
+        self.registered = 0
+        self.invalidated = 0
+        self.hits = 0
+        self.misses = 0
+        self.tokens_total = 0
+        self.tokens_sent = 0
+        self._latency = {True: deque(maxlen=500), False: deque(maxlen=500)}
+
+    @property
+    def provider(self) -> str:
+        return self.store.name if self.store is not None else "off"
+
+    def _drop(self, entry: CachedPrefix, reason: str):
+        self._entries.pop(entry.stage, None)
+        self.invalidated += 1
+        self.store.delete(entry)
+        print(f"[Prompt Cache] Stage {entry.stage} 항목 폐기 ({reason}): {entry.name}")
+
+    def acquire(self, prefix):
+        """prefix 에 해당하는 캐시 항목 (없으면 등록), 캐시를 쓸 수 없으면 None"""
+        if self.store is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(prefix.stage)
+            if entry is not None:
+                if entry.key == prefix.key and not entry.expired():
+                    return entry
+                self._drop(entry, "프롬프트 / context 변경" if entry.key != prefix.key else "TTL 만료")
+            if prefix.key in self._skipped:
+                return None
+            if prefix.tokens < self.store.min_tokens:
+                self._skipped.add(prefix.key)
+                print(f"[Prompt Cache] Stage {prefix.stage} 앞부분 {prefix.tokens} 토큰 < "
+                      f"최소 {self.store.min_tokens} 토큰 → 캐시 없이 전체 전송")
+                return None
+            started = time.perf_counter()
+            try:
+                name, handle = self.store.create(prefix, self.ttl_s)
+            except Exception as e:
+                self._skipped.add(prefix.key)
+                print(f"[Prompt Cache] Stage {prefix.stage} 등록 실패 → 캐시 없이 전체 전송: {type(e).__name__}: {e}")
+                return None
+            entry = CachedPrefix(self.provider, prefix, name, self.ttl_s, handle)
+            self._entries[prefix.stage] = entry
+            self.registered += 1
+            print(f"[Prompt Cache] Stage {prefix.stage} 등록: {name} ({prefix.tokens} 토큰, "
+                  f"{(time.perf_counter() - started) * 1000:.0f}ms)")
+            return entry
+
+    def invalidate(self, entry: CachedPrefix, reason: str = "호출 실패"):
+        """제공자 쪽에서 항목이 사라졌을 때 등 (다음 호출에서 다시 등록)"""
+        with self._lock:
+            if self._entries.get(entry.stage) is entry:
+                self._drop(entry, reason)
+
+    def record(self, assembled, cached: CachedPrefix, elapsed_s: float):
+        """호출 하나의 전송 토큰 / 지연 시간 기록"""
+        total = assembled.prefix.tokens + estimate_tokens(assembled.suffix)
+        sent = total - cached.tokens if cached is not None else total
+        with self._lock:
+            self.hits += cached is not None
+            self.misses += cached is None
+            self.tokens_total += total
+            self.tokens_sent += sent
+            self._latency[cached is not None].append(elapsed_s)
+        if cached is not None:
+            print(f"[Prompt Cache] Stage {assembled.stage} 캐시 사용: 전송 {sent} / 전체 {total} 토큰 "
+                  f"(앞부분 {cached.tokens} 토큰 절약, 누적 절약 {self.tokens_total - self.tokens_sent})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            cached, uncached = list(self._latency[True]), list(self._latency[False])
+            return {
+                "provider": self.provider,
+                "entries": len(self._entries),
+                "registered": self.registered,
+                "invalidated": self.invalidated,
+                "hits": self.hits,
+                "misses": self.misses,
+                "tokens_total": self.tokens_total,
+                "tokens_sent": self.tokens_sent,
+                "tokens_saved": self.tokens_total - self.tokens_sent,
+                "saved_ratio": 1 - self.tokens_sent / self.tokens_total if self.tokens_total else 0.0,
+                "latency_cached_s": sum(cached) / len(cached) if cached else None,
+                "latency_uncached_s": sum(uncached) / len(uncached) if uncached else None,
+            }
+
+
+def create_prefix_cache(name: str = None) -> PrefixCache:
+    name = name or PROMPT_CACHE
+    if name == "off":
+        return PrefixCache(None)
+    if name == "local":
+        return PrefixCache(LocalContextStore())
+    if name == "gemini":
+        try:
+            return PrefixCache(GeminiContextStore())
+        except ImportError as e:
+            print(f"[Prompt Cache] google.generativeai.caching 을 쓸 수 없음 → 캐시 없음: {e}")
+            return PrefixCache(None)
+    raise ValueError(f"알 수 없는 PROMPT_CACHE: {name} (gemini | local | off)")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prefix_cache() -> PrefixCache:
+    """프로세스 전체에서 공유 (단계 앞부분은 사용자끼리 같으므로)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = create_prefix_cache()
+            print(f"[Prompt Cache] {_cache.provider}")
+        return _cache
+
+
+def set_prefix_cache(cache: PrefixCache):
+    """벤치마크 등에서 캐시를 직접 바꿔 끼울 때"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
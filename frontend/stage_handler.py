@@ -44,6 +44,8 @@ class StageHandler:
         self.base_path = Path(__file__).parent.parent
         self.prompts_dir = self.base_path / "prompts"
         self.contexts_dir = self.base_path / "contexts"
+        # 단계별 (파일 버전, prompt, context) - 이 세션 안에서만, 파일이 바뀌면 다시 읽음
+        self._materials_cache = {}
         
         # session_state에 현재 단계 초기화
         if "current_stage" not in st.session_state:
@@ -114,11 +116,40 @@ class StageHandler:
         if stage is None:
             stage = self.get_current_stage()
         
+        # 파일이 그대로면 지난번에 읽은 것을 그대로 (같은 객체 → 프롬프트 고정 앞부분도 재사용됨)
+        version = self.get_stage_version(stage)
+        cached = self._materials_cache.get(stage)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        
         prompt = self.load_prompt(stage)
         context = self.load_context(stage)
+        # 읽기에 실패한 결과 (빈 프롬프트 / 빠진 context 파일) 는 저장하지 않고 다음 턴에 다시 읽음
+        if prompt and len(context) == len(self.STAGES[stage].get("context_files", [])):
+            self._materials_cache[stage] = (version, prompt, context)
+        else:
+            self._materials_cache.pop(stage, None)
         
         return prompt, context
     
+    def get_stage_version(self, stage: Optional[int] = None) -> Tuple:
+        """단계의 프롬프트 / context 파일 버전 (경로, 수정 시각, 크기) - 파일이 바뀌면 달라짐"""
+        if stage is None:
+            stage = self.get_current_stage()
+        if stage not in self.STAGES:
+            raise ValueError(f"Invalid stage: {stage}")
+        
+        paths = [self.prompts_dir / self.STAGES[stage]["prompt_file"]]
+        paths += [self.contexts_dir / p for p in self.STAGES[stage].get("context_files", [])]
+        version = []
+        for path in paths:
+            try:
+                stat = path.stat()
+                version.append((str(path), stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                version.append((str(path), None, None))
+        return tuple(version)
+    
     def move_to_next_stage(self) -> bool:
         """다음 단계로 이동 (성공 여부 반환)"""
         current = st.session_state.current_stage
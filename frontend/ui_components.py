@@ -69,6 +69,8 @@ def render_sidebar():
             # 가이드라인 메시지도 다시 추가되도록 플래그 초기화
             if "guideline_added" in st.session_state:
                 del st.session_state.guideline_added
+            if "history_summary" in st.session_state:
+                st.session_state.history_summary.reset()
             st.rerun()
 
 
@@ -3,6 +3,13 @@
 import os
 import sys
 import re
+import time
+import argparse
+import itertools
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
@@ -10,12 +17,40 @@ import pdfplumber
 from langchain_community.vectorstores import Chroma
 from langchain.schema import Document
 
-from rag.config import DSM_PDF_PATH, CHROMA_DIR, DSM_COLLECTION_NAME
-from rag.embeddings import get_embeddings
+from rag.config import (
+    DSM_PDF_PATH,
+    CHROMA_DIR,
+    DSM_COLLECTION_NAME,
+    BUILD_MANIFEST_PATH,
+    LAYOUT_CACHE_DIR,
+    CRITERIA_TABLE_PATH,
+    SOLUTION_TABLE_PATH,
+    VECTOR_SNAPSHOT_DIR,
+    DISORDER_NAME_INDEX_PATH,
+    DISORDER_CENTROIDS_PATH,
+)
+from rag.disorder_centroids import DisorderCentroids
+from rag.disorder_names import build_name_index
+from rag.embeddings import get_embeddings, index_model_key, index_collection_metadata
+from rag.layout_cache import LayoutCache, write_layout_cache
+from rag.index_tables import CriteriaTableBuilder, build_solution_table, save_solution_table
+from rag.line_arrays import (
+    CRITERIA_PATTERN,
+    SUBCRITERIA_PATTERN,
+    TITLE_MAX_LEN,
+    group_word_arrays,
+)
+from rag.manifest import BuildManifest, assign_chunk_ids, page_hash
+from rag.vector_backend import export_snapshot
 
 ICD_PATTERN = re.compile(r"^F\d{2}(\.\d+)?$")
-CRITERIA_PATTERN = re.compile(r"^[A-Z]\.\s")
-SUBCRITERIA_PATTERN = re.compile(r"^\d+\.\s")
+
+DESCRIPTION_MAX_LEN = 700
+PAGES_PER_TASK = 16   # 프로세스 풀 작업 하나당 페이지 수
+EMBED_BATCH_SIZE = 64  # 임베딩 + 커밋 단위
+QUEUE_BATCHES = 4      # 생산자-소비자 큐 크기 (배치 몇 개 분량까지 쌓아 둘지)
+
+_DONE = object()       # 생산자 종료 표시
 
 
 def looks_like_disorder_title(text: str) -> bool:
@@ -33,6 +68,18 @@ def looks_like_disorder_title(text: str) -> bool:
     return True
 
 
+def classify_line(text: str, x0: float, x1: float, width: float):
+    """
+    줄 하나의 종류 → (is_title, is_dx_criteria, is_crit_head)
+    line_arrays.classify_lines 의 한 줄짜리 버전
+    """
+    right_like = (x1 > width * 0.85) or (x0 > width * 0.6 and len(text) < TITLE_MAX_LEN)
+    is_title = right_like and looks_like_disorder_title(text)
+    is_dx_criteria = "Diagnostic Criteria" in text
+    is_crit_head = bool(CRITERIA_PATTERN.match(text) or SUBCRITERIA_PATTERN.match(text))
+    return is_title, is_dx_criteria, is_crit_head
+
+
 def group_words_to_lines(words, y_tolerance=3.0):
     lines = []
     current_line = []
@@ -76,12 +123,101 @@ def group_words_to_lines(words, y_tolerance=3.0):
     return lines
 
 
-def main():
-    print("[1] PDF 읽는 중...")
-
-    docs: list[Document] = []
-    embeddings = get_embeddings()
-
+def extract_page_words(pdf_path: str, start: int, end: int):
+    """
+    [start, end) 범위(0-based) 페이지의 단어들을 읽어서 반환
+    - 프로세스 풀 워커에서 실행되므로 pickle 가능한 dict/list만 반환한다
+    - 단어가 없는 페이지는 직렬 빌드와 마찬가지로 건너뛴다
+    """
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_idx in range(start, end):
+            page = pdf.pages[page_idx]
+            words = page.extract_words(use_text_flow=True)
+            if not words:
+                continue
+            # 세그멘테이션에 필요한 키만 남겨서 프로세스 간 전송량을 줄인다
+            words = [
+                {"text": w["text"], "x0": w["x0"], "x1": w["x1"], "top": w["top"]}
+                for w in words
+            ]
+            results.append((page_idx + 1, page.width, words))
+    return results
+
+
+def extract_page_range(pdf_path: str, start: int, end: int):
+    """[start, end) 범위 페이지를 읽어서 줄 단위로 묶어 반환 (워커 안에서 줄 묶기까지)"""
+    return [
+        (page_idx, width, group_words_to_lines(words))
+        for page_idx, width, words in extract_page_words(pdf_path, start, end)
+    ]
+
+
+def run_page_tasks(task, pdf_path: str, workers: int = 1, pages_per_task: int = PAGES_PER_TASK):
+    """
+    페이지 범위 단위 작업(task)을 프로세스 풀에 나눠 실행
+    결과는 항상 페이지 순서대로 yield 한다
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        n_pages = len(pdf.pages)
+
+    ranges = [
+        (start, min(start + pages_per_task, n_pages))
+        for start in range(0, n_pages, pages_per_task)
+    ]
+
+    if workers <= 1:
+        for start, end in ranges:
+            yield from task(pdf_path, start, end)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 한 번에 workers * 2 개 작업만 띄워 두고 순서대로 꺼낸다
+        # → 뒤쪽 페이지 결과가 메모리에 무한정 쌓이지 않는다
+        range_iter = iter(ranges)
+        in_flight = deque(
+            executor.submit(task, pdf_path, start, end)
+            for start, end in itertools.islice(range_iter, workers * 2)
+        )
+        while in_flight:
+            page_results = in_flight.popleft().result()
+            next_range = next(range_iter, None)
+            if next_range is not None:
+                in_flight.append(executor.submit(task, pdf_path, *next_range))
+            yield from page_results
+
+
+def iter_page_lines(pdf_path: str, workers: int = 1, pages_per_task: int = PAGES_PER_TASK):
+    """
+    1단계(병렬): 페이지 범위를 프로세스 풀에 나눠서 추출 + 줄 묶기
+    결과는 항상 페이지 순서대로 (page_idx, width, lines)를 yield 한다
+    """
+    yield from run_page_tasks(extract_page_range, pdf_path, workers, pages_per_task)
+
+
+def iter_cached_page_lines(cache):
+    """레이아웃 캐시에서 페이지를 읽어 줄 단위로 묶기 (PDF 파싱 없음, NumPy 버전 줄 묶기)"""
+    for page_idx, width, texts, x0, x1, top in cache.iter_page_arrays():
+        yield page_idx, width, group_word_arrays(
+            texts, x0, x1, top, width, looks_like_disorder_title
+        )
+
+
+def iter_source_pages(args):
+    """--from-layout-cache 여부에 따라 PDF 또는 레이아웃 캐시에서 페이지를 읽는다"""
+    if args.from_layout_cache:
+        cache = LayoutCache.open(LAYOUT_CACHE_DIR)
+        cache.warn_if_stale(DSM_PDF_PATH)
+        return iter_cached_page_lines(cache)
+    return iter_page_lines(DSM_PDF_PATH, workers=args.workers)
+
+
+def segment_pages(pages, icd_codes: dict = None):
+    """
+    2단계(순차): 페이지 순서대로 들어오는 줄들에 병명/기준 상태 머신을 적용
+    candidate_disorder, current_disorder, in_criteria_section 은 페이지를 넘어 이어진다
+    icd_codes 를 넘기면 Diagnostic Criteria 줄의 F코드를 병명별로 모은다 (chunk 메타데이터는 그대로)
+    """
     candidate_disorder = None
     current_disorder = None
     in_criteria_section = False
@@ -89,151 +225,360 @@ def main():
     criteria_buffer: list[str] = []
     criteria_indent: float = 0.0   # A. 줄의 들여쓰기 기억
     description_buffer: list[str] = []
-    DESCRIPTION_MAX_LEN = 700
 
-    with pdfplumber.open(DSM_PDF_PATH) as pdf:
-        for page_idx, page in enumerate(pdf.pages, start=1):
-            width = page.width
-            words = page.extract_words(use_text_flow=True)
-            if not words:
+    for page_idx, width, lines in pages:
+        for line in lines:
+            text = line["text"].strip()
+            x0 = line["x0"]
+            x1 = line["x1"]
+
+            # 줄 종류 (NumPy 버전 줄 묶기는 미리 계산해서 넘겨준다)
+            flags = line.get("flags")
+            if flags is None:
+                flags = classify_line(text, x0, x1, width)
+            is_title, is_dx_criteria, is_crit_head = flags
+
+            # 1) 오른쪽 한 줄짜리 → 병명 후보
+            if is_title:
+                # 이전 설명 flush
+                if current_disorder and description_buffer:
+                    big_text = "\n".join(description_buffer)
+                    yield Document(
+                        page_content=big_text,
+                        metadata={
+                            "page": page_idx,
+                            "disorder": current_disorder,
+                            "section": "description",
+                            "is_criteria": False,
+                        }
+                    )
+                    description_buffer = []
+                candidate_disorder = text
+                criteria_buffer = []
+                in_criteria_section = False
                 continue
 
-            lines = group_words_to_lines(words)
-
-            for line in lines:
-                text = line["text"].strip()
-                x0 = line["x0"]
-                x1 = line["x1"]
-
-                # 1) 오른쪽 한 줄짜리 → 병명 후보
-                right_like = (x1 > width * 0.85) or (x0 > width * 0.6 and len(text) < 150)
-                if right_like and looks_like_disorder_title(text):
-                    # 이전 설명 flush
-                    if current_disorder and description_buffer:
-                        big_text = "\n".join(description_buffer)
-                        docs.append(Document(
-                            page_content=big_text,
-                            metadata={
-                                "page": page_idx,
-                                "disorder": current_disorder,
-                                "section": "description",
-                                "is_criteria": False,
-                            }
-                        ))
-                        description_buffer = []
-                    candidate_disorder = text
-                    criteria_buffer = []
-                    in_criteria_section = False
-                    continue
-
-                # 2) Diagnostic Criteria 줄 → 병명 확정 + criteria 시작
-                if "Diagnostic Criteria" in text:
-                    # F코드 있는지 확인 (지금은 안 써도 됨)
-                    for w in line["words"]:
-                        if ICD_PATTERN.match(w["text"].strip()):
-                            break
+            # 2) Diagnostic Criteria 줄 → 병명 확정 + criteria 시작
+            if is_dx_criteria:
+                # F코드 있는지 확인 → 병명 정규화 인덱스용 (예: "309.81 (F43.10)")
+                codes = [token.strip("()[],;:") for token in text.split()]
+                codes = [code for code in codes if ICD_PATTERN.match(code)]
 
-                    if candidate_disorder:
-                        current_disorder = candidate_disorder
-                        candidate_disorder = None
+                if candidate_disorder:
+                    current_disorder = candidate_disorder
+                    candidate_disorder = None
 
-                    in_criteria_section = True
-                    criteria_buffer = []
-                    criteria_indent = 0.0
-                    continue
+                if icd_codes is not None and current_disorder:
+                    known = icd_codes.setdefault(current_disorder, [])
+                    known.extend(code for code in codes if code not in known)
 
-                # 3) criteria 구간 안에서
-                is_crit_head = bool(CRITERIA_PATTERN.match(text) or SUBCRITERIA_PATTERN.match(text))
+                in_criteria_section = True
+                criteria_buffer = []
+                criteria_indent = 0.0
+                continue
 
-                if in_criteria_section and current_disorder:
-                    if is_crit_head:
-                        # 새로운 A./B./1./2. 시작
+            # 3) criteria 구간 안에서
+            if in_criteria_section and current_disorder:
+                if is_crit_head:
+                    # 새로운 A./B./1./2. 시작
+                    criteria_buffer.append(text)
+                    # 이 줄의 들여쓰기 기억
+                    criteria_indent = x0
+                    continue
+                else:
+                    # 패턴은 아니지만 아직 criteria 구간인 줄
+                    # → 들여쓰기가 기준줄보다 조금 더 들어가 있으면 이어지는 줄로 본다
+                    # 여유값 3~5 정도
+                    if criteria_buffer and x0 >= criteria_indent - 2:
+                        # 같은 항목의 이어지는 줄
                         criteria_buffer.append(text)
-                        # 이 줄의 들여쓰기 기억
-                        criteria_indent = x0
                         continue
                     else:
-                        # 패턴은 아니지만 아직 criteria 구간인 줄
-                        # → 들여쓰기가 기준줄보다 조금 더 들어가 있으면 이어지는 줄로 본다
-                        # 여유값 3~5 정도
-                        if criteria_buffer and x0 >= criteria_indent - 2:
-                            # 같은 항목의 이어지는 줄
-                            criteria_buffer.append(text)
-                            continue
-                        else:
-                            # 이제 진짜 기준 끝난 것 → 지금까지 쌓인 기준 저장
-                            criteria_text = "\n".join(criteria_buffer)
-                            docs.append(Document(
-                                page_content=criteria_text,
-                                metadata={
-                                    "page": page_idx,
-                                    "disorder": current_disorder,
-                                    "section": "criteria",
-                                    "is_criteria": True,
-                                }
-                            ))
-                            criteria_buffer = []
-                            in_criteria_section = False
-                            # 그리고 이 줄은 설명부로 내려가서 처리한다
-
-                # 4) 설명부로 저장
-                if current_disorder:
-                    description_buffer.append(text)
-                    total_len = sum(len(t) for t in description_buffer)
-                    if total_len >= DESCRIPTION_MAX_LEN:
-                        big_text = "\n".join(description_buffer)
-                        docs.append(Document(
-                            page_content=big_text,
+                        # 이제 진짜 기준 끝난 것 → 지금까지 쌓인 기준 저장
+                        criteria_text = "\n".join(criteria_buffer)
+                        yield Document(
+                            page_content=criteria_text,
                             metadata={
                                 "page": page_idx,
                                 "disorder": current_disorder,
-                                "section": "description",
-                                "is_criteria": False,
+                                "section": "criteria",
+                                "is_criteria": True,
                             }
-                        ))
-                        description_buffer = []
-                else:
-                    continue
-
-            # 페이지 끝: criteria 남아 있으면 저장
-            if in_criteria_section and criteria_buffer and current_disorder:
-                criteria_text = "\n".join(criteria_buffer)
-                docs.append(Document(
-                    page_content=criteria_text,
-                    metadata={
-                        "page": page_idx,
-                        "disorder": current_disorder,
-                        "section": "criteria",
-                        "is_criteria": True,
-                    }
-                ))
-                criteria_buffer = []
-                in_criteria_section = False
+                        )
+                        criteria_buffer = []
+                        in_criteria_section = False
+                        # 그리고 이 줄은 설명부로 내려가서 처리한다
+
+            # 4) 설명부로 저장
+            if current_disorder:
+                description_buffer.append(text)
+                total_len = sum(len(t) for t in description_buffer)
+                if total_len >= DESCRIPTION_MAX_LEN:
+                    big_text = "\n".join(description_buffer)
+                    yield Document(
+                        page_content=big_text,
+                        metadata={
+                            "page": page_idx,
+                            "disorder": current_disorder,
+                            "section": "description",
+                            "is_criteria": False,
+                        }
+                    )
+                    description_buffer = []
+            else:
+                continue
 
-            # 페이지 끝: 설명 남아 있으면 저장
-            if current_disorder and description_buffer:
-                big_text = "\n".join(description_buffer)
-                docs.append(Document(
-                    page_content=big_text,
-                    metadata={
-                        "page": page_idx,
-                        "disorder": current_disorder,
-                        "section": "description",
-                        "is_criteria": False,
-                    }
-                ))
-                description_buffer = []
-
-    print(f" → 총 {len(docs)}개 chunk 생성")
-
-    print("[2] 임베딩 + Chroma 저장 중...")
-    db = Chroma.from_documents(
-        documents=docs,
-        embedding=embeddings,
+        # 페이지 끝: criteria 남아 있으면 저장
+        if in_criteria_section and criteria_buffer and current_disorder:
+            criteria_text = "\n".join(criteria_buffer)
+            yield Document(
+                page_content=criteria_text,
+                metadata={
+                    "page": page_idx,
+                    "disorder": current_disorder,
+                    "section": "criteria",
+                    "is_criteria": True,
+                }
+            )
+            criteria_buffer = []
+            in_criteria_section = False
+
+        # 페이지 끝: 설명 남아 있으면 저장
+        if current_disorder and description_buffer:
+            big_text = "\n".join(description_buffer)
+            yield Document(
+                page_content=big_text,
+                metadata={
+                    "page": page_idx,
+                    "disorder": current_disorder,
+                    "section": "description",
+                    "is_criteria": False,
+                }
+            )
+            description_buffer = []
+
+
+def record_page_hashes(pages, page_hashes: dict):
+    """페이지를 그대로 흘려보내면서 페이지별 content hash를 기록"""
+    for page_idx, width, lines in pages:
+        page_hashes[str(page_idx)] = page_hash(width, lines)
+        yield page_idx, width, lines
+
+
+def open_collection(embeddings):
+    # 모델 / 벡터 차원을 컬렉션 메타데이터에 남긴다 (서버가 차원 불일치 쿼리를 거부)
+    return Chroma(
+        embedding_function=embeddings,
         persist_directory=CHROMA_DIR,
         collection_name=DSM_COLLECTION_NAME,
+        collection_metadata=index_collection_metadata(),
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DSM-5-TR PDF → Chroma DB 빌드")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="페이지 추출에 쓸 프로세스 수 (1이면 직렬 처리)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=EMBED_BATCH_SIZE,
+        help="한 번에 임베딩 + 커밋할 chunk 수",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="매니페스트를 무시하고 컬렉션을 비운 뒤 처음부터 다시 빌드",
     )
+    parser.add_argument(
+        "--build-layout-cache",
+        action="store_true",
+        help="PDF 단어 레이아웃만 추출해서 레이아웃 캐시에 저장하고 종료",
+    )
+    parser.add_argument(
+        "--from-layout-cache",
+        action="store_true",
+        help="PDF 대신 레이아웃 캐시에서 바로 세그멘테이션",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="세그멘테이션만 하고 chunk 통계만 출력 (임베딩/DB 저장 안 함)",
+    )
+    return parser.parse_args(argv)
+
+
+def build_layout_cache(args):
+    print(f"[1] PDF 레이아웃 추출 중... (workers={args.workers})")
+    pages = run_page_tasks(extract_page_words, DSM_PDF_PATH, workers=args.workers)
+    n_words = write_layout_cache(LAYOUT_CACHE_DIR, pages, DSM_PDF_PATH)
+    print(f"[완료] 레이아웃 캐시 저장됨: {LAYOUT_CACHE_DIR} (단어 {n_words}개)")
+
+
+def dry_run(args):
+    print("[1] 세그멘테이션만 실행 (dry run)")
+    started = time.perf_counter()
+    counts = Counter()
+    disorders = set()
+    for doc in segment_pages(iter_source_pages(args)):
+        counts[doc.metadata["section"]] += 1
+        disorders.add(doc.metadata["disorder"])
+    elapsed = time.perf_counter() - started
+    print(f" → chunk {sum(counts.values())}개 {dict(counts)}, 병명 {len(disorders)}개, {elapsed:.2f}초")
+
+
+def produce_chunks(chunk_queue, stop_event, args, committed_ids, seen_ids, page_hashes,
+                   criteria_table, icd_codes):
+    """
+    생산자 스레드: PDF 추출 + 세그멘테이션 결과를 bounded queue 에 넣는다
+    - 이미 커밋된 chunk 는 큐에 넣지 않고 ID만 기록 (stale 판정용)
+    - criteria 테이블 / ICD 코드는 커밋 여부와 상관없이 모든 chunk 로 만든다
+    - 큐가 가득 차면 소비자(임베딩)가 따라올 때까지 대기 → 메모리 사용량 일정
+    """
+    def put(item) -> bool:
+        while not stop_event.is_set():
+            try:
+                chunk_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        pages = record_page_hashes(iter_source_pages(args), page_hashes)
+        for chunk in assign_chunk_ids(segment_pages(pages, icd_codes)):
+            seen_ids.add(chunk[0])
+            criteria_table.add(chunk[2])
+            if chunk[0] in committed_ids:
+                continue
+            if not put(chunk):
+                return
+        put((_DONE, None))
+    except BaseException as e:
+        put((_DONE, e))
+
+
+def iter_chunk_batches(chunk_queue, batch_size: int):
+    """소비자 쪽: 큐에서 꺼낸 chunk 들을 batch_size 단위로 묶어서 yield"""
+    batch = []
+    while True:
+        item = chunk_queue.get()
+        if item[0] is _DONE:
+            if item[1] is not None:
+                raise item[1]
+            break
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.build_layout_cache:
+        build_layout_cache(args)
+        return
+    if args.dry_run:
+        dry_run(args)
+        return
+
+    print(f"[1] 컬렉션 / 매니페스트 확인 중... (workers={args.workers})")
+
+    embeddings = get_embeddings()
+    model_key = index_model_key()
+    manifest = BuildManifest.load(BUILD_MANIFEST_PATH)
+    db = open_collection(embeddings)
+
+    # 매니페스트가 없거나(이전 방식으로 만든 DB) 모델이 바뀌었으면 컬렉션을 비우고 새로 시작
+    if args.rebuild or not manifest.exists or not manifest.is_compatible(model_key):
+        print(" → 컬렉션 초기화 (전체 재빌드)")
+        db.delete_collection()
+        db = open_collection(embeddings)
+        manifest.reset(model_key)
+        manifest.save()
+
+    print("[2] PDF 읽기 + 임베딩 + Chroma 저장 중... (스트리밍)")
+
+    page_hashes: dict = {}
+    seen_ids: set = set()
+    chunk_queue = queue.Queue(maxsize=args.batch_size * QUEUE_BATCHES)
+    stop_event = threading.Event()
+    criteria_table = CriteriaTableBuilder()
+    icd_codes: dict = {}
+    producer = threading.Thread(
+        target=produce_chunks,
+        args=(chunk_queue, stop_event, args, set(manifest.chunks), seen_ids, page_hashes,
+              criteria_table, icd_codes),
+        daemon=True,
+    )
+    producer.start()
+
+    committed = 0
+    try:
+        for batch in iter_chunk_batches(chunk_queue, args.batch_size):
+            db.add_documents(
+                [doc for _, _, doc in batch],
+                ids=[chunk_id for chunk_id, _, _ in batch],
+            )
+            # 배치가 컬렉션에 들어간 뒤에만 매니페스트에 기록 → 중단돼도 여기서부터 이어짐
+            manifest.commit_chunks(batch)
+            manifest.save()
+            committed += len(batch)
+            print(f" → {committed}개 커밋")
+    finally:
+        stop_event.set()
+        producer.join()
+
+    changed = manifest.changed_pages(page_hashes)
+    stale = [chunk_id for chunk_id in manifest.chunks if chunk_id not in seen_ids]
+    print(f" → 총 {len(seen_ids)}개 chunk 생성 (새로 임베딩: {committed}개, "
+          f"재사용: {len(seen_ids) - committed}개, 삭제: {len(stale)}개)")
+    print(f" → 변경된 페이지: {len(changed)}개")
+    print(f" → 임베딩 캐시: {embeddings.stats()}")
+
+    # 오래된 chunk 삭제는 새 chunk가 모두 들어간 다음에 한다
+    if stale:
+        db.delete(ids=stale)
+        manifest.remove_chunks(stale)
+
+    manifest.pages.clear()
+    manifest.pages.update(page_hashes)
+    manifest.save()
     db.persist()
+
+    criteria_table.save(CRITERIA_TABLE_PATH)
+    print(f" → criteria 테이블: 병명 {len(criteria_table.table)}개 ({CRITERIA_TABLE_PATH})")
+
+    # 병명 정규화 인덱스: 정식 병명 + 별칭 파일 + F코드
+    name_index = build_name_index(criteria_table.table, icd_codes)
+    name_index.save(DISORDER_NAME_INDEX_PATH)
+    print(f" → 병명 인덱스: 병명 {len(name_index)}개, 별칭 {len(name_index.aliases)}개 병명, "
+          f"F코드 {sum(map(len, icd_codes.values()))}개 ({DISORDER_NAME_INDEX_PATH})")
+
+    # memmap 백엔드용 스냅샷 (VECTOR_BACKEND = "memmap" 일 때 서버가 사용)
+    snapshot_rows = export_snapshot(db._collection, VECTOR_SNAPSHOT_DIR)
+    print(f" → 벡터 스냅샷: {snapshot_rows}개 ({VECTOR_SNAPSHOT_DIR})")
+
+    # 계층 검색 1단계용 병명별 centroid (스냅샷 벡터로 계산)
+    centroids = DisorderCentroids.from_snapshot(VECTOR_SNAPSHOT_DIR)
+    centroids.save(DISORDER_CENTROIDS_PATH)
+    print(f" → 병명 centroid: 병명 {len(centroids)}개, centroid {len(centroids.vectors)}개 ({DISORDER_CENTROIDS_PATH})")
+
+    # /rag/solution 은 병명이 정해져 있으므로 병명마다 evidence 를 미리 검색해 둔다
+    solution_table = build_solution_table(
+        criteria_table.table,
+        embeddings.embed_queries,
+        lambda vec, k, where: db.similarity_search_by_vector(vec, k=k, filter=where),
+    )
+    save_solution_table(solution_table, SOLUTION_TABLE_PATH)
+    print(f" → solution 테이블: 병명 {len(solution_table)}개 ({SOLUTION_TABLE_PATH})")
     print("[완료] DSM Chroma DB 생성됨:", CHROMA_DIR)
 
 
@@ -1,4 +1,5 @@
 # rag/config.py
+import os
 
 # DSM-5-TR PDF 파일 위치 (프로젝트 루트에 있다고 가정)
 DSM_PDF_PATH = "DSM-5-TR.pdf"
@@ -8,3 +9,76 @@ CHROMA_DIR = "./rag/chroma_db"
 
 # 컬렉션 이름
 DSM_COLLECTION_NAME = "dsm5tr"
+
+# 빌드 매니페스트 (페이지/chunk 해시, 커밋된 chunk ID) 위치
+BUILD_MANIFEST_PATH = "./rag/chroma_db/build_manifest.json"
+
+# 임베딩 모델
+EMBEDDING_MODEL_NAME = "jinaai/jina-embeddings-v3"
+
+# PDF 단어 레이아웃 캐시 (세그멘테이션 튜닝용, build_dsm_db.py --build-layout-cache 로 생성)
+LAYOUT_CACHE_DIR = "./rag/layout_cache"
+
+# 임베딩 캐시 (SQLite, float16) 위치 / 서버 메모리 LRU 크기
+EMBEDDING_CACHE_PATH = "./rag/embedding_cache.sqlite3"
+EMBEDDING_CACHE_MEMORY_ITEMS = 4096
+
+# disorder → 대표 criteria 문단 테이블 (빌드 시 생성, 서버에서 dict 조회)
+CRITERIA_TABLE_PATH = "./rag/chroma_db/criteria_table.json"
+# disorder → /rag/solution evidence (빌드 때 생성, 없으면 서버 시작 때 생성해서 저장)
+SOLUTION_TABLE_PATH = "./rag/chroma_db/solution_table.json"
+# 병명 정규화 인덱스 (정식 병명 / 별칭 / ICD 코드 → 정식 병명, 빌드 때 생성)
+DISORDER_NAME_INDEX_PATH = "./rag/chroma_db/disorder_names.json"
+# 직접 관리하는 별칭 (한국어 이름, 약어 등)
+DISORDER_ALIASES_PATH = "./rag/disorder_aliases.json"
+
+# API 쿼리 임베딩 마이크로 배칭
+EMBED_BATCH_MAX_SIZE = 32      # 한 배치 최대 쿼리 수
+EMBED_BATCH_MAX_WAIT_MS = 5    # 첫 쿼리 이후 더 모으는 시간
+EMBED_QUEUE_MAX = 256          # 대기열 한도 (넘으면 503)
+EMBED_TIMEOUT_S = 10.0         # 요청별 임베딩 deadline (넘으면 504)
+
+# 임베딩 백엔드: "hf" (HuggingFace fp32 PyTorch) | "onnx" (ONNX Runtime CPU)
+#               | "remote" (공유 추론 프로세스, rag/embedding_server.py)
+# api/serve.py --shared 는 환경변수 RAG_EMBEDDING_BACKEND / RAG_VECTOR_BACKEND (/ RAG_EMBEDDING_SERVER_SOCKET) 로 워커 설정을 바꾼다
+EMBEDDING_BACKEND = os.environ.get("RAG_EMBEDDING_BACKEND", "hf")
+# ONNX 모델 위치 (python rag/onnx_embeddings.py export 로 생성) / int8 양자화 모델 사용 여부
+ONNX_MODEL_DIR = "./rag/onnx_model"
+ONNX_QUANTIZED = True
+
+# 인덱스 벡터 차원 (Matryoshka truncation): None 이면 모델 전체 차원(1024)
+# 256 / 512 등으로 바꾸면 빌드/쿼리 모두 앞쪽 N차원만 잘라서 다시 정규화한다 (바꾸면 재빌드 필요)
+EMBEDDING_FULL_DIM = 1024
+EMBEDDING_DIM = None
+
+# 벡터 검색 백엔드: "chroma" (LangChain Chroma) | "memmap" (export 한 float16 스냅샷)
+VECTOR_BACKEND = os.environ.get("RAG_VECTOR_BACKEND", "chroma")
+VECTOR_SNAPSHOT_DIR = "./rag/chroma_db/snapshot"
+
+# 계층 검색 (rag/disorder_centroids.py): 병명별 centroid → 병명 상위 N개 안에서만 chunk 검색
+DISORDER_CENTROIDS_PATH = "./rag/chroma_db/disorder_centroids.npz"
+CENTROIDS_PER_DISORDER = 4      # 병명당 최대 centroid 수
+CENTROIDS_MIN_CHUNKS = 8        # chunk 몇 개당 centroid 1개
+HIERARCHICAL_DISORDERS = 8      # 1단계에서 고르는 병명 수 (요청의 coarse_n 으로 변경 가능)
+
+# 공유 추론 프로세스 (EMBEDDING_BACKEND = "remote")
+EMBEDDING_SERVER_SOCKET = os.environ.get("RAG_EMBEDDING_SERVER_SOCKET", "/tmp/dsm_rag_embedding.sock")
+EMBEDDING_SERVER_BACKEND = "hf"          # 추론 프로세스가 실제로 올리는 백엔드 ("hf" | "onnx")
+EMBEDDING_SERVER_CONNECT_TIMEOUT_S = 120.0   # 워커가 서버 준비를 기다리는 최대 시간
+
+# API 동시성 (api/concurrency.py)
+API_MAX_IN_FLIGHT = 16           # 동시에 처리하는 RAG 요청 수
+API_MAX_WAITING = 64             # 그 이상 줄 세울 수 있는 요청 수 (넘으면 503)
+API_SEARCH_THREADS = 4           # 벡터 검색 전용 스레드 수
+API_REQUEST_TIMEOUT_S = 15.0     # 기본 요청 deadline (X-Request-Timeout 헤더로 변경 가능)
+API_MAX_REQUEST_TIMEOUT_S = 60.0
+API_BATCH_MAX_ITEMS = 1024       # /rag/hypothesis:batch 한 요청의 최대 보고서 수
+API_BATCH_STREAM_CHUNK = 64      # NDJSON 스트리밍 시 한 번에 처리하는 보고서 수
+API_GZIP_MIN_BYTES = 1024        # 이보다 큰 응답만 gzip (Accept-Encoding 협상)
+
+# retrieve_candidates 결과 캐시 (api/result_cache.py)
+RESULT_CACHE_MAX_ITEMS = 1024        # exact 단계 최대 개수 (0 이면 결과 캐시 끔)
+RESULT_CACHE_SEMANTIC_ITEMS = 1024   # semantic 단계 최대 개수
+RESULT_CACHE_SIM_THRESHOLD = 0.97    # 이 cosine 이상이면 같은 질의로 보고 재사용 (None 이면 semantic 끔)
+RESULT_CACHE_TTL_S = 600.0
+RESULT_CACHE_VERSION_CHECK_S = 5.0   # 인덱스 재빌드 여부 확인 주기
@@ -0,0 +1,137 @@
+# rag/disorder_centroids.py
+# 병명별 centroid 벡터 (계층 검색 1단계용)
+# - 빌드 때 memmap 스냅샷의 chunk 벡터를 병명별로 모아서 centroid 를 만든다
+#   chunk 가 많은 병명은 작은 spherical k-means 로 centroid 여러 개 (설명 / 기준 문단이 섞여 있으므로)
+# - 검색: 1) 쿼리와 centroid 의 cosine → 병명 상위 N개
+#         2) 그 병명들 안에서만 chunk top-k (where={"disorder": {"$in": [...]}}) → 기존과 같은 투표
+#
+# 파일: DISORDER_CENTROIDS_PATH (.npz: vectors (m, dim) float32 정규화, owner (m,) int32, names)
+
+import os, sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+from rag.config import (
+    CENTROIDS_MIN_CHUNKS,
+    CENTROIDS_PER_DISORDER,
+    DISORDER_CENTROIDS_PATH,
+    VECTOR_SNAPSHOT_DIR,
+)
+
+_KMEANS_ITERS = 20
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+
+
+def _spherical_kmeans(x: np.ndarray, k: int, seed: int = 0) -> np.ndarray:
+    """정규화된 벡터 x (n, dim) → centroid k개 (결과가 매번 같도록 seed 고정)"""
+    rng = np.random.default_rng(seed)
+    centers = x[rng.choice(len(x), size=k, replace=False)]
+    for _ in range(_KMEANS_ITERS):
+        assign = np.argmax(x @ centers.T, axis=1)
+        new = np.stack([
+            x[assign == c].sum(axis=0) if np.any(assign == c) else centers[c]
+            for c in range(k)
+        ])
+        new = _normalize(new)
+        if np.allclose(new, centers):
+            break
+        centers = new
+    return centers
+
+
+class DisorderCentroids:
+    def __init__(self, vectors: np.ndarray, owner: np.ndarray, names: list):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.owner = np.asarray(owner, dtype=np.int32)
+        self.names = list(names)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def build(cls, matrix, disorder_id, names: list,
+              per_disorder: int = CENTROIDS_PER_DISORDER, min_chunks: int = CENTROIDS_MIN_CHUNKS):
+        """
+        matrix: (n, dim) chunk 벡터, disorder_id: (n,) names 인덱스 (-1 = 병명 없음)
+        chunk 가 min_chunks 개당 centroid 1개, 병명당 최대 per_disorder 개
+        """
+        disorder_id = np.asarray(disorder_id)
+        vectors, owner = [], []
+        for i in range(len(names)):
+            rows = np.flatnonzero(disorder_id == i)
+            if len(rows) == 0:
+                continue
+            x = _normalize(np.asarray(matrix[rows], dtype=np.float32))
+            k = max(1, min(per_disorder, len(rows) // max(min_chunks, 1)))
+            centers = _normalize(x.mean(axis=0, keepdims=True)) if k == 1 else _spherical_kmeans(x, k, seed=i)
+            vectors.append(centers)
+            owner += [i] * len(centers)
+        dim = matrix.shape[1]
+        return cls(np.concatenate(vectors) if vectors else np.zeros((0, dim), np.float32), owner, names)
+
+    @classmethod
+    def from_snapshot(cls, snapshot_dir: str = VECTOR_SNAPSHOT_DIR, **kwargs):
+        from rag.vector_backend import MemmapBackend
+
+        snapshot = MemmapBackend(snapshot_dir)
+        return cls.build(snapshot.matrix, snapshot.disorder_id, snapshot.disorder_names, **kwargs)
+
+    def save(self, path: str = DISORDER_CENTROIDS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, vectors=self.vectors, owner=self.owner, names=np.array(self.names, dtype=object))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = DISORDER_CENTROIDS_PATH):
+        """파일이 없으면 None"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=True) as data:
+            return cls(data["vectors"], data["owner"], data["names"].tolist())
+
+    def top_disorders(self, query_vec, n: int) -> list:
+        """centroid cosine 이 높은 병명 n개 (병명마다 가장 가까운 centroid 기준)"""
+        q = np.asarray(query_vec, dtype=np.float32)
+        sims = self.vectors @ (q / max(float(np.linalg.norm(q)), 1e-12))
+        best = np.full(len(self.names), -np.inf, dtype=np.float32)
+        np.maximum.at(best, self.owner, sims)
+        n = min(n, int(np.isfinite(best).sum()))
+        if n <= 0:
+            return []
+        top = np.argpartition(-best, n - 1)[:n]
+        top = top[np.argsort(-best[top], kind="stable")]
+        return [self.names[i] for i in top]
+
+
+def coarse_to_fine_search(index, centroids: DisorderCentroids, query_vec, k: int, n_disorders: int):
+    """
+    1단계: centroid 로 병명 n_disorders 개 고르기
+    2단계: 그 병명들의 chunk 안에서만 top-k
+    → (hits, 1단계 병명 목록)
+    """
+    shortlist = centroids.top_disorders(query_vec, n_disorders)
+    if not shortlist:
+        return index.search(query_vec, k=k), shortlist
+    return index.search(query_vec, k=k, where={"disorder": {"$in": shortlist}}), shortlist
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="memmap 스냅샷 → 병명별 centroid")
+    parser.add_argument("--snapshot", default=VECTOR_SNAPSHOT_DIR)
+    parser.add_argument("--out", default=DISORDER_CENTROIDS_PATH)
+    args = parser.parse_args(argv)
+
+    centroids = DisorderCentroids.from_snapshot(args.snapshot)
+    centroids.save(args.out)
+    print(f"[완료] centroid 저장됨: {args.out} (병명 {len(centroids)}개, centroid {len(centroids.vectors)}개)")
+
+
+if __name__ == "__main__":
+    main()
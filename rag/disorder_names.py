@@ -0,0 +1,229 @@
+# rag/disorder_names.py
+# 병명 정규화 인덱스: LLM 이 넘긴 병명 → 인덱스의 정식 병명(disorder 메타데이터 값)
+# - 정식 병명 + 별칭(rag/disorder_aliases.json, 한국어 이름 등) + ICD F코드
+# - 정규화: NFKC, 소문자, 구두점 제거, "disorder" / "장애" 접미사 제거, 공백 무시
+# - 정확히 안 맞으면 trigram Jaccard 로 가장 가까운 이름 (미리 만든 trigram → 이름 posting 사용)
+# - "불안장애", "양극성 장애" 같은 상위 분류 이름은 하위 병명 하나로 바꾸지 않는다 (CATEGORY_NAMES → None)
+# - fuzzy 는 specifier ("Other Specified" / "Unspecified") 가 같은 이름끼리만, 1, 2위가 비슷하면 고르지 않는다
+#   (고르지 않은 경우 is_ambiguous → /rag/solution 응답에 ambiguous 표시)
+#
+# 빌드 때 build_dsm_db.py 가 인덱스 옆에 저장하고, 서버는 시작할 때 로드한다
+
+import re
+import unicodedata
+from collections import Counter
+from itertools import chain
+from functools import lru_cache
+
+from rag.config import DISORDER_ALIASES_PATH, DISORDER_NAME_INDEX_PATH
+from rag.index_tables import load_json, save_json_atomic
+
+FUZZY_MIN_SCORE = 0.55    # trigram Jaccard 가 이보다 낮으면 모르는 병명으로 본다
+FUZZY_MIN_MARGIN = 0.1    # 1위와 (다른 병명인) 2위 점수 차가 이보다 작으면 고르지 않음
+
+_PUNCT = re.compile(r"[^\w\s.]|_")
+_SPACES = re.compile(r"\s+")
+_PAREN = re.compile(r"\(([^)]*)\)")
+_SUFFIXES = ("disorders", "disorder", "장애")
+_ICD = re.compile(r"^f\d{2}(\.\d+)?$")
+# DSM 의 "Other Specified X" / "Unspecified X" (공백 뺀 키의 앞부분), X 가 같아도 서로 다른 병명
+_SPECIFIERS = ("otherspecified", "unspecified", "달리명시된", "명시되지않는")
+
+# 여러 병명을 묶는 상위 분류 이름 (별칭으로 쓰지 않음, fuzzy 로 하위 병명 하나에 붙지 않도록 막는다)
+CATEGORY_NAMES = (
+    "Anxiety Disorders", "불안장애", "불안 장애",
+    "Bipolar and Related Disorders", "Bipolar Disorder", "양극성 장애", "양극성 및 관련 장애", "조울증",
+    "Depressive Disorders", "우울장애", "우울 장애",
+    "Obsessive-Compulsive and Related Disorders",
+    "Trauma- and Stressor-Related Disorders",
+    "Schizophrenia Spectrum and Other Psychotic Disorders", "Psychotic Disorder", "정신병적 장애",
+    "Feeding and Eating Disorders", "Eating Disorder", "섭식장애", "식이장애",
+    "Personality Disorders", "성격장애",
+)
+
+
+def normalize_name(name: str) -> str:
+    """NFKC + 소문자 + 구두점 → 공백 (ICD 코드의 '.' 은 남김)"""
+    text = unicodedata.normalize("NFKC", name or "").casefold()
+    text = _PUNCT.sub(" ", text)
+    return _SPACES.sub(" ", text).strip(" .")
+
+
+def _strip_suffix(norm: str) -> str:
+    for suffix in _SUFFIXES:
+        if norm.endswith(suffix) and len(norm) > len(suffix):
+            return norm[: -len(suffix)].rstrip()
+    return norm
+
+
+def name_keys(name: str) -> list:
+    """
+    한 이름의 정확 매칭 키들 (공백 무시, 접미사 유무)
+    "Social Anxiety Disorder (Social Phobia)" 처럼 괄호가 있으면 괄호 밖 / 안 이름도 키로 쓴다
+    """
+    names = [name or ""]
+    if "(" in names[0]:
+        names += [_PAREN.sub(" ", names[0])] + _PAREN.findall(names[0])
+    keys = []
+    for n in names:
+        norm = normalize_name(n)
+        keys += [norm.replace(" ", ""), _strip_suffix(norm).replace(" ", "")]
+    return [k for k in dict.fromkeys(keys) if k]
+
+
+def _specifier(key: str) -> str:
+    return next((prefix for prefix in _SPECIFIERS if key.startswith(prefix)), "")
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DisorderNameIndex:
+    def __init__(self, canonical, aliases: dict = None, icd_codes: dict = None):
+        """
+        canonical: 정식 병명 목록
+        aliases  : 정식 병명 → [별칭, ...]
+        icd_codes: 정식 병명 → [F코드, ...]
+        """
+        self.canonical = list(dict.fromkeys(canonical))
+        known = set(self.canonical)
+        self.aliases = {c: list(a) for c, a in (aliases or {}).items() if c in known}
+        self.icd_codes = {c: list(codes) for c, codes in (icd_codes or {}).items()}
+
+        # 상위 분류 이름 키 (정식 병명과 겹치는 키는 제외)
+        # 별칭보다는 우선 → 예전에 저장한 인덱스 파일에 "불안장애" 같은 별칭이 남아 있어도 하위 병명으로 바꾸지 않음
+        canonical_keys = {key for c in self.canonical for key in name_keys(c)}
+        self._categories = {
+            key for name in CATEGORY_NAMES for key in name_keys(name) if key not in canonical_keys
+        }
+
+        # 정확 매칭: 키 → 정식 병명 (정식 이름이 별칭보다 우선)
+        self._exact = {}
+        names = [(c, c) for c in self.canonical]
+        names += [(alias, c) for c, items in self.aliases.items() for alias in items
+                  if not any(key in self._categories for key in name_keys(alias))]
+        for name, canonical in names:
+            for key in name_keys(name):
+                self._exact.setdefault(key, canonical)
+        for canonical, codes in self.icd_codes.items():
+            for code in codes:
+                self._exact.setdefault(normalize_name(code), canonical)
+
+        # fuzzy: 접미사 뺀 키(괄호 밖 이름 포함)의 trigram posting
+        self._entries = []          # (trigram 개수, 정식 병명, specifier)
+        self._postings = {}         # trigram → [entry 번호, ...]
+        for name, canonical in names:
+            for key in name_keys(name)[1:] or name_keys(name):
+                tris = _trigrams(key)
+                idx = len(self._entries)
+                self._entries.append((len(tris), canonical, _specifier(key)))
+                for tri in tris:
+                    self._postings.setdefault(tri, []).append(idx)
+
+        self._lookup = lru_cache(maxsize=4096)(self._match)
+
+    def __len__(self):
+        return len(self.canonical)
+
+    def resolve(self, name: str):
+        """정식 병명 또는 None (상위 분류 이름 / 어느 병명인지 애매한 경우도 None)"""
+        return self._lookup(name)[0]
+
+    def is_ambiguous(self, name: str) -> bool:
+        """정식 병명 하나로 정할 수 없는 이름인지 (상위 분류 이름, specifier 만 다른 병명, 비슷한 후보 여럿)"""
+        return self._lookup(name)[1]
+
+    def _match(self, name: str):
+        """(정식 병명 또는 None, 애매해서 고르지 않았는지)"""
+        if not name:
+            return None, False
+        norm = normalize_name(name)
+        if _ICD.match(norm):
+            return self._exact.get(norm), False
+        keys = name_keys(name)
+        for key in keys:
+            if key in self._exact:
+                return self._exact[key], False
+        if any(key in self._categories for key in keys):
+            return None, True
+        return self._fuzzy(keys[1] if len(keys) > 1 else keys[0]) if keys else (None, False)
+
+    def _fuzzy(self, key: str):
+        if not key:
+            return None, False
+        query = _trigrams(key)
+        specifier = _specifier(key)
+        overlap = Counter(chain.from_iterable(self._postings.get(tri, ()) for tri in query))
+        scores = {}          # 정식 병명 → 최고 점수 (specifier 가 같은 이름만)
+        other_specifier = 0.0
+        for idx, shared in overlap.items():
+            size, canonical, entry_specifier = self._entries[idx]
+            score = shared / (len(query) + size - shared)
+            if entry_specifier != specifier:
+                # "Other Specified X" 가 인덱스에 없을 때 "Unspecified X" 로 바꾸지 않는다
+                other_specifier = max(other_specifier, score)
+            elif score > scores.get(canonical, 0.0):
+                scores[canonical] = score
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best, best_score = ranked[0] if ranked else (None, 0.0)
+        if best_score < FUZZY_MIN_SCORE:
+            return None, other_specifier >= FUZZY_MIN_SCORE
+        if other_specifier >= best_score - FUZZY_MIN_MARGIN:
+            return None, True
+        if len(ranked) > 1 and ranked[1][1] >= best_score - FUZZY_MIN_MARGIN:
+            return None, True
+        return best, False
+
+    def stats(self) -> dict:
+        info = self._lookup.cache_info()
+        return {
+            "names": len(self.canonical),
+            "aliases": sum(map(len, self.aliases.values())),
+            "icd_codes": sum(map(len, self.icd_codes.values())),
+            "lookup_cache_hits": info.hits,
+            "lookup_cache_misses": info.misses,
+        }
+
+    # ---------- 저장 / 로드 ----------
+    def to_dict(self) -> dict:
+        return {"canonical": self.canonical, "aliases": self.aliases, "icd_codes": self.icd_codes}
+
+    def save(self, path: str = DISORDER_NAME_INDEX_PATH):
+        save_json_atomic(path, self.to_dict())
+
+    @classmethod
+    def load(cls, path: str = DISORDER_NAME_INDEX_PATH):
+        data = load_json(path)
+        if data is None:
+            return None
+        return cls(data["canonical"], data.get("aliases"), data.get("icd_codes"))
+
+
+def load_aliases(path: str = DISORDER_ALIASES_PATH) -> dict:
+    """직접 관리하는 별칭 파일: 정식 병명 → [별칭, ...]"""
+    return load_json(path, default={})
+
+
+def build_name_index(canonical, icd_codes: dict = None, aliases: dict = None) -> DisorderNameIndex:
+    """
+    정식 병명 + 별칭 파일 + ICD 코드로 인덱스 생성
+    별칭 파일의 병명은 대소문자 / 구두점이 달라도 정식 병명에 붙인다
+    """
+    canonical = list(dict.fromkeys(canonical))
+    aliases = load_aliases() if aliases is None else aliases
+    by_key = {}
+    for c in canonical:
+        for key in name_keys(c):
+            by_key.setdefault(key, c)
+
+    matched = {}
+    for name, items in aliases.items():
+        # 별칭 파일의 제목이 PDF 제목과 조금 달라도 별칭 중 하나가 정식 병명이면 붙인다
+        keys = [k for n in [name, *items] for k in name_keys(n)]
+        target = next((by_key[k] for k in keys if k in by_key), None)
+        if target is None:
+            continue   # 이번 인덱스에 없는 병명
+        matched.setdefault(target, []).extend([name] + list(items))
+    return DisorderNameIndex(canonical, matched, icd_codes)
@@ -0,0 +1,158 @@
+# rag/embedding_cache.py
+# 임베딩 캐시 (인덱스 빌드 / 쿼리 서빙 공용)
+# - 키: (모델 이름, task, 텍스트 해시)
+# - 디스크: SQLite 에 float16 벡터 blob 으로 저장
+# - 메모리: 크기 제한 LRU (서빙 쪽 반복 쿼리용)
+
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+TASK_DOCUMENT = "document"
+TASK_QUERY = "query"
+
+_SQL_CHUNK = 500   # IN (...) 한 번에 넣을 키 개수
+
+
+def cache_key(model_name: str, task: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{task}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def embed_queries(model, texts) -> list:
+    """
+    여러 쿼리를 쿼리 인코딩으로 (모델에 배치 embed_queries 가 있으면 한 번에, 없으면 embed_query 를 하나씩)
+    hf / onnx 백엔드는 배치 embed_queries 가 있다 (rag.embeddings.SymmetricQueryEmbeddings, OnnxEmbeddings)
+    하나씩 도는 경로는 쿼리 / 문서 인코딩이 다른데 (instruction prefix 등) 배치 쿼리 API 가 없는 모델용
+    """
+    if hasattr(model, "embed_queries"):
+        return model.embed_queries(texts)
+    return [model.embed_query(t) for t in texts]
+
+
+class EmbeddingCache:
+    """SQLite(float16) 디스크 캐시 + 메모리 LRU"""
+
+    def __init__(self, path: str, memory_items: int = 0):
+        self.path = path
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER, vec BLOB)"
+        )
+        self._conn.commit()
+
+    def _remember(self, key: str, vec: np.ndarray):
+        if self.memory_items <= 0:
+            return
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys) -> dict:
+        """있는 것만 {key: float32 벡터} 로 반환 (메모리 → 디스크 순서)"""
+        found = {}
+        with self._lock:
+            disk_keys = []
+            for key in keys:
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vec
+                else:
+                    disk_keys.append(key)
+            self.memory_hits += len(found)
+
+            for i in range(0, len(disk_keys), _SQL_CHUNK):
+                chunk = disk_keys[i:i + _SQL_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    vec = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+                    found[key] = vec
+                    self._remember(key, vec)
+                    self.disk_hits += 1
+
+            self.misses += len(set(keys) - set(found))
+        return found
+
+    def put_many(self, items):
+        """items: [(key, 벡터), ...]"""
+        rows = []
+        with self._lock:
+            for key, vec in items:
+                vec16 = np.asarray(vec, dtype=np.float16)
+                rows.append((key, int(vec16.shape[0]), vec16.tobytes()))
+                self._remember(key, vec16.astype(np.float32))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vec) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """기존 임베딩 객체를 감싸서, 캐시에 없는 텍스트만 모델로 계산"""
+
+    def __init__(self, base: Embeddings, model_name: str, cache: EmbeddingCache):
+        self.base = base
+        self.model_name = model_name
+        self.cache = cache
+
+    def _embed(self, texts, task: str, compute) -> list:
+        keys = [cache_key(self.model_name, task, t) for t in texts]
+        found = self.cache.get_many(keys)
+
+        # 캐시에 없는 텍스트만 (중복 제거해서) 모델 호출
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = compute(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self.cache.put_many(new_items)
+            # 디스크에서 읽은 값과 같도록 float16 정밀도로 맞춰서 반환
+            for key, vec in new_items:
+                found[key] = np.asarray(vec, dtype=np.float16).astype(np.float32)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts), TASK_DOCUMENT, self.base.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed(
+            [text], TASK_QUERY, lambda ts: [self.base.embed_query(t) for t in ts]
+        )[0]
+
+    def embed_queries(self, texts):
+        """여러 쿼리 (embed_query 와 같은 캐시 키이므로 계산도 쿼리 인코딩으로, base 가 지원하면 배치 한 번)"""
+        return self._embed(list(texts), TASK_QUERY, lambda ts: embed_queries(self.base, ts))
+
+    def stats(self) -> dict:
+        return self.cache.stats()
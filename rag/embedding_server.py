@@ -0,0 +1,224 @@
+# rag/embedding_server.py
+# 공유 추론 프로세스: 임베딩 모델을 한 번만 올리고 uvicorn 워커들이 Unix 소켓으로 요청
+# - 워커 수가 늘어도 모델 가중치 / 임베딩 캐시는 이 프로세스 하나에만 있음
+# - 워커 쪽은 EMBEDDING_BACKEND = "remote" → RemoteEmbeddings (torch 를 import 하지 않음)
+#
+# 실행 (보통은 api/serve.py 가 같이 띄운다):
+#   python rag/embedding_server.py
+#
+# 메시지 형식: [헤더 길이 u32][payload 길이 u32][헤더 JSON][payload]
+#   요청 헤더: {"op": "embed_queries" | "embed_documents" | "stats" | "ping", "texts": [...]}
+#   응답 헤더: {"shape": [n, dim]} + float32 payload, 또는 {"error": "..."}
+
+import os, sys
+import json
+import time
+import signal
+import struct
+import socket
+import argparse
+import threading
+import socketserver
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.config import (
+    EMBEDDING_CACHE_MEMORY_ITEMS,
+    EMBEDDING_SERVER_SOCKET,
+    EMBEDDING_SERVER_BACKEND,
+    EMBEDDING_SERVER_CONNECT_TIMEOUT_S,
+)
+from rag.embedding_cache import embed_queries
+
+_HEADER = struct.Struct("!II")
+
+
+class EmbeddingServerError(RuntimeError):
+    """추론 프로세스가 오류를 돌려줌"""
+
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("임베딩 서버 연결이 끊어졌습니다")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def send_message(sock, header: dict, payload: bytes = b""):
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(header_bytes), len(payload)) + header_bytes + payload)
+
+
+def recv_message(sock):
+    header_len, payload_len = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, header_len).decode("utf-8"))
+    payload = _recv_exact(sock, payload_len) if payload_len else b""
+    return header, payload
+
+
+# ---------- 서버 (추론 프로세스) ----------
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # 워커 하나가 연결을 계속 재사용한다
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                reply, payload = self.server.dispatch(header)
+            except Exception as e:
+                reply, payload = {"error": f"{type(e).__name__}: {e}"}, b""
+            send_message(self.request, reply, payload)
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, embeddings, socket_path: str = EMBEDDING_SERVER_SOCKET):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)   # 이전 실행이 남긴 소켓 파일
+        super().__init__(socket_path, _Handler)
+        self.embeddings = embeddings
+        self.socket_path = socket_path
+        # 모델 호출은 한 번에 하나 (여러 워커가 동시에 forward 하면 CPU 만 더 경쟁함)
+        self._model_lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+
+    def dispatch(self, header: dict):
+        op = header.get("op")
+        if op == "ping":
+            return {"ok": True}, b""
+        if op == "stats":
+            stats = self.embeddings.stats() if hasattr(self.embeddings, "stats") else {}
+            stats.update({"server_requests": self.requests, "server_texts": self.texts})
+            return stats, b""
+        if op not in ("embed_queries", "embed_documents"):
+            raise ValueError(f"알 수 없는 op: {op}")
+
+        texts = header.get("texts", [])
+        if op == "embed_queries":
+            embed = lambda ts: embed_queries(self.embeddings, ts)
+        else:
+            embed = self.embeddings.embed_documents
+        with self._model_lock:
+            vectors = np.asarray(embed(texts), dtype=np.float32)
+        self.requests += 1
+        self.texts += len(texts)
+        return {"shape": list(vectors.shape)}, vectors.tobytes()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+# ---------- 클라이언트 (uvicorn 워커) ----------
+class RemoteEmbeddings(Embeddings):
+    """추론 프로세스에 소켓으로 요청하는 Embeddings (캐시 / 차원 자르기는 서버 쪽에서 처리)"""
+
+    def __init__(self, socket_path: str = EMBEDDING_SERVER_SOCKET,
+                 connect_timeout: float = EMBEDDING_SERVER_CONNECT_TIMEOUT_S):
+        self.socket_path = socket_path
+        self._sock = None
+        self._lock = threading.Lock()
+        # 서버가 아직 모델을 올리는 중일 수 있으므로 뜰 때까지 기다린다
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                self._request({"op": "ping"})
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise ConnectionError(f"임베딩 서버에 연결할 수 없습니다: {socket_path}")
+                time.sleep(0.5)
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _request(self, header: dict):
+        with self._lock:
+            for attempt in range(2):
+                if self._sock is None:
+                    self._sock = self._connect()
+                try:
+                    send_message(self._sock, header)
+                    reply, payload = recv_message(self._sock)
+                    break
+                except OSError:
+                    # 서버 재시작 등으로 끊긴 연결은 한 번만 다시 연결
+                    self._sock.close()
+                    self._sock = None
+                    if attempt:
+                        raise
+        if "error" in reply:
+            raise EmbeddingServerError(reply["error"])
+        return reply, payload
+
+    def _embed(self, op: str, texts) -> list:
+        texts = list(texts)
+        if not texts:
+            return []
+        reply, payload = self._request({"op": op, "texts": texts})
+        return np.frombuffer(payload, dtype=np.float32).reshape(reply["shape"]).tolist()
+
+    def embed_documents(self, texts):
+        return self._embed("embed_documents", texts)
+
+    def embed_query(self, text):
+        return self._embed("embed_queries", [text])[0]
+
+    def embed_queries(self, texts):
+        return self._embed("embed_queries", texts)
+
+    def stats(self) -> dict:
+        reply, _ = self._request({"op": "stats"})
+        return reply
+
+
+def serve(socket_path: str = EMBEDDING_SERVER_SOCKET, backend: str = EMBEDDING_SERVER_BACKEND):
+    from rag.embeddings import get_embeddings
+
+    started = time.perf_counter()
+    embeddings = get_embeddings(memory_items=EMBEDDING_CACHE_MEMORY_ITEMS, backend=backend)
+    model = embeddings
+    while hasattr(model, "base"):
+        model = model.base
+    model.embed_documents(["warm up"])
+    print(f"[EmbeddingServer] 모델 로드 완료 ({backend}, {time.perf_counter() - started:.1f}s)")
+
+    server = EmbeddingServer(embeddings, socket_path)
+    # serve.py 가 terminate() 로 끝내도 소켓 파일을 지우도록
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"[EmbeddingServer] 대기 중: {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="공유 임베딩 추론 프로세스")
+    parser.add_argument("--socket", default=EMBEDDING_SERVER_SOCKET)
+    parser.add_argument("--backend", default=EMBEDDING_SERVER_BACKEND)
+    args = parser.parse_args(argv)
+    serve(args.socket, args.backend)
+
+
+if __name__ == "__main__":
+    main()
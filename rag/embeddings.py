@@ -1,10 +1,148 @@
 # rag/embeddings.py
 
-from langchain_community.embeddings import HuggingFaceEmbeddings
-
-def get_embeddings():
-    # Jina v3는 remote code 허용 필요
-    return HuggingFaceEmbeddings(
-        model_name="jinaai/jina-embeddings-v3",
-        model_kwargs={"trust_remote_code": True}
-    )
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.config import (
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_BACKEND,
+    ONNX_QUANTIZED,
+    EMBEDDING_FULL_DIM,
+    EMBEDDING_DIM,
+    EMBEDDING_SERVER_BACKEND,
+)
+from rag.embedding_cache import CachedEmbeddings, EmbeddingCache, embed_queries
+
+
+class EmbeddingDimensionMismatch(ValueError):
+    """쿼리 벡터 차원과 인덱스(컬렉션) 차원이 다름"""
+
+
+def embedding_model_key(backend: str = None) -> str:
+    """
+    캐시 키에 쓰는 모델 식별자
+    백엔드(양자화 포함)가 다르면 벡터도 조금씩 다르므로 섞이지 않게 구분한다
+    (캐시는 자르기 전 전체 차원 벡터를 저장하므로 차원은 포함하지 않음)
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "remote":
+        # 추론 프로세스가 실제로 쓰는 백엔드와 같은 키 (같은 벡터)
+        backend = EMBEDDING_SERVER_BACKEND
+    if backend == "onnx":
+        return f"{EMBEDDING_MODEL_NAME}:onnx-{'int8' if ONNX_QUANTIZED else 'fp32'}"
+    return EMBEDDING_MODEL_NAME
+
+
+def index_dim() -> int:
+    """인덱스에 저장되는 벡터 차원"""
+    return EMBEDDING_DIM or EMBEDDING_FULL_DIM
+
+
+def index_model_key() -> str:
+    """빌드 매니페스트에 쓰는 식별자 (모델 + 차원이 같아야 같은 인덱스)"""
+    return f"{embedding_model_key()}@{index_dim()}"
+
+
+def index_collection_metadata() -> dict:
+    """빌드 시 컬렉션 메타데이터에 같이 저장 → 서버가 차원 불일치를 거부할 수 있게"""
+    return {"embedding_model": embedding_model_key(), "embedding_dim": index_dim()}
+
+
+def check_index_dimension(collection_metadata: dict):
+    """컬렉션 메타데이터의 차원이 지금 설정과 다르면 EmbeddingDimensionMismatch"""
+    stored = (collection_metadata or {}).get("embedding_dim")
+    if stored is None:
+        print("[Embeddings] 컬렉션에 embedding_dim 정보가 없습니다 (이전 빌드) → 차원 검사 생략")
+        return
+    if int(stored) != index_dim():
+        raise EmbeddingDimensionMismatch(
+            f"인덱스 차원({stored})과 설정된 EMBEDDING_DIM({index_dim()})이 다릅니다. "
+            f"설정을 맞추거나 build_dsm_db.py 로 다시 빌드하세요."
+        )
+
+
+def truncate_vectors(vectors, dim: int) -> np.ndarray:
+    """앞쪽 dim 차원만 남기고 L2 재정규화 (Matryoshka)"""
+    vectors = np.asarray(vectors, dtype=np.float32)[..., :dim]
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class TruncatedEmbeddings(Embeddings):
+    """임베딩 결과를 앞쪽 dim 차원으로 잘라서 반환 (캐시는 안쪽에서 전체 차원으로 유지)"""
+
+    def __init__(self, base: Embeddings, dim: int):
+        self.base = base
+        self.dim = dim
+
+    def embed_documents(self, texts):
+        return truncate_vectors(self.base.embed_documents(texts), self.dim).tolist()
+
+    def embed_query(self, text):
+        return truncate_vectors(self.base.embed_query(text), self.dim).tolist()
+
+    def embed_queries(self, texts):
+        return truncate_vectors(embed_queries(self.base, texts), self.dim).tolist()
+
+    def stats(self) -> dict:
+        return self.base.stats() if hasattr(self.base, "stats") else {}
+
+
+class SymmetricQueryEmbeddings(Embeddings):
+    """
+    쿼리 / 문서 인코딩이 같은 모델용 (HuggingFaceEmbeddings.embed_query 도 embed_documents([text])[0])
+    embed_queries 를 embed_documents 한 번의 배치로 (쿼리 하나씩 forward 하지 않도록)
+    """
+
+    def __init__(self, base: Embeddings):
+        self.base = base
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.base.embed_query(text)
+
+    def embed_queries(self, texts):
+        return self.base.embed_documents(list(texts))
+
+
+def _load_base(backend: str):
+    if backend == "onnx":
+        from rag.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings()
+    if backend == "hf":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        # Jina v3는 remote code 허용 필요
+        # instruction 없이 쿼리 / 문서를 같은 방식으로 인코딩 → 쿼리 배치도 embed_documents 로
+        return SymmetricQueryEmbeddings(HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL_NAME,
+            model_kwargs={"trust_remote_code": True}
+        ))
+    raise ValueError(f"알 수 없는 EMBEDDING_BACKEND: {backend}")
+
+
+def get_embeddings(cache: bool = True, memory_items: int = 0, backend: str = None, dim: int = None):
+    """
+    dim: None 이면 설정(EMBEDDING_DIM)을 따르고, 0 이면 자르지 않은 전체 차원
+    """
+    backend = backend or EMBEDDING_BACKEND
+    dim = EMBEDDING_DIM if dim is None else dim
+
+    if backend == "remote":
+        # 캐시 / 차원 자르기는 추론 프로세스 쪽에서 이미 한다
+        from rag.embedding_server import RemoteEmbeddings
+        return RemoteEmbeddings()
+
+    embeddings = _load_base(backend)
+    if cache:
+        # 같은 텍스트는 다시 계산하지 않도록 디스크(+메모리) 캐시로 감싼다
+        embeddings = CachedEmbeddings(
+            embeddings,
+            model_name=embedding_model_key(backend),
+            cache=EmbeddingCache(EMBEDDING_CACHE_PATH, memory_items=memory_items),
+        )
+    if dim and dim < EMBEDDING_FULL_DIM:
+        embeddings = TruncatedEmbeddings(embeddings, dim)
+    return embeddings
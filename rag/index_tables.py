@@ -0,0 +1,86 @@
+# rag/index_tables.py
+# 인덱스 옆에 같이 저장하는 사이드카 테이블들 (빌드 시 생성 → 서버 시작 시 로드)
+# - criteria table: disorder → 가장 긴 criteria chunk (text + metadata), criteria 가 없는 병명은 None
+# - solution table: disorder → /rag/solution 의 evidence 목록 (미리 검색해 둔 결과)
+
+import os
+import json
+
+from rag.config import CRITERIA_TABLE_PATH, SOLUTION_TABLE_PATH
+
+# /rag/solution 검색 조건 (미리 계산할 때와 실시간 검색이 같은 값을 써야 결과가 같다)
+SOLUTION_QUERY_TEMPLATE = "information about {}"
+SOLUTION_TOP_K = 5
+_SOLUTION_EMBED_BATCH = 64
+
+
+def save_json_atomic(path: str, data):
+    """임시 파일에 쓰고 교체 (서버가 읽는 도중에 반쯤 쓴 파일을 보지 않도록)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_json(path: str, default=None):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[Index Tables] 파일 읽기 오류 ({path}): {e}")
+        return default
+
+
+class CriteriaTableBuilder:
+    """세그멘테이션 결과를 흘려보면서 disorder 별로 가장 긴 criteria chunk 하나만 기억"""
+
+    def __init__(self):
+        self.table = {}
+
+    def add(self, doc):
+        disorder = doc.metadata.get("disorder")
+        if not disorder:
+            return
+        # criteria 가 없는 병명도 None 으로 기록 → 서버가 헛검색하지 않도록
+        self.table.setdefault(disorder, None)
+        if doc.metadata.get("section") != "criteria":
+            return
+        best = self.table.get(disorder)
+        if best is None or len(doc.page_content or "") > len(best["text"]):
+            self.table[disorder] = {"text": doc.page_content, "metadata": dict(doc.metadata)}
+
+    def save(self, path: str = CRITERIA_TABLE_PATH):
+        save_json_atomic(path, self.table)
+
+
+def load_criteria_table(path: str = CRITERIA_TABLE_PATH) -> dict:
+    """disorder → {"text", "metadata"} 또는 None (파일이 없으면 빈 dict)"""
+    return load_json(path, default={})
+
+
+def build_solution_table(disorders, embed_queries, search) -> dict:
+    """
+    disorder 마다 실시간 /rag/solution 과 같은 검색을 미리 해 둔다
+    embed_queries(texts) -> [벡터, ...] (쿼리 task), search(vec, k, where) -> [Document, ...]
+    """
+    disorders = list(disorders)
+    table = {}
+    for start in range(0, len(disorders), _SOLUTION_EMBED_BATCH):
+        batch = disorders[start:start + _SOLUTION_EMBED_BATCH]
+        vectors = embed_queries([SOLUTION_QUERY_TEMPLATE.format(d) for d in batch])
+        for disorder, vec in zip(batch, vectors):
+            hits = search(vec, SOLUTION_TOP_K, {"disorder": disorder})
+            table[disorder] = [{"text": h.page_content, "metadata": h.metadata} for h in hits]
+    return table
+
+
+def save_solution_table(table: dict, path: str = SOLUTION_TABLE_PATH):
+    save_json_atomic(path, table)
+
+
+def load_solution_table(path: str = SOLUTION_TABLE_PATH):
+    """disorder → [{"text", "metadata"}, ...] (파일이 없으면 None → 서버가 시작할 때 만든다)"""
+    return load_json(path, default=None)
@@ -0,0 +1,159 @@
+# rag/layout_cache.py
+# PDF 단어 레이아웃 캐시 (컬럼형 NumPy 배열 + 문자열 테이블)
+# - pdfplumber 파싱은 한 번만 하고, 세그멘테이션 튜닝은 캐시에서 바로 돌린다
+# - 배열은 np.load(mmap_mode="r") 로 열어서 필요한 부분만 읽는다
+#
+# 디렉토리 구성
+#   x0.npy / x1.npy / top.npy   단어 좌표 (float64, pdfplumber 값 그대로 → 세그멘테이션 결과 동일)
+#   text_id.npy                 단어 → 문자열 테이블 인덱스 (int32)
+#   strings.bin / string_offsets.npy   중복 제거된 단어 문자열 (utf-8) 과 offset
+#   page_no.npy / page_width.npy / page_offsets.npy   페이지 번호, 폭, 단어 범위
+#   meta.json                   원본 PDF 정보 (크기, 수정 시각)
+
+import os
+import json
+
+import numpy as np
+
+LAYOUT_CACHE_VERSION = 1
+
+
+def _pdf_fingerprint(pdf_path: str) -> dict:
+    stat = os.stat(pdf_path)
+    return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+def write_layout_cache(cache_dir: str, pages, pdf_path: str) -> int:
+    """
+    pages: (page_idx, width, words) 를 페이지 순서대로 내주는 iterable
+    Returns: 저장한 단어 수
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    string_ids: dict = {}
+    x0, x1, top, text_id = [], [], [], []
+    page_no, page_width, page_offsets = [], [], [0]
+
+    for page_idx, width, words in pages:
+        for w in words:
+            x0.append(w["x0"])
+            x1.append(w["x1"])
+            top.append(w["top"])
+            text_id.append(string_ids.setdefault(w["text"], len(string_ids)))
+        page_no.append(page_idx)
+        page_width.append(width)
+        page_offsets.append(len(x0))
+
+    encoded = [s.encode("utf-8") for s in string_ids]
+    string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=string_offsets[1:])
+
+    np.save(os.path.join(cache_dir, "x0.npy"), np.asarray(x0, dtype=np.float64))
+    np.save(os.path.join(cache_dir, "x1.npy"), np.asarray(x1, dtype=np.float64))
+    np.save(os.path.join(cache_dir, "top.npy"), np.asarray(top, dtype=np.float64))
+    np.save(os.path.join(cache_dir, "text_id.npy"), np.asarray(text_id, dtype=np.int32))
+    np.save(os.path.join(cache_dir, "string_offsets.npy"), string_offsets)
+    with open(os.path.join(cache_dir, "strings.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(cache_dir, "page_no.npy"), np.asarray(page_no, dtype=np.int32))
+    np.save(os.path.join(cache_dir, "page_width.npy"), np.asarray(page_width, dtype=np.float64))
+    np.save(os.path.join(cache_dir, "page_offsets.npy"), np.asarray(page_offsets, dtype=np.int64))
+
+    # meta.json 은 마지막에 써서, 중간에 죽은 캐시는 열리지 않도록 한다
+    meta = {
+        "version": LAYOUT_CACHE_VERSION,
+        "pdf_path": os.path.abspath(pdf_path),
+        "pdf": _pdf_fingerprint(pdf_path),
+        "n_pages": len(page_no),
+        "n_words": len(x0),
+        "n_strings": len(encoded),
+    }
+    with open(os.path.join(cache_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    return len(x0)
+
+
+class LayoutCache:
+    """레이아웃 캐시 읽기 전용 뷰 (배열은 memory-map)"""
+
+    def __init__(self, cache_dir: str, meta: dict):
+        self.cache_dir = cache_dir
+        self.meta = meta
+
+        def load(name):
+            return np.load(os.path.join(cache_dir, name), mmap_mode="r")
+
+        self.x0 = load("x0.npy")
+        self.x1 = load("x1.npy")
+        self.top = load("top.npy")
+        self.text_id = load("text_id.npy")
+        self.page_no = load("page_no.npy")
+        self.page_width = load("page_width.npy")
+        self.page_offsets = load("page_offsets.npy")
+        self._strings = None
+
+    @classmethod
+    def open(cls, cache_dir: str) -> "LayoutCache":
+        meta_path = os.path.join(cache_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(
+                f"레이아웃 캐시가 없습니다: {cache_dir} "
+                f"(먼저 build_dsm_db.py --build-layout-cache 를 실행하세요)"
+            )
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != LAYOUT_CACHE_VERSION:
+            raise ValueError(f"레이아웃 캐시 버전이 다릅니다: {meta.get('version')} (다시 생성하세요)")
+        return cls(cache_dir, meta)
+
+    def warn_if_stale(self, pdf_path: str):
+        """원본 PDF가 바뀌었으면 경고만 출력 (캐시는 그대로 사용)"""
+        if not os.path.exists(pdf_path):
+            return
+        if _pdf_fingerprint(pdf_path) != self.meta.get("pdf"):
+            print(f"[Layout Cache] 경고: {pdf_path} 가 캐시 생성 이후 변경되었습니다. "
+                  f"--build-layout-cache 로 다시 만드세요.")
+
+    @property
+    def strings(self) -> list:
+        """문자열 테이블 (처음 접근할 때 한 번만 디코딩)"""
+        if self._strings is None:
+            with open(os.path.join(self.cache_dir, "strings.bin"), "rb") as f:
+                blob = f.read()
+            offsets = np.load(os.path.join(self.cache_dir, "string_offsets.npy"))
+            self._strings = [
+                blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+                for i in range(len(offsets) - 1)
+            ]
+        return self._strings
+
+    def __len__(self):
+        return len(self.page_no)
+
+    def page_slice(self, i: int) -> slice:
+        return slice(int(self.page_offsets[i]), int(self.page_offsets[i + 1]))
+
+    def iter_page_arrays(self):
+        """(page_idx, width, texts, x0, x1, top) 를 페이지 순서대로 yield (좌표는 memmap 슬라이스)"""
+        strings = self.strings
+        for i in range(len(self)):
+            sl = self.page_slice(i)
+            texts = [strings[t] for t in self.text_id[sl].tolist()]
+            yield int(self.page_no[i]), float(self.page_width[i]), texts, self.x0[sl], self.x1[sl], self.top[sl]
+
+    def iter_pages(self):
+        """(page_idx, width, words) 를 페이지 순서대로 yield (extract_page_words 와 같은 형태)"""
+        strings = self.strings
+        for i in range(len(self)):
+            sl = self.page_slice(i)
+            words = [
+                {"text": strings[t], "x0": a, "x1": b, "top": c}
+                for t, a, b, c in zip(
+                    self.text_id[sl].tolist(),
+                    self.x0[sl].tolist(),
+                    self.x1[sl].tolist(),
+                    self.top[sl].tolist(),
+                )
+            ]
+            yield int(self.page_no[i]), float(self.page_width[i]), words
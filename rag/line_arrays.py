@@ -0,0 +1,113 @@
+# rag/line_arrays.py
+# group_words_to_lines 의 NumPy 버전
+# - 단어 좌표를 배열로 받아서 줄 경계 / 줄 x0, x1 / 줄 종류를 한 번에 계산
+# - 결과 줄 dict 는 group_words_to_lines 와 같은 값 + 미리 계산한 "flags"
+
+import re
+
+import numpy as np
+
+CRITERIA_PATTERN = re.compile(r"^[A-Z]\.\s")
+SUBCRITERIA_PATTERN = re.compile(r"^\d+\.\s")
+TITLE_MAX_LEN = 150
+
+
+def _scan_line_starts(top: np.ndarray, y_tolerance: float) -> np.ndarray:
+    """원래 알고리즘 그대로 (줄 첫 단어의 top 기준) 줄 시작 위치를 찾는다"""
+    starts = [0]
+    current_top = top[0]
+    for i, t in enumerate(top.tolist()):
+        if abs(t - current_top) > y_tolerance:
+            starts.append(i)
+            current_top = t
+    return np.asarray(starts, dtype=np.int64)
+
+
+def find_line_starts(top, y_tolerance: float = 3.0) -> np.ndarray:
+    """
+    줄 시작 단어 인덱스 배열
+    1) 이웃 단어끼리 top 차이(diff)가 y_tolerance 를 넘는 곳을 줄 경계 후보로 잡고
+    2) 원래 규칙(줄 첫 단어 top 과의 차이)으로 한 번에 검증한다
+    검증이 깨지는 페이지(줄 안에서 top 이 조금씩 흘러가는 경우)만 순차 스캔으로 계산
+    """
+    top = np.asarray(top, dtype=np.float64)
+    if len(top) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    breaks = np.flatnonzero(np.abs(np.diff(top)) > y_tolerance) + 1
+    starts = np.concatenate(([0], breaks))
+
+    # 각 단어가 속한 줄의 기준 top (줄 첫 단어)
+    is_start = np.zeros(len(top), dtype=np.int64)
+    is_start[starts] = 1
+    line_of_word = np.cumsum(is_start) - 1
+    anchors = top[starts]
+    inside_ok = np.all(np.abs(top - anchors[line_of_word]) <= y_tolerance)
+    # 줄 경계는 "이전 줄 기준 top" 과 비교해도 벗어나 있어야 한다
+    breaks_ok = np.all(np.abs(top[breaks] - anchors[:-1]) > y_tolerance)
+
+    if inside_ok and breaks_ok:
+        return starts
+    return _scan_line_starts(top, y_tolerance)
+
+
+def classify_lines(texts, x0, x1, width: float, title_check):
+    """
+    줄 종류를 한 번에 계산
+    Returns: (is_title, is_dx_criteria, is_crit_head) bool 배열
+      - is_title: 오른쪽 한 줄짜리 + 병명처럼 보이는 줄
+      - is_dx_criteria: "Diagnostic Criteria" 줄
+      - is_crit_head: A./B./1./2. 로 시작하는 기준 줄 (이어지는 줄은 들여쓰기 상태에 따라 세그멘터가 판단)
+    """
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    right_like = (x1 > width * 0.85) | ((x0 > width * 0.6) & (lengths < TITLE_MAX_LEN))
+
+    is_title = np.zeros(len(texts), dtype=bool)
+    for i in np.flatnonzero(right_like):
+        is_title[i] = title_check(texts[i])
+
+    is_dx_criteria = np.fromiter(
+        ("Diagnostic Criteria" in t for t in texts), dtype=bool, count=len(texts)
+    )
+    is_crit_head = np.fromiter(
+        (bool(CRITERIA_PATTERN.match(t) or SUBCRITERIA_PATTERN.match(t)) for t in texts),
+        dtype=bool,
+        count=len(texts),
+    )
+    return is_title, is_dx_criteria, is_crit_head
+
+
+def group_word_arrays(words_text, x0, x1, top, width: float, title_check, y_tolerance: float = 3.0):
+    """
+    단어 배열 → 줄 dict 리스트 (group_words_to_lines 와 같은 text/x0/x1/top)
+    words_text: 단어 문자열 리스트, x0/x1/top: 같은 길이의 좌표 배열
+    """
+    x0 = np.asarray(x0, dtype=np.float64)
+    x1 = np.asarray(x1, dtype=np.float64)
+    top = np.asarray(top, dtype=np.float64)
+
+    starts = find_line_starts(top, y_tolerance)
+    if len(starts) == 0:
+        return []
+    ends = np.append(starts[1:], len(top))
+
+    line_x0 = np.minimum.reduceat(x0, starts)
+    line_x1 = np.maximum.reduceat(x1, starts)
+    line_top = top[starts]
+
+    raw_texts = [" ".join(words_text[s:e]) for s, e in zip(starts.tolist(), ends.tolist())]
+    stripped = [t.strip() for t in raw_texts]
+    is_title, is_dx, is_head = classify_lines(stripped, line_x0, line_x1, width, title_check)
+
+    line_x0, line_x1, line_top = line_x0.tolist(), line_x1.tolist(), line_top.tolist()
+
+    return [
+        {
+            "text": raw_texts[i],
+            "x0": line_x0[i],
+            "x1": line_x1[i],
+            "top": line_top[i],
+            "flags": (bool(is_title[i]), bool(is_dx[i]), bool(is_head[i])),
+        }
+        for i in range(len(starts))
+    ]
@@ -0,0 +1,149 @@
+# rag/manifest.py
+# DSM 인덱스 빌드 매니페스트
+# - 페이지별 / chunk별 content hash 기록
+# - 컬렉션에 실제로 커밋된 chunk ID 목록 → 증분 빌드 + 중단 후 이어서 빌드
+
+import os
+import re
+import json
+import hashlib
+
+MANIFEST_VERSION = 1
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def page_hash(width, lines) -> str:
+    """페이지 레이아웃(줄 텍스트 + 좌표)의 해시"""
+    payload = json.dumps(
+        [round(width, 2)] + [
+            [line["text"], round(line["x0"], 2), round(line["x1"], 2), round(line["top"], 2)]
+            for line in lines
+        ],
+        ensure_ascii=False,
+    )
+    return _sha1(payload)
+
+
+def chunk_hash(doc) -> str:
+    """chunk 본문 + 메타데이터의 해시 (메타데이터가 바뀌어도 다시 저장되도록)"""
+    payload = json.dumps(
+        {"text": doc.page_content, "metadata": doc.metadata},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return _sha1(payload)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^0-9a-z]+", "-", (text or "").lower()).strip("-") or "none"
+
+
+def assign_chunk_ids(docs):
+    """
+    결정적인 chunk ID 부여: disorder + section + page + hash
+    같은 페이지에 완전히 같은 chunk가 또 나오면 #2, #3 ... 을 붙인다
+    스트리밍 빌드를 위해 (chunk_id, chunk_hash, doc) 을 하나씩 yield 한다
+    """
+    seen = {}
+    for doc in docs:
+        h = chunk_hash(doc)
+        base_id = "{}:{}:p{}:{}".format(
+            _slug(doc.metadata.get("disorder")),
+            doc.metadata.get("section", "none"),
+            doc.metadata.get("page", 0),
+            h[:16],
+        )
+        seen[base_id] = seen.get(base_id, 0) + 1
+        chunk_id = base_id if seen[base_id] == 1 else f"{base_id}#{seen[base_id]}"
+        yield chunk_id, h, doc
+
+
+class BuildManifest:
+    """
+    빌드 매니페스트 (JSON 파일)
+    {
+      "version": 1,
+      "embedding_model": "...",
+      "pages": {"12": "<page hash>", ...},
+      "chunks": {"<chunk id>": {"hash", "disorder", "section", "page"}, ...}
+    }
+    chunks 에는 컬렉션에 커밋이 끝난 chunk만 들어간다
+    """
+
+    def __init__(self, path: str, data: dict = None):
+        self.path = path
+        self.data = data or {
+            "version": MANIFEST_VERSION,
+            "embedding_model": None,
+            "pages": {},
+            "chunks": {},
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "BuildManifest":
+        if not os.path.exists(path):
+            return cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[Manifest] 매니페스트 읽기 오류 → 새로 시작 ({path}): {e}")
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            print(f"[Manifest] 매니페스트 버전 불일치 → 새로 시작 ({path})")
+            return cls(path)
+        return cls(path, data)
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @property
+    def chunks(self) -> dict:
+        return self.data["chunks"]
+
+    @property
+    def pages(self) -> dict:
+        return self.data["pages"]
+
+    def is_compatible(self, embedding_model: str) -> bool:
+        """같은 임베딩 모델로 만든 인덱스인지 (다르면 전체 재빌드 필요)"""
+        return self.data.get("embedding_model") == embedding_model
+
+    def reset(self, embedding_model: str):
+        self.data = {
+            "version": MANIFEST_VERSION,
+            "embedding_model": embedding_model,
+            "pages": {},
+            "chunks": {},
+        }
+
+    def commit_chunks(self, entries):
+        """entries: [(chunk_id, chunk_hash, doc), ...] → 커밋 완료로 기록"""
+        for chunk_id, h, doc in entries:
+            self.chunks[chunk_id] = {
+                "hash": h,
+                "disorder": doc.metadata.get("disorder"),
+                "section": doc.metadata.get("section"),
+                "page": doc.metadata.get("page"),
+            }
+
+    def remove_chunks(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            self.chunks.pop(chunk_id, None)
+
+    def changed_pages(self, page_hashes: dict) -> list:
+        """이전 빌드와 해시가 다른(또는 새로 생긴/사라진) 페이지 번호 목록"""
+        keys = set(self.pages) | set(page_hashes)
+        return sorted(int(k) for k in keys if self.pages.get(k) != page_hashes.get(k))
+
+    def save(self):
+        """임시 파일에 쓰고 교체 → 중간에 죽어도 매니페스트가 깨지지 않음"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
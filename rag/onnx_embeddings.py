@@ -0,0 +1,171 @@
+# rag/onnx_embeddings.py
+# jina-embeddings-v3 ONNX Runtime CPU 백엔드 (선택적으로 int8 동적 양자화)
+#
+# 1) 오프라인 export (한 번만, torch + sentence-transformers 필요):
+#      python rag/onnx_embeddings.py export            # model.onnx + model.int8.onnx
+#      python rag/onnx_embeddings.py export --no-quantize
+# 2) rag/config.py 에서 EMBEDDING_BACKEND = "onnx" 로 바꾸면 get_embeddings() 가 이 백엔드를 쓴다
+#    (서빙 쪽에는 torch 가 필요 없고 onnxruntime + transformers 토크나이저만 있으면 됨)
+
+import os, sys
+import json
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.config import EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR, ONNX_QUANTIZED
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+POOLING_FILE = "pooling.json"
+ONNX_BATCH_SIZE = 32
+
+
+def onnx_model_path(model_dir: str = ONNX_MODEL_DIR, quantized: bool = ONNX_QUANTIZED) -> str:
+    return os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+
+
+class OnnxEmbeddings(Embeddings):
+    """ONNX Runtime 으로 돌리는 임베딩 (HuggingFaceEmbeddings 와 같은 mean pooling / 정규화)"""
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, quantized: bool = ONNX_QUANTIZED,
+                 intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = onnx_model_path(model_dir, quantized)
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"ONNX 모델이 없습니다: {path} (먼저 python rag/onnx_embeddings.py export 를 실행하세요)"
+            )
+
+        with open(os.path.join(model_dir, POOLING_FILE), "r", encoding="utf-8") as f:
+            self.pooling = json.load(f)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = self.pooling.get("max_length", 512)
+
+    def _encode(self, texts) -> np.ndarray:
+        batch = self.tokenizer(
+            list(texts),
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        input_ids = batch["input_ids"].astype(np.int64)
+        attention_mask = batch["attention_mask"].astype(np.int64)
+        hidden = self.session.run(
+            None, {"input_ids": input_ids, "attention_mask": attention_mask}
+        )[0]
+
+        # mean pooling (패딩 토큰 제외)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.pooling.get("normalize", False):
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        out = []
+        for i in range(0, len(texts), ONNX_BATCH_SIZE):
+            out.extend(self._encode(texts[i:i + ONNX_BATCH_SIZE]).tolist())
+        return out
+
+    def embed_query(self, text):
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts):
+        # 이 모델은 쿼리 / 문서 인코딩이 같음 (instruction prefix 없음) → 같은 배치 경로
+        return self.embed_documents(texts)
+
+
+def export(model_dir: str = ONNX_MODEL_DIR, quantize: bool = True, opset: int = 17):
+    """sentence-transformers 로 올린 fp32 모델 → ONNX (+ int8 동적 양자화)"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(model_dir, exist_ok=True)
+
+    print(f"[1] {EMBEDDING_MODEL_NAME} 로드 중...")
+    st_model = SentenceTransformer(
+        EMBEDDING_MODEL_NAME,
+        trust_remote_code=True,
+        device="cpu",
+        model_kwargs={"use_flash_attn": False},   # ONNX 로 내보낼 수 있는 일반 attention 사용
+    )
+    st_model.eval()
+    transformer = st_model[0].auto_model
+
+    # HuggingFaceEmbeddings 와 같은 후처리를 하도록 pooling 설정 기록
+    module_names = [type(m).__name__ for m in st_model]
+    pooling = {
+        "mode": "mean",
+        "normalize": "Normalize" in module_names,
+        "max_length": int(st_model.max_seq_length),
+        "source_model": EMBEDDING_MODEL_NAME,
+    }
+    with open(os.path.join(model_dir, POOLING_FILE), "w", encoding="utf-8") as f:
+        json.dump(pooling, f, ensure_ascii=False, indent=2)
+    st_model.tokenizer.save_pretrained(model_dir)
+
+    class _LastHidden(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    sample = st_model.tokenizer(["diagnostic criteria"], return_tensors="pt")
+    fp32_path = os.path.join(model_dir, FP32_FILE)
+    print(f"[2] ONNX export → {fp32_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            _LastHidden(transformer),
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.join(model_dir, INT8_FILE)
+        print(f"[3] int8 동적 양자화 → {int8_path}")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    print("[완료] ONNX 모델 저장됨:", model_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="jina-embeddings-v3 ONNX export")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="fp32 ONNX export (+ int8 양자화)")
+    export_parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    export_parser.add_argument("--no-quantize", action="store_true")
+    export_parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export(args.model_dir, quantize=not args.no_quantize, opset=args.opset)
+
+
+if __name__ == "__main__":
+    main()
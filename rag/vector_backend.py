@@ -0,0 +1,376 @@
+# rag/vector_backend.py
+# 벡터 검색 백엔드
+# - ChromaBackend: 기존 LangChain Chroma (SQLite + HNSW)
+# - MemmapBackend: 컬렉션을 한 번 export 한 스냅샷 (float16 임베딩 행렬 memory-map + 메타데이터 테이블)
+#                  → 행렬곱 한 번 + argpartition 으로 top-k (정확한 L2 순서)
+#
+# 스냅샷 export:
+#   python rag/vector_backend.py export
+#   (build_dsm_db.py 는 빌드가 끝나면 자동으로 스냅샷을 다시 만든다)
+#
+# 스냅샷 디렉토리 구성
+#   embeddings.f16.npy   (n, dim) float16
+#   sq_norms.npy         (n,) float32  ‖x‖² (L2 거리 계산용)
+#   disorder_id.npy      (n,) int32    meta.json 의 disorders 인덱스 (-1 = 없음)
+#   section_id.npy       (n,) int8     meta.json 의 sections 인덱스 (-1 = 없음)
+#   strings.bin / string_offsets.npy   행별 [본문, 메타데이터 JSON] (utf-8)
+#   meta.json            disorders, sections, dim, collection 메타데이터
+
+import os, sys
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+from rag.config import (
+    BUILD_MANIFEST_PATH,
+    CHROMA_DIR,
+    DSM_COLLECTION_NAME,
+    VECTOR_BACKEND,
+    VECTOR_SNAPSHOT_DIR,
+)
+
+SNAPSHOT_VERSION = 1
+_EXPORT_PAGE = 1000     # 컬렉션에서 한 번에 읽을 행 수
+_SCORE_BLOCK = 16384    # 행렬곱을 나눠서 할 행 수 (float32 임시 배열 크기 제한)
+
+
+def _to_chroma_filter(where: dict):
+    """{"disorder": "X", "section": {"$in": [...]}} → Chroma where 형식 (키가 여러 개면 $and)"""
+    if not where:
+        return None
+    if len(where) == 1:
+        return dict(where)
+    return {"$and": [{k: v} for k, v in where.items()]}
+
+
+class VectorBackend:
+    """벡터 검색 백엔드 공통 인터페이스"""
+
+    name = "base"
+
+    def search(self, query_vec, k: int, where: dict = None):
+        """query_vec 와 가까운 chunk k개 → [Document, ...] (가까운 순서)"""
+        raise NotImplementedError
+
+    def search_many(self, query_vecs, ks, where: dict = None):
+        """쿼리 여러 개를 한 번에 → [[Document, ...], ...] (쿼리별 k 는 ks)"""
+        return [self.search(q, k, where) for q, k in zip(query_vecs, ks)]
+
+    @property
+    def metadata(self) -> dict:
+        """컬렉션 메타데이터 (embedding_dim 등)"""
+        return {}
+
+    def disorders(self) -> list:
+        """인덱스에 있는 병명 목록"""
+        raise NotImplementedError
+
+    def version(self) -> str:
+        """인덱스가 다시 빌드되면 바뀌는 값 (결과 캐시 무효화용, 디스크에서 매번 확인)"""
+        return ""
+
+
+def _mtime(path: str) -> str:
+    try:
+        return str(os.stat(path).st_mtime_ns)
+    except OSError:
+        return ""
+
+
+class ChromaBackend(VectorBackend):
+    name = "chroma"
+
+    def __init__(self, embeddings=None):
+        from langchain_community.vectorstores import Chroma
+
+        self.db = Chroma(
+            embedding_function=embeddings,
+            persist_directory=CHROMA_DIR,
+            collection_name=DSM_COLLECTION_NAME,
+        )
+
+    def search(self, query_vec, k: int, where: dict = None):
+        return self.db.similarity_search_by_vector(
+            query_vec, k=k, filter=_to_chroma_filter(where)
+        )
+
+    def search_many(self, query_vecs, ks, where: dict = None):
+        from langchain_core.documents import Document
+
+        ks = list(ks)
+        if not ks:
+            return []
+        # chromadb 는 쿼리 여러 개를 한 번의 query() 로 처리할 수 있다
+        res = self.db._collection.query(
+            query_embeddings=[list(map(float, q)) for q in query_vecs],
+            n_results=max(ks),
+            where=_to_chroma_filter(where),
+            include=["documents", "metadatas"],
+        )
+        return [
+            [Document(page_content=text or "", metadata=meta or {}) for text, meta in zip(texts[:k], metas[:k])]
+            for texts, metas, k in zip(res["documents"], res["metadatas"], ks)
+        ]
+
+    @property
+    def metadata(self) -> dict:
+        return self.db._collection.metadata or {}
+
+    def disorders(self) -> list:
+        metadatas = self.db._collection.get(include=["metadatas"])["metadatas"]
+        return list(dict.fromkeys(m.get("disorder") for m in metadatas if m and m.get("disorder")))
+
+    def version(self) -> str:
+        # build_dsm_db.py 는 배치마다 매니페스트를 저장한다
+        return _mtime(BUILD_MANIFEST_PATH)
+
+
+class MemmapBackend(VectorBackend):
+    name = "memmap"
+
+    def __init__(self, snapshot_dir: str = VECTOR_SNAPSHOT_DIR):
+        meta_path = os.path.join(snapshot_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(
+                f"벡터 스냅샷이 없습니다: {snapshot_dir} (python rag/vector_backend.py export)"
+            )
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"벡터 스냅샷 버전이 다릅니다: {self.meta.get('version')} (다시 export 하세요)")
+
+        def load(name):
+            return np.load(os.path.join(snapshot_dir, name), mmap_mode="r")
+
+        self.snapshot_dir = snapshot_dir
+        self.matrix = load("embeddings.f16.npy")
+        self.sq_norms = load("sq_norms.npy")
+        self.disorder_id = load("disorder_id.npy")
+        self.section_id = load("section_id.npy")
+        self.string_offsets = load("string_offsets.npy")
+        self.strings = np.memmap(os.path.join(snapshot_dir, "strings.bin"), dtype=np.uint8, mode="r")
+
+        self.disorder_names = self.meta["disorders"]
+        self.section_names = self.meta["sections"]
+        self._disorder_index = {d: i for i, d in enumerate(self.disorder_names)}
+        self._section_index = {s: i for i, s in enumerate(self.section_names)}
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def metadata(self) -> dict:
+        return self.meta.get("collection_metadata", {})
+
+    def disorders(self) -> list:
+        return list(self.disorder_names)
+
+    def version(self) -> str:
+        # export 가 끝날 때 meta.json 을 마지막으로 교체한다
+        return _mtime(os.path.join(self.snapshot_dir, "meta.json"))
+
+    # ---------- 필터 ----------
+    def _ids(self, value, index: dict):
+        values = value["$in"] if isinstance(value, dict) else [value]
+        return [index[v] for v in values if v in index]
+
+    def _candidate_rows(self, where: dict):
+        """where 조건에 맞는 행 번호 (조건 없으면 None = 전체)"""
+        if not where:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in where.items():
+            if key == "disorder":
+                mask &= np.isin(self.disorder_id, self._ids(value, self._disorder_index))
+            elif key == "section":
+                mask &= np.isin(self.section_id, self._ids(value, self._section_index))
+            else:
+                raise ValueError(f"memmap 백엔드에서 지원하지 않는 필터: {key}")
+        return np.flatnonzero(mask)
+
+    # ---------- 검색 ----------
+    def _distances(self, q: np.ndarray, rows=None) -> np.ndarray:
+        """L2 거리² 에서 ‖q‖² 를 뺀 값 (순서는 Chroma l2 와 같음)"""
+        if rows is not None:
+            return self.sq_norms[rows] - 2.0 * (self.matrix[rows].astype(np.float32) @ q)
+        out = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), _SCORE_BLOCK):
+            block = self.matrix[start:start + _SCORE_BLOCK].astype(np.float32)
+            out[start:start + len(block)] = self.sq_norms[start:start + len(block)] - 2.0 * (block @ q)
+        return out
+
+    def search_rows(self, query_vec, k: int, where: dict = None) -> np.ndarray:
+        """가까운 행 번호 k개 (가까운 순서)"""
+        q = np.asarray(query_vec, dtype=np.float32)
+        rows = self._candidate_rows(where)
+        if rows is not None and len(rows) == 0:
+            return rows
+        dist = self._distances(q, rows)
+        k = min(k, len(dist))
+        top = np.argpartition(dist, k - 1)[:k] if k < len(dist) else np.arange(len(dist))
+        top = top[np.argsort(dist[top], kind="stable")]
+        return top if rows is None else rows[top]
+
+    def search_many_rows(self, query_vecs, ks, where: dict = None) -> list:
+        """쿼리 여러 개: 행렬곱 한 번 (n, B) 후 열마다 argpartition"""
+        Q = np.asarray(query_vecs, dtype=np.float32)
+        ks = list(ks)
+        if len(Q) == 0:
+            return []
+        rows = self._candidate_rows(where)
+        if rows is not None:
+            if len(rows) == 0:
+                return [rows for _ in ks]
+            dist = self.sq_norms[rows][:, None] - 2.0 * (self.matrix[rows].astype(np.float32) @ Q.T)
+        else:
+            dist = np.empty((len(self), len(Q)), dtype=np.float32)
+            for start in range(0, len(self), _SCORE_BLOCK):
+                block = self.matrix[start:start + _SCORE_BLOCK].astype(np.float32)
+                dist[start:start + len(block)] = (
+                    self.sq_norms[start:start + len(block)][:, None] - 2.0 * (block @ Q.T)
+                )
+
+        out = []
+        for j, k in enumerate(ks):
+            col = dist[:, j]
+            k = min(k, len(col))
+            top = np.argpartition(col, k - 1)[:k] if k < len(col) else np.arange(len(col))
+            top = top[np.argsort(col[top], kind="stable")]
+            out.append(top if rows is None else rows[top])
+        return out
+
+    def _row_strings(self, row: int):
+        start, end = int(self.string_offsets[2 * row]), int(self.string_offsets[2 * row + 1])
+        text = bytes(self.strings[start:end]).decode("utf-8")
+        meta_end = int(self.string_offsets[2 * row + 2])
+        metadata = json.loads(bytes(self.strings[end:meta_end]).decode("utf-8"))
+        return text, metadata
+
+    def document(self, row: int):
+        from langchain_core.documents import Document
+
+        text, metadata = self._row_strings(row)
+        return Document(page_content=text, metadata=metadata)
+
+    def search(self, query_vec, k: int, where: dict = None):
+        return [self.document(int(r)) for r in self.search_rows(query_vec, k, where)]
+
+    def search_many(self, query_vecs, ks, where: dict = None):
+        return [
+            [self.document(int(r)) for r in rows]
+            for rows in self.search_many_rows(query_vecs, ks, where)
+        ]
+
+
+def export_snapshot(collection, snapshot_dir: str = VECTOR_SNAPSHOT_DIR) -> int:
+    """
+    Chroma 컬렉션 (chromadb Collection 객체) → memmap 스냅샷
+    Returns: export 한 행 수
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    total = collection.count()
+    vectors = None
+    disorders, sections = {}, {}
+    disorder_id = np.full(total, -1, dtype=np.int32)
+    section_id = np.full(total, -1, dtype=np.int8)
+    string_offsets = [0]
+    strings_path = os.path.join(snapshot_dir, "strings.bin")
+
+    row = 0
+    with open(strings_path + ".tmp", "wb") as strings_file:
+        written = 0
+        for offset in range(0, total, _EXPORT_PAGE):
+            page = collection.get(
+                include=["embeddings", "metadatas", "documents"],
+                limit=_EXPORT_PAGE,
+                offset=offset,
+            )
+            page_vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(
+                    os.path.join(snapshot_dir, "embeddings.f16.npy.tmp"),
+                    mode="w+",
+                    dtype=np.float16,
+                    shape=(total, page_vectors.shape[1]),
+                )
+            vectors[row:row + len(page_vectors)] = page_vectors
+
+            for text, metadata in zip(page["documents"], page["metadatas"]):
+                metadata = metadata or {}
+                if metadata.get("disorder"):
+                    disorder_id[row] = disorders.setdefault(metadata["disorder"], len(disorders))
+                if metadata.get("section"):
+                    section_id[row] = sections.setdefault(metadata["section"], len(sections))
+                for blob in ((text or "").encode("utf-8"),
+                             json.dumps(metadata, ensure_ascii=False).encode("utf-8")):
+                    strings_file.write(blob)
+                    written += len(blob)
+                    string_offsets.append(written)
+                row += 1
+
+    if vectors is None:
+        raise ValueError("컬렉션이 비어 있습니다 → 먼저 build_dsm_db.py 로 인덱스를 만드세요")
+    vectors.flush()
+    dim = int(vectors.shape[1])
+    # ‖x‖² 는 float16 으로 저장된 값 기준 (검색 때 쓰는 행렬과 같은 값)
+    as_f32 = np.asarray(vectors, dtype=np.float32)
+    sq_norms = np.einsum("ij,ij->i", as_f32, as_f32)
+    del vectors, as_f32
+
+    def path(name):
+        return os.path.join(snapshot_dir, name)
+
+    np.save(path("sq_norms.npy.tmp.npy"), sq_norms.astype(np.float32))
+    np.save(path("disorder_id.npy.tmp.npy"), disorder_id)
+    np.save(path("section_id.npy.tmp.npy"), section_id)
+    np.save(path("string_offsets.npy.tmp.npy"), np.asarray(string_offsets, dtype=np.int64))
+
+    # 파일을 모두 쓴 뒤 한꺼번에 교체 → 서버가 반쯤 쓴 스냅샷을 보지 않도록
+    os.replace(path("embeddings.f16.npy.tmp"), path("embeddings.f16.npy"))
+    for name in ("sq_norms.npy", "disorder_id.npy", "section_id.npy", "string_offsets.npy"):
+        os.replace(path(name + ".tmp.npy"), path(name))
+    os.replace(strings_path + ".tmp", strings_path)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "exported_at": time.time(),
+        "count": total,
+        "dim": dim,
+        "disorders": list(disorders),
+        "sections": list(sections),
+        "collection_metadata": collection.metadata or {},
+    }
+    with open(path("meta.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(path("meta.json.tmp"), path("meta.json"))
+    return total
+
+
+def get_vector_backend(embeddings=None, backend: str = None) -> VectorBackend:
+    backend = backend or VECTOR_BACKEND
+    if backend == "chroma":
+        return ChromaBackend(embeddings)
+    if backend == "memmap":
+        return MemmapBackend()
+    raise ValueError(f"알 수 없는 VECTOR_BACKEND: {backend}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DSM 컬렉션 → memmap 벡터 스냅샷")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="Chroma 컬렉션을 스냅샷으로 export")
+    export_parser.add_argument("--out", default=VECTOR_SNAPSHOT_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        n = export_snapshot(ChromaBackend().db._collection, args.out)
+        print(f"[완료] 벡터 스냅샷 저장됨: {args.out} ({n}개)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# tests/test_disorder_names.py
+# 병명 정규화: 다른 병명으로 조용히 바꾸지 않는지 (상위 분류 이름, specifier, 비슷한 후보)
+#
+# 사용법:
+#   python -m pytest -q tests/test_disorder_names.py
+
+import os, sys
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+from rag.disorder_names import build_name_index, load_aliases
+
+ALIASES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "rag", "disorder_aliases.json")
+
+CANONICAL = [
+    "Major Depressive Disorder",
+    "Persistent Depressive Disorder (Dysthymia)",
+    "Unspecified Depressive Disorder",
+    "Generalized Anxiety Disorder",
+    "Other Specified Anxiety Disorder",
+    "Bipolar I Disorder",
+    "Bipolar II Disorder",
+    "Unspecified Bipolar and Related Disorder",
+    "Schizophrenia",
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return build_name_index(CANONICAL, {"Major Depressive Disorder": ["F32.1"]}, load_aliases(ALIASES_PATH))
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("major depressive disorder", "Major Depressive Disorder"),
+    ("우울증", "Major Depressive Disorder"),
+    ("F32.1", "Major Depressive Disorder"),
+    ("Major Depresive Disorder", "Major Depressive Disorder"),
+    ("Schizophernia", "Schizophrenia"),
+    ("generalised anxiety disorder", "Generalized Anxiety Disorder"),
+    ("GAD", "Generalized Anxiety Disorder"),
+    ("Dysthymic Disorder", "Persistent Depressive Disorder (Dysthymia)"),
+    ("Unspecified Depresive Disorder", "Unspecified Depressive Disorder"),
+    ("Other specified anxiety disorders", "Other Specified Anxiety Disorder"),
+])
+def test_resolves(index, name, expected):
+    assert index.resolve(name) == expected
+    assert not index.is_ambiguous(name)
+
+
+@pytest.mark.parametrize("name", [
+    "불안장애",
+    "양극성 장애",
+    "Bipolar Disorder",
+    "조울증",
+    # 인덱스에 없는 specifier 변형 → 다른 specifier 의 병명으로 바꾸지 않음
+    "Other Specified Depressive Disorder",
+    "Other Specified Bipolar and Related Disorder",
+    "Unspecified Anxiety Disorder",
+])
+def test_ambiguous_names_are_not_substituted(index, name):
+    assert index.resolve(name) is None
+    assert index.is_ambiguous(name)
+
+
+def test_unknown_names(index):
+    assert index.resolve("Ligma Disorder") is None
+    assert not index.is_ambiguous("Ligma Disorder")
+    assert index.resolve("F99") is None
+    assert index.resolve("") is None
@@ -0,0 +1,101 @@
+# tests/test_line_grouping.py
+# group_word_arrays (NumPy) 가 group_words_to_lines + classify_line (파이썬 루프) 와 같은 줄을 만드는지
+#
+# 사용법:
+#   python -m pytest -q tests/test_line_grouping.py
+
+import os, sys
+import random
+
+# 프로젝트 루트 경로 잡아주기
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+import pytest
+
+from rag.build_dsm_db import classify_line, group_words_to_lines, looks_like_disorder_title
+from rag.line_arrays import find_line_starts, group_word_arrays
+
+WIDTH = 612.0
+VOCAB = ["Major", "Depressive", "Disorder", "A.", "B.", "1.", "2.", "symptoms", "of",
+         "the", "for", "Diagnostic", "Criteria", "F32.1", "most", "days", "or"]
+
+
+def make_page(seed: int, jitter: float = 0.0):
+    """합성 페이지 단어 목록 (jitter: 줄 안에서 단어 top 이 흔들리는 폭)"""
+    rng = random.Random(seed)
+    words, top = [], 50.0
+    for _ in range(rng.randint(30, 60)):
+        x = rng.choice([50.0, 60.0, 72.0, 380.0])
+        # 첫 단어는 줄의 기준이라 흔들지 않음 (그래야 줄 수가 seed 마다 일정)
+        first = rng.choice(["A.", "1.", "Major", "Diagnostic", "the"])
+        for j in range(rng.randint(1, 12)):
+            words.append({
+                "text": first if j == 0 else rng.choice(VOCAB),
+                "x0": x + j * 30,
+                "x1": x + j * 30 + 25,
+                "top": top + (rng.uniform(-jitter, jitter) if j else 0.0),
+            })
+        top += rng.choice([11.0, 12.0, 14.0])
+    return words
+
+
+def fast_lines(words, width: float = WIDTH):
+    return group_word_arrays(
+        [w["text"] for w in words],
+        np.array([w["x0"] for w in words], dtype=np.float64),
+        np.array([w["x1"] for w in words], dtype=np.float64),
+        np.array([w["top"] for w in words], dtype=np.float64),
+        width,
+        looks_like_disorder_title,
+    )
+
+
+def assert_same_lines(words, width: float = WIDTH):
+    slow = group_words_to_lines(words)
+    fast = fast_lines(words, width)
+    assert len(fast) == len(slow)
+    for s, f in zip(slow, fast):
+        assert (f["text"], f["x0"], f["x1"], f["top"]) == (s["text"], s["x0"], s["x1"], s["top"])
+        assert f["flags"] == tuple(classify_line(s["text"].strip(), s["x0"], s["x1"], width))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_synthetic_pages(seed):
+    assert_same_lines(make_page(seed))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_jittered_top(seed):
+    # 줄 안의 흔들림이 y_tolerance(3.0) 근처 → 이웃 단어 diff 만으로는 경계가 틀릴 수 있는 경우
+    assert_same_lines(make_page(seed, jitter=2.9))
+
+
+def test_drifting_top_falls_back_to_scan():
+    # 한 줄 안에서 top 이 조금씩 흘러감: 이웃 diff 는 모두 작지만 첫 단어에서 3 넘게 멀어짐
+    words = [{"text": f"w{i}", "x0": 10.0 * i, "x1": 10.0 * i + 8, "top": 100.0 + 1.0 * i} for i in range(10)]
+    assert_same_lines(words)
+    assert find_line_starts([w["top"] for w in words]).tolist() == [0, 4, 8]
+
+
+def test_unsorted_words_keep_text_flow_order():
+    # 단어는 top 으로 정렬하지 않는다 (두 단 레이아웃: 오른쪽 단이 다시 위에서 시작)
+    left = [{"text": f"L{i}", "x0": 50.0, "x1": 250.0, "top": 100.0 + 12 * i} for i in range(5)]
+    right = [{"text": f"R{i}", "x0": 330.0, "x1": 560.0, "top": 100.0 + 12 * i} for i in range(5)]
+    # 같은 줄에 위 / 아래 단어가 섞여 들어오는 경우도 포함
+    stray = [{"text": "x", "x0": 300.0, "x1": 310.0, "top": 101.5},
+             {"text": "y", "x0": 320.0, "x1": 330.0, "top": 99.0}]
+    words = left + right + stray
+    assert_same_lines(words)
+    assert [line["text"] for line in fast_lines(words)][:6] == ["L0", "L1", "L2", "L3", "L4", "R0"]
+
+    rng = random.Random(0)
+    for _ in range(10):
+        shuffled = words[:]
+        rng.shuffle(shuffled)
+        assert_same_lines(shuffled)
+
+
+def test_empty_page():
+    assert fast_lines([]) == []
+    assert group_words_to_lines([]) == []